@@ -6,8 +6,11 @@ from datetime import datetime, timedelta
 from typing import Optional
 #import importlib.util, sys
 import importlib
-from time import time
+from time import time, monotonic
+from collections import deque, ChainMap
+from struct import pack
 import json
+import random
 
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
@@ -15,11 +18,18 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT, CONF_SCAN_INTERVAL
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers import entity_registry as er
 from homeassistant.components.button import ButtonEntity
 
 _LOGGER = logging.getLogger(__name__)
 #try: # pymodbus 3.0.x
 from pymodbus.client import ModbusTcpClient, ModbusSerialClient
+try: 
+    from pymodbus.client import AsyncModbusTcpClient, AsyncModbusSerialClient
+except ImportError: # no asyncio clients available, fall back to the blocking clients
+    AsyncModbusTcpClient = None
+    AsyncModbusSerialClient = None
 #    UNIT_OR_SLAVE = 'slave'
 #    _LOGGER.warning("using pymodbus library 3.x")
 #except: # pymodbus 2.5.3
@@ -36,7 +46,8 @@ from pymodbus.client import ModbusTcpClient, ModbusSerialClient
 #    Endian_LITTLE = Endian.LITTLE
 from pymodbus.constants import Endian
 from pymodbus.exceptions import ConnectionException
-from pymodbus.payload import BinaryPayloadBuilder, BinaryPayloadDecoder, Endian
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.payload import BinaryPayloadBuilder, Endian
 from pymodbus.transaction import ModbusRtuFramer, ModbusAsciiFramer
 
 from .const import (
@@ -52,6 +63,9 @@ from .const import (
     CONF_READ_DCB,
     CONF_BAUDRATE,
     CONF_PLUGIN,
+    CONF_POLL_ASYNC,
+    CONF_SCAN_INTERVAL_FAST,
+    CONF_TCP_PIPELINE,
     DEFAULT_READ_EPS,
     DEFAULT_READ_DCB,
     DEFAULT_INTERFACE,
@@ -60,10 +74,59 @@ from .const import (
     DEFAULT_PORT,
     DEFAULT_BAUDRATE,
     DEFAULT_PLUGIN,
+    DEFAULT_POLL_ASYNC,
+    DEFAULT_SCAN_INTERVAL_FAST,
+    DEFAULT_TCP_PIPELINE,
+    PIPELINE_RETRY_INTERVAL,
+    PIPELINE_RETRY_MAX,
     #PLUGIN_PATH,
     SLEEPMODE_LASTAWAKE,
+    POLL_REALTIME,
+    POLL_NORMAL,
+    POLL_SLOW,
+    POLL_STATIC,
+    POLL_SLOW_INTERVAL,
+    POLL_STATIC_INTERVAL,
+    PRIO_WRITE,
+    PRIO_NORMAL,
+    TIER_PRIORITY,
+    STATE_ONLINE,
+    STATE_DEGRADED,
+    STATE_ASLEEP,
+    STATE_OFFLINE,
+    BACKOFF_MAX,
+    BACKOFF_JITTER,
+    WRITE_COALESCE_WINDOW,
+    READBACK_DELAY,
+    READBACK_COOLDOWN,
+    LINK_TCP_OVERHEAD,
+    LINK_TCP_REGISTER,
+    LINK_SERIAL_TURNAROUND,
+    LINK_MODEL_SAMPLES,
+    STATS_WINDOW,
+    HOLES_STORAGE_VERSION,
+    HOLES_SAVE_DELAY,
+    HOLES_MAX_AGE,
+    HOLES_RETRY_DELAY,
+    ILLEGAL_ADDRESS,
+    IDENTITY_STORAGE_VERSION,
+    CONF_PROXY_PORT,
+    CONF_PROXY_MAX_AGE,
+    CONF_PROXY_HOST,
+    CONF_RECORD_FRAMES,
+    DEFAULT_PROXY_PORT,
+    DEFAULT_PROXY_MAX_AGE,
+    DEFAULT_PROXY_HOST,
+    DEFAULT_RECORD_FRAMES,
+    LOCALDATA_STORAGE_VERSION,
+    LOCALDATA_SAVE_DELAY,
 )
 from .const import REGISTER_S32, REGISTER_U32, REGISTER_U16, REGISTER_S16, REGISTER_ULSB16MSB16, REGISTER_STR, REGISTER_WORDS, REGISTER_U8H, REGISTER_U8L
+from .sensor import block, splitInBlocks, compileBlock, regEnd, inHole
+from .proxy import ModbusProxy
+from .recorder import FrameRecorder
+from .instrumentation import Histogram, Outcomes, BlockStats, errorClass, frameBytes
+from .const import PLAN_VALUE, PLAN_ULSB16MSB16, PLAN_WORDS, PLAN_STR, PLAN_U8L, PLAN_U8H, PLAN_ZERO, SCALE_RAW, SCALE_NUM, SCALE_DICT
 
 
 PLATFORMS = ["button", "number", "select", "sensor"] 
@@ -71,6 +134,19 @@ PLATFORMS = ["button", "number", "select", "sensor"]
 #seriesnumber = 'unknown'
 
 
+_PLUGINS = {} # imported plugin modules by short name, shared by all hubs of the same plugin
+
+def loadPlugin(plugin_name):
+    # blocking import of a plugin module, building its description tables takes long enough to keep it off the event loop
+    plugin = _PLUGINS.get(plugin_name)
+    if plugin is None:
+        start = monotonic()
+        plugin = importlib.import_module(f".plugin_{plugin_name}", 'custom_components.solax_modbus') 
+        _PLUGINS[plugin_name] = plugin
+        _LOGGER.info(f"plugin {plugin_name} imported in {(monotonic() - start) * 1000:.0f} ms")
+    return plugin
+
+
 async def config_entry_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Update listener, called when the config entry options are changed."""
     await hass.config_entries.async_reload(entry.entry_id)
@@ -114,7 +190,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     # ================== dynamically load desired plugin =======================================================
     _LOGGER.info(f"trying to load plugin - plugin_name: {plugin_name}")
-    plugin = importlib.import_module(f".plugin_{plugin_name}", 'custom_components.solax_modbus') 
+    plugin = _PLUGINS.get(plugin_name) or await hass.async_add_executor_job(loadPlugin, plugin_name)
     if not plugin: _LOGGER.error(f"could not import plugin with name: {plugin_name}")
     # ====================== end of dynamic load ==============================================================
 
@@ -135,9 +211,24 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     _LOGGER.debug(f"Setup {DOMAIN}.{name}")
     _LOGGER.debug(f"solax serial port {serial_port} interface {interface}")
 
-    hub = SolaXModbusHub(hass, name, host, port, tcp_type, modbus_addr, interface, serial_port, baudrate, scan_interval, plugin, config)
+    identity_store = Store(hass, IDENTITY_STORAGE_VERSION, f"{DOMAIN}_{entry.entry_id}_identity")
+    identity = await identity_store.async_load()
+    if identity and (identity.get("options") != dict(config)): identity = None # options changed, e.g. plugin or read_eps: probe again
+
+    hub = SolaXModbusHub(hass, name, host, port, tcp_type, modbus_addr, interface, serial_port, baudrate, scan_interval, plugin, config, entry.entry_id, identity_store, identity)
     """Register the hub."""
     hass.data[DOMAIN][name] = { "hub": hub,  }
+    if not identity: await hub.async_identify()
+    await hub.async_load_holes()
+    await hub.async_load_local_data()
+    proxy_port = config.get(CONF_PROXY_PORT, DEFAULT_PROXY_PORT)
+    if proxy_port:
+        hub.raw_registers = { 'holding': {}, 'input': {}, }
+        hub.proxy = ModbusProxy(hub, config.get(CONF_PROXY_HOST, DEFAULT_PROXY_HOST), proxy_port, config.get(CONF_PROXY_MAX_AGE, DEFAULT_PROXY_MAX_AGE))
+        try: await hub.proxy.async_start()
+        except OSError as ex:
+            _LOGGER.error(f"{name}: cannot start the modbus proxy on port {proxy_port}: {ex}")
+            hub.proxy = None
 
     for component in PLATFORMS:
         hass.async_create_task(
@@ -159,10 +250,23 @@ async def async_unload_entry(hass, entry):
     )
     if not unload_ok: return False
 
+    hubentry = hass.data[DOMAIN].get(entry.options["name"])
+    if hubentry: 
+        hubentry["hub"]._bus.release_owner(entry.options["name"])
+        if hubentry["hub"]._registry_unsub: hubentry["hub"]._registry_unsub()
+        if hubentry["hub"].proxy: await hubentry["hub"].proxy.async_stop()
+        if hubentry["hub"].recorder: await hass.async_add_executor_job(hubentry["hub"].recorder.flush)
     hass.data[DOMAIN].pop(entry.data.get("name", None), None ) , # for legacy compatibility, this line can be removed later
     hass.data[DOMAIN].pop(entry.options["name"])
     return True
 
+
+async def async_remove_entry(hass, entry):
+    """Remove the cached inverter identity of a deleted entry."""
+    await Store(hass, IDENTITY_STORAGE_VERSION, f"{DOMAIN}_{entry.entry_id}_identity").async_remove()
+
+_UNSET = object() # marks keys not (yet) present in hub.data
+
 def defaultIsAwake( datadict):
     return True
 
@@ -171,6 +275,135 @@ def Gen4Timestring(numb):
     m = numb >> 8
     return f"{h:02d}:{m:02d}"
 
+# =================================== shared bus connections =========================================================
+
+_BUSES = {} # process wide registry of modbus connections, indexed by serial port or host:port
+
+class ModbusBus:
+    """ one modbus connection shared by all hubs on the same serial port or tcp gateway
+        asyncio requests are granted by priority (PRIO_xx), and round robin over the waiting hubs within a priority, so no hub can starve the others """
+
+    @staticmethod
+    def key(interface, host, port, serial_port):
+        return serial_port if interface == "serial" else f"{host}:{port}"
+
+    @classmethod
+    def get(cls, key, make_client, make_async_client, owner):
+        """ return the bus for key, creating its clients with the factories if it does not exist yet """
+        bus = _BUSES.get(key)
+        if bus == None: bus = _BUSES[key] = cls(key, make_client(), make_async_client())
+        else: _LOGGER.info(f"{owner}: sharing modbus connection {key} with {sorted(bus.owners)}")
+        bus.owners.add(owner)
+        return bus
+
+    @classmethod
+    def attach(cls, key, client, async_client):
+        """ register a stand-in connection for key before its hub is created, e.g. the replay clients of recorder.py """
+        bus = _BUSES[key] = cls(key, client, async_client)
+        return bus
+
+    def __init__(self, key, client, async_client):
+        self.key = key
+        self.client = client # blocking client
+        self.async_client = async_client # asyncio client, None when using the blocking client
+        self.lock = threading.Lock() # serializes requests of the blocking client
+        self.owners = set() # names of the hubs using this bus
+        self.active = set() # names of the hubs that are polling, the connection is closed when none is left
+        self._busy = False # True while an asyncio request holds the bus
+        self._waiting = {} # futures of the asyncio requests waiting for the bus, per (priority, owner,)
+        self._turns = {} # owners with waiting requests, in round robin order, per priority
+        self._since = monotonic()
+        self.requests = {} # number of requests per owner
+        self.busy_time = {} # seconds the bus was held, per owner
+
+    def release_owner(self, owner):
+        """ called when a hub is unloaded; forgets the bus when its last hub is gone """
+        self.owners.discard(owner)
+        self.active.discard(owner)
+        if not self.owners: _BUSES.pop(self.key, None)
+
+    def slot(self, owner, priority = PRIO_NORMAL):
+        return _BusSlot(self, owner, priority)
+
+    async def acquire(self, owner, priority = PRIO_NORMAL):
+        if not self._busy and not self._turns: 
+            self._busy = True
+            return
+        granted = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault((priority, owner,), deque()).append(granted)
+        turns = self._turns.setdefault(priority, deque())
+        if owner not in turns: turns.append(owner)
+        try: await granted
+        except asyncio.CancelledError:
+            if not granted.cancelled(): self.release() # granted just before the cancellation, pass it on
+            raise
+
+    def release(self):
+        while self._turns:
+            priority = min(self._turns)
+            turns = self._turns[priority]
+            owner = turns.popleft()
+            queue = self._waiting[(priority, owner,)]
+            granted = queue.popleft()
+            if queue: turns.append(owner) # next request of this owner after those of the other owners
+            else: self._waiting.pop((priority, owner,))
+            if not turns: self._turns.pop(priority)
+            if not granted.cancelled(): 
+                granted.set_result(None) # bus stays busy, ownership passes to the waiter
+                return
+        self._busy = False
+
+    def account(self, owner, seconds):
+        self.requests[owner] = self.requests.get(owner, 0) + 1
+        self.busy_time[owner] = self.busy_time.get(owner, 0) + seconds
+
+    def statistics(self):
+        """ requests, busy seconds and percentage of wall time each hub held the bus """
+        elapsed = max(monotonic() - self._since, 1e-6)
+        return { owner: { "requests": self.requests.get(owner, 0), "busy_seconds": round(self.busy_time.get(owner, 0), 1), 
+                          "utilisation_pct": round(100 * self.busy_time.get(owner, 0) / elapsed, 2), } for owner in sorted(self.owners) }
+
+    def idle_pct(self):
+        """ percentage of wall time no hub held the bus """
+        elapsed = max(monotonic() - self._since, 1e-6)
+        return round(max(0.0, 100 - 100 * sum(self.busy_time.values()) / elapsed), 2)
+
+class _BusSlot:
+    """ context manager holding the bus for one request of an owner; use with for the blocking client, async with for the asyncio client """
+
+    def __init__(self, bus, owner, priority = PRIO_NORMAL):
+        self.bus = bus
+        self.owner = owner
+        self.priority = priority
+        self._t0 = 0
+        self._async_t0 = 0
+
+    def __enter__(self):
+        self.bus.lock.acquire()
+        self._t0 = monotonic()
+
+    def __exit__(self, *exc):
+        self.bus.account(self.owner, monotonic() - self._t0)
+        self.bus.lock.release()
+
+    async def __aenter__(self):
+        await self.bus.acquire(self.owner, self.priority)
+        self._async_t0 = monotonic()
+
+    async def __aexit__(self, *exc):
+        self.bus.account(self.owner, monotonic() - self._async_t0)
+        self.bus.release()
+
+# =================================== hub ===========================================================================
+
+class LocalDataStore(Store):
+    """ storage of the WRITE_DATA_LOCAL entity values; values of earlier versions are kept as they are """
+
+    async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+        _LOGGER.info(f"migrating local data {self.key} from version {old_major_version}.{old_minor_version}")
+        return old_data
+
+
 class SolaXModbusHub:
     """Thread safe wrapper class for pymodbus."""
 
@@ -187,21 +420,48 @@ class SolaXModbusHub:
         baudrate,
         scan_interval,
         plugin,
-        config
+        config,
+        entry_id = None,
+        identity_store = None,
+        identity = None,
     ):
         """Initialize the Modbus hub."""
         _LOGGER.debug(f"solax modbushub creation with interface {interface} baudrate (only for serial): {baudrate}")
         self._hass = hass
-        if (interface == "serial"): 
-            self._client = ModbusSerialClient(method="rtu", port=serial_port, baudrate=baudrate, parity='N', stopbits=1, bytesize=8, timeout=3)
-        else:
+        def make_client():
+            if (interface == "serial"): 
+                return ModbusSerialClient(method="rtu", port=serial_port, baudrate=baudrate, parity='N', stopbits=1, bytesize=8, timeout=3)
             if tcp_type == "rtu":
-                self._client = ModbusTcpClient(host=host, port=port, timeout=5, framer=ModbusRtuFramer)
-            elif tcp_type == "ascii":
-                self._client = ModbusTcpClient(host=host, port=port, timeout=5, framer=ModbusAsciiFramer)
-            else:
-                self._client = ModbusTcpClient(host=host, port=port, timeout=5)
-        self._lock = threading.Lock()
+                return ModbusTcpClient(host=host, port=port, timeout=5, framer=ModbusRtuFramer)
+            if tcp_type == "ascii":
+                return ModbusTcpClient(host=host, port=port, timeout=5, framer=ModbusAsciiFramer)
+            return ModbusTcpClient(host=host, port=port, timeout=5)
+        def make_async_client(): # asyncio client used for polling and writing; None when using the blocking client
+            if not (config.get(CONF_POLL_ASYNC, DEFAULT_POLL_ASYNC) and AsyncModbusTcpClient): return None
+            if (interface == "serial"):
+                return AsyncModbusSerialClient(port=serial_port, framer=ModbusRtuFramer, baudrate=baudrate, parity='N', stopbits=1, bytesize=8, timeout=3)
+            if tcp_type == "rtu":
+                return AsyncModbusTcpClient(host=host, port=port, timeout=5, framer=ModbusRtuFramer)
+            if tcp_type == "ascii":
+                return AsyncModbusTcpClient(host=host, port=port, timeout=5, framer=ModbusAsciiFramer)
+            return AsyncModbusTcpClient(host=host, port=port, timeout=5)
+        # hubs on the same serial port or tcp gateway share one connection; the first hub's settings are used
+        self._bus = ModbusBus.get(ModbusBus.key(interface, host, port, serial_port), make_client, make_async_client, name)
+        self._client = self._bus.client
+        self._async_client = self._bus.async_client
+        self._lock = self._bus.slot(name) # with self._lock for the blocking client, async with for the asyncio client
+        self._async_lock = self._lock
+        self._write_lock = self._bus.slot(name, PRIO_WRITE) # writes are granted before pending reads
+        self._read_locks = { tier: self._bus.slot(name, prio) for (tier, prio,) in TIER_PRIORITY.items() }
+        self._write_latency = deque(maxlen = 100) # seconds from write request to acknowledge, most recent writes
+        self._bus_report_next = time() + POLL_STATIC_INTERVAL
+        self._pipeline_window = 1 # block reads kept in flight; pipelining needs mbap transaction ids, so plain modbus tcp only
+        if (interface == "tcp") and (tcp_type == "tcp") and self._async_client: self._pipeline_window = max(1, int(config.get(CONF_TCP_PIPELINE, DEFAULT_TCP_PIPELINE)))
+        self._pipeline_suspect = False # True after a pipelined cycle with transport errors: the next cycle runs sequentially
+        self._pipeline_configured = self._pipeline_window
+        self._pipeline_retry = None # time at which pipelining is tried again after a fallback to sequential requests
+        self._pipeline_fallbacks = 0 # consecutive fallbacks, each one doubles the time before the next try
+        self._cycle_busy = False # True while a polling cycle is in progress
         self._name = name
         self._modbus_addr = modbus_addr
         self._seriesnumber = 'still unknown'
@@ -209,17 +469,67 @@ class SolaXModbusHub:
         self.read_serial_port = serial_port
         self._baudrate = int(baudrate)
         self._scan_interval = timedelta(seconds=scan_interval)
+        fast_interval = min(config.get(CONF_SCAN_INTERVAL_FAST, DEFAULT_SCAN_INTERVAL_FAST), scan_interval)
+        self._tier_intervals = { POLL_REALTIME: fast_interval, POLL_NORMAL: scan_interval, POLL_SLOW: POLL_SLOW_INTERVAL, POLL_STATIC: POLL_STATIC_INTERVAL, }
+        self._tier_next = {} # timestamp at which each polling tier is due again
         self._unsub_interval_method = None
         self._sensor_callbacks = []
+        self._key_callbacks = {} # update callbacks indexed by entity key, for change driven notification
+        self._plain_callbacks = [] # update callbacks registered without key, called after every cycle
+        self._published = {} # value of each key at the time of the last notification
+        self._force_notify = False # notify all entities after the next cycle, e.g. when descriptions were modified
+        self.notify_sent = 0 # total number of entity notifications sent
+        self.notify_suppressed = 0 # total number of entity notifications skipped because nothing changed
         self.data = { "_repeatUntil": {}} # _repeatuntil contains button autorepeat expiry times
+        self.block_captured = {} # (typ, start,) -> time() of the response whose values are in data now
+        self._key_fresh = {} # key -> time() of a value written by an entity or read back after a write, see publish
+        self.data_skew = 0 # seconds between the first and the last block response of the last published cycle
+        self.raw_registers = None # typ -> { address: (raw value, time(),) }, only kept for the modbus proxy
+        self.proxy = None
+        self.recorder = FrameRecorder(hass.config.path(f"{name}_frames.bin")) if config.get(CONF_RECORD_FRAMES, DEFAULT_RECORD_FRAMES) else None
         self.tmpdata = {} # for WRITE_DATA_LOCAL entities with corresponding prevent_update number/sensor
         self.tmpdata_expiry = {} # expiry timestamps for tempdata
         self.cyclecount = 0 # temporary - remove later
-        self.slowdown = 1 # slow down factor when modbus is not responding: 1 : no slowdown, 10: ignore 9 out of 10 cycles
-        self.inputBlocks = {}
-        self.holdingBlocks = {}
+        self.state = STATE_ONLINE # connection state, see const.py
+        self.state_since = time()
+        self._failures = 0 # consecutive failed cycles or probes
+        self._next_attempt = 0 # no cycle or probe before this time while backing off
+        self._responded = False # the device answered at least one request in this cycle
+        self._connect_failed = False # a request in this cycle failed because there is no connection
+        self.inputBlocks = []
+        self.holdingBlocks = []
+        self.inputRegs = {} # sorted input register descriptions to poll, indexed by address
+        self.holdingRegs = {} # sorted holding register descriptions to poll, indexed by address
+        self.block_layout = {} # summary of the planned blocks and the cost model used, for logging and diagnostics
+        self._rtt_samples = deque(maxlen = 100) # (registers, seconds,) of recent successful block reads
+        self.block_stats = {} # (typ, start, end,) -> BlockStats of each planned block, see instrumentation.py
+        self.read_stats = Histogram(STATS_WINDOW) # round trip time of the block reads of all blocks
+        self.read_outcomes = Outcomes(STATS_WINDOW)
+        self.cycle_stats = Histogram(STATS_WINDOW) # duration of the polling cycles
+        self._framing = "rtu" if interface == "serial" else tcp_type # for the bytes on the wire per read
+        if interface == "serial": # modbus rtu character: start + 8 data + parity/stop + stop bits
+            char_time = 11 / int(baudrate)
+            self.request_overhead = 13 * char_time + LINK_SERIAL_TURNAROUND # 8 byte request, 5 byte response frame
+            self.register_cost = 2 * char_time
+        else:
+            self.request_overhead = LINK_TCP_OVERHEAD
+            self.register_cost = LINK_TCP_REGISTER
+        self._model_measured = False
+        self.holes = { 'holding': [], 'input': [], } # learned unreadable (start, end,) register ranges of this inverter
+        self._holes_learned = {} # (typ, start, end,) -> time() the hole was learned, see expire_holes
+        self._bisect_after = {} # (typ, block start,) -> no bisection of that block before this time, see bisect_refused
+        self._holes_store = Store(hass, HOLES_STORAGE_VERSION, f"{DOMAIN}_{name}_holes")
+        self._locals_store = LocalDataStore(hass, LOCALDATA_STORAGE_VERSION, f"{DOMAIN}_{name}_localdata")
+        self._locals = {} # persisted WRITE_DATA_LOCAL values, indexed by key
+        self._holes_all = {} # stored hole maps, indexed by serial number
         self.computedSensors = {}
+        self._computed_order = [] # (descr, input keys or None,) in dependency order, see plan_computed
+        self._computed_inputs = {} # key -> input values at the last evaluation
+        self.computed_evaluated = 0 # value_function calls in the last cycle
+        self.computed_skipped = 0 # value_function calls skipped in the last cycle because their inputs did not change
         self.computedButtons = {}
+        self.unpolled = set() # keys of register sensors not polled because only disabled entities use them, see plan_enabled
+        self._registry_unsub = None
         self.sensorEntities = {} # all sensor entities, indexed by key
         self.numberEntities = {} # all number entities, indexed by key
         #self.preventSensors = {} # sensors with prevent_update = True
@@ -227,83 +537,526 @@ class SolaXModbusHub:
         self.sleepzero = [] # sensors that will be set to zero in sleepmode
         self.sleepnone = [] # sensors that will be cleared in sleepmode
         self.writequeue = {} # queue requests when inverter is in sleep mode
+        self._pending_writes = {} # (unit, address,) -> (payload, multi, futures,) collected during WRITE_COALESCE_WINDOW
+        self._write_flush = None # task sending the pending writes
+        self._flush_lock = asyncio.Lock() # one flush writes at a time, so writes to the same register cannot overtake each other
+        self.write_requests = 0 # register writes requested through the write queue
+        self.write_frames = 0 # modbus frames used to send them
+        self._key_blocks = {} # key -> (block, typ,) holding the sensor that reads the key back
+        self._readback_pending = set() # (typ, block start,) of the scheduled read-backs
+        self._readback_last = {} # (typ, block start,) -> time of the last read-back
+        self.readbacks = 0 # number of read-backs done
         _LOGGER.debug(f"{self.name}: ready to call plugin to determine inverter type")
-        self.plugin = plugin.plugin_instance #getPlugin(name).plugin_instance
+        self.plugin = plugin.plugin_instance.hubContext() #getPlugin(name).plugin_instance
         self.wakeupButton = None
-        self._invertertype = self.plugin.determineInverterType(self, config)
+        self._config = config
+        self._entry_id = entry_id
+        self._identity_store = identity_store
+        self._identity_next = None # time at which the cached identity is re-probed, None when confirmed by a probe
+        self._serial_probed = None # serial number set by the last determineInverterType call
+        if identity: # restored from cache: no probing, setup completes even when the inverter sleeps
+            self._seriesnumber = identity["seriesnumber"]
+            self._invertertype = self.plugin.restoreInverterType(self, identity["invertertype"])
+            self._identity_next = 0 # confirm after the first successful poll
+            _LOGGER.info(f"{self.name}: using cached identity {self._seriesnumber} type 0x{self._invertertype:x}")
+        else: self._invertertype = 0 # probed by async_identify before the platforms are set up
+        if any((getattr(descr, 'poll_tier', None) == POLL_REALTIME) for descr in self.plugin.SENSOR_TYPES): # tick at the fastest tier interval
+            self._scan_interval = timedelta(seconds=self._tier_intervals[POLL_REALTIME])
         self._lastts = 0  # timestamp of last polling cycle
         self.localsUpdated = False
-        self.localsLoaded = False
+        self.localsLoaded = False # True once the plugin has seen the restored local data, see treat_computed
         _LOGGER.debug("solax modbushub done %s", self.__dict__)
 
 
     # save and load local data entity values to make them persistent
-    DATAFORMAT_VERSION = 1
+    DATAFORMAT_VERSION = 1 # of the legacy <name>_data.json file
+
+    @callback
+    def async_save_local_data(self):
+        """ schedule a debounced write of the local data entity values right when an entity changes one, also while no polling cycle runs (asleep, offline)
+            localsUpdated stays set, so the next cycle still runs the plugin's localDataCallback """
+        self._locals.update({ desc: self.data.get(desc) for desc in self.writeLocals })
+        self._locals_store.async_delay_save(lambda: dict(self._locals), LOCALDATA_SAVE_DELAY)
 
     def saveLocalData(self):
-        tosave = { '_version': self.DATAFORMAT_VERSION }
-        for desc in self.writeLocals:  tosave[desc] = self.data.get(desc) 
-        with open(self._hass.config.path(f'{self.name}_data.json'), 'w') as fp: json.dump(tosave, fp)
+        """ schedule a debounced write of the local data entity values once the polling cycle has handled them """
+        self.async_save_local_data()
         self.localsUpdated = False
-        _LOGGER.info(f"saved modified persistent date: {tosave}")
-
-    def loadLocalData(self):
-        try: fp = open(self._hass.config.path(f'{self.name}_data.json'))
-        except:
-            if self.cyclecount > 5: 
-                _LOGGER.info(f"no local data file found after 5 tries - is this a first time run? or didnt you modify any DATA_LOCAL entity?")
-                self.localsLoaded=True  # retry a couple of polling cycles - then assume non-existent"
-        else: 
-            loaded = json.load(fp)
-            if loaded.get('_version') == self.DATAFORMAT_VERSION:
-                for desc in self.writeLocals: self.data[desc] = loaded.get(desc)
-            else: _LOGGER.warning(f"local persistent data lost - please reinitialize {self.writeLocals.keys()}")
-            fp.close()
-            self.localsLoaded = True
-            self.plugin.localDataCallback(self)
+        _LOGGER.info(f"saving modified persistent data: {self._locals}")
+
+    def loadLegacyLocalData(self):
+        """ values of the <name>_data.json file written by earlier versions, None if there is none """
+        try: 
+            with open(self._hass.config.path(f'{self.name}_data.json')) as fp: loaded = json.load(fp)
+        except FileNotFoundError: return None
+        except Exception as ex:
+            _LOGGER.warning(f"{self.name}: cannot read local data file {self.name}_data.json: {ex}")
+            return None
+        if loaded.get('_version') != self.DATAFORMAT_VERSION:
+            _LOGGER.warning(f"local persistent data lost - please reinitialize {list(loaded.keys())}")
+            return None
+        loaded.pop('_version')
+        return loaded
+
+    async def async_load_local_data(self):
+        """ restore the local data entity values before the first poll; the legacy json file is migrated to the store once """
+        stored = await self._locals_store.async_load()
+        if stored == None: 
+            stored = await self._hass.async_add_executor_job(self.loadLegacyLocalData)
+            if stored != None:
+                _LOGGER.info(f"{self.name}: migrating {self.name}_data.json to the storage of this integration")
+                self._locals_store.async_delay_save(lambda: dict(self._locals), 0)
+        self._locals = stored or {}
+        for (key, value,) in self._locals.items():
+            if value != None: self.data[key] = value
+
+    # learned hole maps, stored per serial number as unreadable registers depend on the firmware
+
+    async def async_load_holes(self):
+        self._holes_all = await self._holes_store.async_load() or {}
+        stored = self._holes_all.get(self.seriesnumber, {})
+        self.holes = { typ: [ tuple(h[:2]) for h in stored.get(typ, []) ] for typ in ('holding', 'input',) }
+        # [start, end, learned] entries; earlier versions stored [start, end], age those from now
+        self._holes_learned = { (typ, h[0], h[1],): (h[2] if len(h) > 2 else time()) for typ in ('holding', 'input',) for h in stored.get(typ, []) }
+        if stored: _LOGGER.info(f"{self.name}: loaded unreadable register ranges for {self.seriesnumber}: {self.holes}")
+
+    def save_holes(self):
+        self._holes_all[self.seriesnumber] = { typ: [ [s, e, self._holes_learned.get((typ, s, e,), time())] for (s, e,) in self.holes[typ] ] for typ in self.holes }
+        self._holes_store.async_delay_save(lambda: self._holes_all, HOLES_SAVE_DELAY)
+
+    def expire_holes(self):
+        """ forget the holes learned more than HOLES_MAX_AGE ago and replan, so registers that became readable are polled again """
+        oldest = time() - HOLES_MAX_AGE
+        expired = { typ: [ h for h in self.holes[typ] if self._holes_learned.get((typ,) + h, 0) < oldest ] for typ in self.holes }
+        if not any(expired.values()): return
+        for typ in self.holes:
+            self.holes[typ] = [ h for h in self.holes[typ] if h not in expired[typ] ]
+            for h in expired[typ]: self._holes_learned.pop((typ,) + h, None)
+        _LOGGER.info(f"{self.name}: checking again unreadable register ranges learned more than {HOLES_MAX_AGE // 86400} days ago: {expired}")
+        self.save_holes()
+        self.plan_blocks()
+
+    def save_identity(self):
+        if (not self._identity_store) or (self._serial_probed in (None, 'unknown',)): return # nothing detected, probe again next start
+        self._identity_store.async_delay_save(lambda: { "options": dict(self._config), "seriesnumber": self.seriesnumber, "invertertype": self._invertertype, }, 0)
+
+    async def async_probe_identity(self):
+        """ run the plugin's determineInverterType in the executor while holding the bus, so neither this hub nor the hubs sharing the connection
+            poll during the probe; returns the inverter type, _serial_probed tells if the serial number was read """
+        self._serial_probed = None
+        async with self._async_lock:
+            if self._async_client: self._async_client.close() # the probe uses the blocking client
+            try: return await self._hass.async_add_executor_job(self.plugin.determineInverterType, self, self._config)
+            finally: 
+                if self._async_client: self._client.close() # release the probe connection, many dongles accept only one connection
+
+    async def async_identify(self):
+        """ first start, or options changed: nothing cached, probe the identity before the entities are selected """
+        self._invertertype = await self.async_probe_identity()
+        self.save_identity()
+
+    async def async_confirm_identity(self):
+        """ re-probe the identity restored from cache in the background; reload the entry if the inverter changed """
+        self._identity_next = time() + POLL_SLOW_INTERVAL # retry later if the inverter does not answer
+        cached = (self._seriesnumber, self._invertertype,)
+        invertertype = await self.async_probe_identity()
+        if self._serial_probed in (None, 'unknown',):
+            _LOGGER.info(f"{self.name}: could not confirm cached identity {cached[0]}, retrying later")
+            self._seriesnumber = cached[0]
+            return
+        self._identity_next = None
+        if (self._seriesnumber, invertertype,) == cached: 
+            _LOGGER.info(f"{self.name}: cached identity {cached[0]} confirmed")
+            return
+        _LOGGER.warning(f"{self.name}: inverter identity changed from {cached[0]} type 0x{cached[1]:x} to {self._seriesnumber} type 0x{invertertype:x}, reloading")
+        self._invertertype = invertertype
+        self.save_identity()
+        if self._entry_id: self._hass.async_create_task(self._hass.config_entries.async_reload(self._entry_id))
 
     # end of save and load section
 
     @callback
-    def async_add_solax_modbus_sensor(self, update_callback):
-        """Listen for data updates."""
+    def async_add_solax_modbus_sensor(self, update_callback, key = None):
+        """Listen for data updates. Callbacks with a key are only called when hub.data[key] changes."""
         # This is the first sensor, set up interval.
         if not self._sensor_callbacks:
-            self.connect()
+            self._bus.active.add(self.name)
+            if self._async_client: self._hass.async_create_task(self.async_connect())
+            else: self.connect()
             self._unsub_interval_method = async_track_time_interval(
                 self._hass, self.async_refresh_modbus_data, self._scan_interval
             )
         self._sensor_callbacks.append(update_callback)
+        if key != None: self._key_callbacks.setdefault(key, []).append(update_callback)
+        else: self._plain_callbacks.append(update_callback)
 
 
     @callback
-    def async_remove_solax_modbus_sensor(self, update_callback):
+    def async_remove_solax_modbus_sensor(self, update_callback, key = None):
         """Remove data update."""
         self._sensor_callbacks.remove(update_callback)
+        if key != None: 
+            self._key_callbacks[key].remove(update_callback)
+            if not self._key_callbacks[key]: self._key_callbacks.pop(key)
+        else: self._plain_callbacks.remove(update_callback)
 
         if not self._sensor_callbacks:
             """stop the interval timer upon removal of last sensor"""
             self._unsub_interval_method()
             self._unsub_interval_method = None
-            self.close()
+            self._bus.active.discard(self.name)
+            if self._bus.active: pass # other hubs still poll over this connection
+            elif self._async_client: self._hass.async_create_task(self.async_close())
+            else: self.close()
+
+    def bus_statistics(self):
+        """ usage of the (possibly shared) modbus connection by this hub and the hubs sharing it """
+        stats = self._bus.statistics()
+        return { "connection": self._bus.key, "hub": stats.get(self.name), "shared_with": { n: v for (n, v,) in stats.items() if n != self.name }, }
+
+    def due_tiers(self):
+        """ return the polling tiers that must be read in this cycle; POLL_NORMAL also drives the computed sensors """
+        now = time()
+        used = { block.tier for block in self.holdingBlocks } | { block.tier for block in self.inputBlocks } | { POLL_NORMAL }
+        return { tier for tier in used if now >= self._tier_next.get(tier, 0) }
+
+    def tiers_done(self, tiers, ok):
+        """ schedule the next read of the tiers read in this cycle, or read all tiers after a failed cycle (e.g. wakeup) """
+        if not ok: 
+            self._tier_next = {}
+            return
+        now = time()
+        margin = self._scan_interval.total_seconds() / 2 # tolerate timer jitter
+        for tier in tiers: self._tier_next[tier] = now + self._tier_intervals[tier] - margin
 
     async def async_refresh_modbus_data(self, _now: Optional[int] = None) -> None:
         """Time to update."""
-        self.cyclecount = self.cyclecount+1
         if not self._sensor_callbacks:
             return
-        if (self.cyclecount % self.slowdown) == 0: # only execute once every slowdown count
-            update_result = self.read_modbus_data()
-            if update_result:
-                self.slowdown = 1 # return to full polling after succesfull cycle
-                for update_callback in self._sensor_callbacks:
-                    update_callback()
+        if self._cycle_busy: # previous cycle still waiting for the inverter
+            _LOGGER.debug(f"{self.name}: previous polling cycle still in progress - skipping this cycle")
+            return
+        if time() < self._next_attempt: return # backing off
+        if self.state in (STATE_ASLEEP, STATE_OFFLINE,): # probe with a single register before attempting a full scan
+            self._cycle_busy = True
+            try: awake = await self.async_probe()
+            finally: self._cycle_busy = False
+            if not awake: 
+                self.set_state(STATE_OFFLINE if self._connect_failed else STATE_ASLEEP)
+                return
+            self._tier_next = {} # read everything right away
+        if not self.due_tiers(): return # no tier due in this tick
+        self.cyclecount = self.cyclecount+1
+        self._responded = False
+        self._connect_failed = False
+        self._cycle_busy = True
+        t0 = monotonic()
+        try:
+            if self._async_client: update_result = await self.async_read_modbus_data()
+            else: update_result = self.read_modbus_data()
+        finally: self._cycle_busy = False
+        self.cycle_stats.add((monotonic() - t0) * 1000)
+        if update_result:
+            self.set_state(STATE_ONLINE)
+            self.async_notify_changed()
+            self.expire_holes()
+            if (self._identity_next != None) and (time() >= self._identity_next): self._hass.async_create_task(self.async_confirm_identity())
+            if time() >= self._bus_report_next:
+                self._bus_report_next = time() + POLL_STATIC_INTERVAL
+                _LOGGER.info(f"{self.name}: modbus connection {self._bus.key} usage {self.bus_statistics()}, write latency {self.write_latency()}")
+        else: 
+            if self._responded: self.set_state(STATE_DEGRADED)
+            elif self._connect_failed: self.set_state(STATE_OFFLINE)
+            else: self.set_state(STATE_ASLEEP)
+            for i in self.sleepnone: self.data.pop(i, None)
+            for i in self.sleepzero: self.data[i] = 0
+            # self.data = {} # invalidate data - do we want this ??
+        if self.recorder: await self._hass.async_add_executor_job(self.recorder.flush)
+
+    # connection state section
+
+    def set_state(self, state):
+        """ record the outcome of a cycle or probe; schedules the next attempt with exponential backoff and jitter when not online """
+        if state == STATE_ONLINE:
+            self._failures = 0
+            self._next_attempt = 0
+        else:
+            self._failures += 1
+            delay = min(BACKOFF_MAX, self._scan_interval.total_seconds() * 2**(self._failures - 1))
+            self._next_attempt = time() + delay * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        if state != self.state:
+            _LOGGER.info(f"{self.name}: connection state {self.state} -> {state} after {time() - self.state_since:.0f} s")
+            self.state = state
+            self.state_since = time()
+
+    def note_response(self, response, ex = None):
+        """ classify a request outcome for the connection state: answered (even with an exception response), or no connection """
+        if (response != None) and (isinstance(response, ExceptionResponse) or not response.isError()): self._responded = True
+        if isinstance(ex, ConnectionException): self._connect_failed = True
+
+    async def async_probe(self):
+        """ read a single register of the first block; True if the device answers again, even with an exception response
+            (some devices refuse reads of a part of a block), the full scan that follows tells online from degraded """
+        blocks = [ (b, 'holding',) for b in self.holdingBlocks ] + [ (b, 'input',) for b in self.inputBlocks ]
+        if not blocks: return True
+        (blk, typ,) = blocks[0]
+        self._connect_failed = False
+        response = None
+        try:
+            if self._async_client: 
+                reader = self.async_read_input_registers if typ == 'input' else self.async_read_holding_registers
+                response = await reader(unit=self._modbus_addr, address=blk.start, count=1)
             else: 
-                _LOGGER.debug(f"assuming sleep mode - slowing down by factor 10")
-                self.slowdown = 10
-                for i in self.sleepnone: self.data.pop(i, None)
-                for i in self.sleepzero: self.data[i] = 0
-                # self.data = {} # invalidate data - do we want this ??
+                reader = self.read_input_registers if typ == 'input' else self.read_holding_registers
+                response = reader(unit=self._modbus_addr, address=blk.start, count=1)
+        except Exception as ex: 
+            self.note_response(None, ex)
+            return False
+        self.note_response(response)
+        return isinstance(response, ExceptionResponse) or not response.isError()
+
+    # end of connection state section
+
+    # block planning section
+
+    def gap_limit(self):
+        """ largest number of unused registers that costs less to read than an additional request """
+        return int(self.request_overhead / self.register_cost)
+
+    def layout_cost(self, blocks):
+        return sum(self.request_overhead + (b.end - b.start) * self.register_cost for b in blocks)
+
+    def plan_blocks(self):
+        """ (re)split the polled registers in blocks, bridging gaps only when that is cheaper than another request """
+        gap_limit = self.gap_limit()
+        holding = splitInBlocks(self.readableRegs(self.holdingRegs, 'holding'), self.plugin.block_size, self.plugin.auto_block_ignore_readerror, gap_limit, self.holes['holding'])
+        inputs  = splitInBlocks(self.readableRegs(self.inputRegs, 'input'), self.plugin.block_size, self.plugin.auto_block_ignore_readerror, gap_limit, self.holes['input'])
+        for i in holding + inputs: compileBlock(i, self.plugin.order16, self.plugin.order32)
+        oldblocks = self.holdingBlocks + self.inputBlocks
+        if oldblocks: 
+            _LOGGER.info(f"{self.name}: replanned blocks with overhead {self.request_overhead*1000:.1f} ms/request and {self.register_cost*1000:.3f} ms/register: "
+                         f"{len(holding) + len(inputs)} requests, estimated {self.layout_cost(holding + inputs)*1000:.0f} ms per full scan "
+                         f"(was {len(oldblocks)} requests, {self.layout_cost(oldblocks)*1000:.0f} ms)")
+        self.holdingBlocks = holding
+        self.inputBlocks = inputs
+        planned = { ('holding', b.start, b.end,) for b in holding } | { ('input', b.start, b.end,) for b in inputs }
+        self.block_stats = { k: v for (k, v,) in self.block_stats.items() if k in planned }
+        self._key_blocks = {}
+        for (typ, blocks,) in (('holding', holding,), ('input', inputs,),):
+            for b in blocks:
+                for reg in b.regs:
+                    descr = b.descriptions[reg]
+                    for d in (descr.values() if type(descr) is dict else (descr,)): self._key_blocks.setdefault(d.key, (b, typ,))
+        self.block_layout = {
+            "request_overhead_ms": round(self.request_overhead * 1000, 2),
+            "register_cost_ms": round(self.register_cost * 1000, 4),
+            "gap_limit": gap_limit,
+            "measured": self._model_measured,
+            "holes": { typ: [ (f"0x{s:x}", f"0x{e:x}",) for (s, e,) in self.holes[typ] ] for typ in self.holes },
+            "estimated_scan_ms": round(self.layout_cost(holding + inputs) * 1000, 1),
+            "holding": [ (f"0x{b.start:x}", f"0x{b.end:x}", b.tier,) for b in holding ],
+            "input": [ (f"0x{b.start:x}", f"0x{b.end:x}", b.tier,) for b in inputs ],
+        }
+        _LOGGER.info(f"{self.name}: planned block layout {self.block_layout}")
+
+    def plan_enabled(self):
+        """ determine the register sensors that only disabled entities use; replan the blocks without them when that set changed
+            a value_function without declared inputs (see value_inputs) might read any key, nothing is left out then """
+        if not self._registry_unsub: self._registry_unsub = self._hass.bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_registry_updated)
+        registry = er.async_get(self._hass)
+        def enabled(domain, descr):
+            entity_id = registry.async_get_entity_id(domain, DOMAIN, f"{self._name}_{descr.key}")
+            entry = registry.async_get(entity_id) if entity_id else None
+            return (not entry.disabled) if entry else (descr.entity_registry_enabled_default != False)
+        plugin = self.plugin
+        needed = set(plugin.poll_always)
+        undeclared = []
+        for (domain, descriptions,) in (('sensor', plugin.SENSOR_TYPES,), ('number', plugin.NUMBER_TYPES,), ('select', plugin.SELECT_TYPES,), ('button', plugin.BUTTON_TYPES,),):
+            for descr in plugin.selectEntities(descriptions, self._invertertype, self.seriesnumber):
+                active = enabled(domain, descr)
+                if active and (domain != 'button'): needed.add(descr.key)
+                function = descr.value_function if domain in ('sensor', 'button',) else None
+                if function and (active or ((domain == 'sensor') and (descr.register < 0))): # computed sensors run every cycle, enabled or not
+                    depends = getattr(descr, 'depends_on', None)
+                    if depends == None: depends = getattr(function, 'depends_on', None)
+                    if depends == None: undeclared.append(descr.key)
+                    else: needed.update(depends)
+        unpolled = set()
+        if undeclared: _LOGGER.info(f"{self.name}: polling registers of disabled entities, value functions without declared inputs: {undeclared}")
+        else:
+            for descr in list(self.holdingRegs.values()) + list(self.inputRegs.values()):
+                unpolled.update(d.key for d in (descr.values() if type(descr) is dict else (descr,)) if d.key not in needed)
+        if unpolled == self.unpolled: return
+        self.unpolled = unpolled
+        _LOGGER.info(f"{self.name}: not polling {len(unpolled)} registers of disabled entities")
+        if self.holdingBlocks or self.inputBlocks: self.plan_blocks()
+
+    @callback
+    def _async_registry_updated(self, event):
+        """ replan when one of our entities was enabled or disabled """
+        if (event.data.get("action") != "update") or ("disabled_by" not in event.data.get("changes", {})): return
+        entry = er.async_get(self._hass).async_get(event.data["entity_id"])
+        if entry and (entry.config_entry_id == self._entry_id): self.plan_enabled()
+
+    def readableRegs(self, descriptions, typ):
+        """ the descriptions that do not overlap a learned hole and are used by an enabled entity; 
+            the unreadable ones get their static ignore_readerror value, if any """
+        if self.unpolled: 
+            descriptions = { reg: descr for (reg, descr,) in descriptions.items() 
+                             if any((d.key not in self.unpolled) for d in (descr.values() if type(descr) is dict else (descr,))) }
+        if not self.holes[typ]: return descriptions
+        readable = {}
+        for reg in descriptions:
+            descr = descriptions[reg]
+            if not inHole(reg, regEnd(reg, descr), self.holes[typ]): readable[reg] = descr
+            elif (not type(descr) is dict) and (descr.ignore_readerror != True) and (descr.ignore_readerror != False): self.data[descr.key] = descr.ignore_readerror
+        return readable
+
+    def update_link_model(self):
+        """ fit overhead + registers * register_cost to the measured block read times; replan when the gap limit moved a lot """
+        if len(self._rtt_samples) < LINK_MODEL_SAMPLES: return
+        n = len(self._rtt_samples)
+        mean_regs = sum(r for (r, t,) in self._rtt_samples) / n
+        mean_time = sum(t for (r, t,) in self._rtt_samples) / n
+        var_regs = sum((r - mean_regs)**2 for (r, t,) in self._rtt_samples)
+        if var_regs == 0: return # all blocks have the same size, cannot separate overhead from transfer time
+        register_cost = sum((r - mean_regs)*(t - mean_time) for (r, t,) in self._rtt_samples) / var_regs
+        register_cost = max(register_cost, 1e-6)
+        request_overhead = mean_time - register_cost * mean_regs
+        if request_overhead <= 0: return
+        old_gap_limit = self.gap_limit()
+        self.request_overhead = request_overhead
+        self.register_cost = register_cost
+        new_gap_limit = self.gap_limit()
+        if (not self._model_measured) or (new_gap_limit > 2*old_gap_limit) or (2*new_gap_limit < old_gap_limit): 
+            self._model_measured = True
+            self.plan_blocks()
+
+    def plan_computed(self, computed):
+        """ order the computed sensors so that each one runs after the computed sensors it reads (topological sort, declaration order otherwise) """
+        self.computedSensors = computed
+        self._computed_inputs = {}
+        inputs = {}
+        for (key, descr,) in computed.items():
+            depends = descr.depends_on if descr.depends_on != None else getattr(descr.value_function, 'depends_on', None)
+            inputs[key] = tuple(depends) if (depends != None) and not getattr(descr.value_function, 'volatile', False) else None
+        waiting = { key: { k for k in (inputs[key] or ()) if (k in computed) and (k != key) } for key in computed }
+        order = []
+        while waiting:
+            ready = [ key for key in waiting if not waiting[key] ] # dicts keep declaration order
+            if not ready: 
+                _LOGGER.warning(f"{self.name}: circular value_function inputs between {list(waiting)}, using declaration order")
+                ready = list(waiting)
+            for key in ready: 
+                waiting.pop(key)
+                order.append(key)
+            for deps in waiting.values(): deps.difference_update(ready)
+        self._computed_order = [ (computed[key], inputs[key],) for key in order ]
+        _LOGGER.debug(f"{self.name}: computed sensor order {order}")
+
+    # end of block planning section
+
+    # read-back after writes
+
+    def schedule_readback(self, key, address = None):
+        """ re-read the block holding the sensor of key (or else the holding block containing address) shortly after a write
+            a block is read back at most once per READBACK_COOLDOWN seconds """
+        target = self._key_blocks.get(key)
+        if (target == None) and (address != None): target = next(((b, 'holding',) for b in self.holdingBlocks if b.start <= address < b.end), None)
+        if (target == None) or (self.state != STATE_ONLINE): return
+        (blk, typ,) = target
+        ident = (typ, blk.start,)
+        if ident in self._readback_pending: return # already scheduled, will see this write too
+        self._readback_pending.add(ident)
+        delay = max(READBACK_DELAY, self._readback_last.get(ident, 0) + READBACK_COOLDOWN - time())
+        self._hass.async_create_task(self._async_readback(blk, typ, ident, delay))
+
+    async def _async_readback(self, blk, typ, ident, delay):
+        await asyncio.sleep(delay)
+        self._readback_pending.discard(ident)
+        self._readback_last[ident] = time()
+        if self._async_client: ok = await self.async_read_modbus_block(blk, typ)
+        else: ok = self.read_modbus_block(blk, typ)
+        self.readbacks += 1
+        read = self.block_captured.get(ident)
+        if ok and read: # newer than the block in a cycle buffer captured before the write
+            for reg in blk.regs:
+                descr = blk.descriptions[reg]
+                for d in (descr.values() if type(descr) is dict else (descr,)): self._key_fresh[d.key] = max(read, self._key_fresh.get(d.key, 0))
+        if ok: self.async_notify_changed()
+
+    # end of read-back section
+
+    # modbus proxy support, see proxy.py
+
+    def bus_hubs(self):
+        """ the hubs sharing this hub's modbus connection, including this one """
+        return [ entry["hub"] for (name, entry,) in self._hass.data.get(DOMAIN, {}).items() if (name in self._bus.owners) and isinstance(entry, dict) and ("hub" in entry) ]
+
+    def cached_registers(self, typ, address, count, max_age):
+        """ the polled raw values of count registers at address if all of them were read in the last max_age seconds, else None """
+        if self.raw_registers == None: return None # hub without proxy, keeps no raw values
+        cache = self.raw_registers[typ]
+        oldest = time() - max_age
+        values = []
+        for reg in range(address, address + count):
+            entry = cache.get(reg)
+            if (entry == None) or (entry[1] < oldest): return None
+            values.append(entry[0])
+        return values
+
+    async def async_forward_read(self, typ, address, count):
+        """ read for a proxy client at normal polling priority """
+        if self._async_client:
+            reader = self.async_read_input_registers if typ == 'input' else self.async_read_holding_registers
+            return await reader(self._modbus_addr, address, count)
+        reader = self.read_input_registers if typ == 'input' else self.read_holding_registers
+        return await self._hass.async_add_executor_job(reader, self._modbus_addr, address, count)
+
+    async def async_forward_write(self, address, values, multi):
+        """ write raw register values for a proxy client at write priority; cached copies are dropped and the block is read back """
+        if self.raw_registers != None:
+            for reg in range(address, address + len(values)): self.raw_registers['holding'].pop(reg, None)
+        kwargs = {'slave': self._modbus_addr} if self._modbus_addr else {}
+        t0 = monotonic()
+        try:
+            if self._async_client:
+                async with self._write_lock:
+                    if not self._async_client.connected: await self._async_client.connect()
+                    if multi: response = await self._async_client.write_registers(address, values, **kwargs)
+                    else: response = await self._async_client.write_register(address, values[0], **kwargs)
+            else:
+                def write():
+                    with self._lock: 
+                        if multi: return self._client.write_registers(address, values, **kwargs)
+                        return self._client.write_register(address, values[0], **kwargs)
+                response = await self._hass.async_add_executor_job(write)
+        finally: self._write_latency.append(monotonic() - t0)
+        self.schedule_readback(None, address)
+        return response
+
+    # end of modbus proxy section
+
+    @callback
+    def async_notify_changed(self):
+        """ call the update callbacks of the entities whose value changed since their last notification """
+        force = self._force_notify
+        self._force_notify = False
+        sent = 0
+        for (key, callbacks,) in self._key_callbacks.items():
+            val = self.data.get(key, _UNSET)
+            prev = self._published.get(key, _UNSET)
+            # prevent_update numbers switch back to hub.data when their tmpdata expires, so keep them refreshed
+            if force or self.tmpdata_expiry.get(key) or (type(val) is not type(prev)) or (val != prev):
+                self._published[key] = val
+                for update_callback in callbacks: update_callback()
+                sent += len(callbacks)
+            else: self.notify_suppressed += len(callbacks)
+        for update_callback in self._plain_callbacks: 
+            update_callback()
+            sent += 1
+        self.notify_sent += sent
+        if self.cyclecount < 5: _LOGGER.debug(f"{self.name}: notified {sent} entities, suppressed {self.notify_suppressed} notifications so far")
 
     @property
     def invertertype(self):
@@ -320,6 +1073,7 @@ class SolaXModbusHub:
     @seriesnumber.setter
     def seriesnumber(self, nr):
         self._seriesnumber = nr
+        self._serial_probed = nr
 
     @property
     def name(self):
@@ -336,28 +1090,180 @@ class SolaXModbusHub:
         with self._lock:
             self._client.connect()
 
+    async def async_close(self):
+        """Disconnect asyncio client."""
+        async with self._async_lock:
+            self._async_client.close()
+
+    async def async_connect(self):
+        """Connect asyncio client."""
+        async with self._async_lock:
+            await self._async_client.connect()
 
-    def read_holding_registers(self, unit, address, count):
-        """Read holding registers."""
+
+    def read_holding_registers(self, unit, address, count, timing = None):
+        """Read holding registers; timing, if a list, gets the seconds the request took once the bus was held."""
         with self._lock:
             kwargs = {'slave': unit} if unit else {}
-            return self._client.read_holding_registers(address, count, **kwargs)
+            t0 = monotonic()
+            try: response = self._client.read_holding_registers(address, count, **kwargs)
+            finally:
+                if timing != None: timing.append(monotonic() - t0)
+        if self.recorder: self.recorder.record(3, address, count, response)
+        return response
     
-    def read_input_registers(self, unit, address, count):
-        """Read input registers."""
+    def read_input_registers(self, unit, address, count, timing = None):
+        """Read input registers; timing, if a list, gets the seconds the request took once the bus was held."""
         with self._lock:
             kwargs = {'slave': unit} if unit else {}
-            return self._client.read_input_registers(address, count, **kwargs)
+            t0 = monotonic()
+            try: response = self._client.read_input_registers(address, count, **kwargs)
+            finally:
+                if timing != None: timing.append(monotonic() - t0)
+        if self.recorder: self.recorder.record(4, address, count, response)
+        return response
 
-    def _lowlevel_write_register(self, unit, address, payload):
-        with self._lock:
+    async def async_read_holding_registers(self, unit, address, count, tier = POLL_NORMAL, timing = None):
+        """Read holding registers without blocking the event loop; tier sets the bus priority, timing as in read_holding_registers."""
+        async with self._read_locks[tier]:
             kwargs = {'slave': unit} if unit else {}
-            #builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.BIG)
-            builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
-            builder.reset()
-            builder.add_16bit_int(payload)
-            payload = builder.to_registers()
-            return self._client.write_register(address, payload[0], **kwargs)
+            if not self._async_client.connected: await self._async_client.connect()
+            t0 = monotonic()
+            try: response = await self._async_client.read_holding_registers(address, count, **kwargs)
+            finally:
+                if timing != None: timing.append(monotonic() - t0)
+        if self.recorder: self.recorder.record(3, address, count, response)
+        return response
+
+    async def async_read_input_registers(self, unit, address, count, tier = POLL_NORMAL, timing = None):
+        """Read input registers without blocking the event loop; tier sets the bus priority, timing as in read_input_registers."""
+        async with self._read_locks[tier]:
+            kwargs = {'slave': unit} if unit else {}
+            if not self._async_client.connected: await self._async_client.connect()
+            t0 = monotonic()
+            try: response = await self._async_client.read_input_registers(address, count, **kwargs)
+            finally:
+                if timing != None: timing.append(monotonic() - t0)
+        if self.recorder: self.recorder.record(4, address, count, response)
+        return response
+
+    def _encode_16bit(self, payload):
+        builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
+        builder.reset()
+        builder.add_16bit_int(payload)
+        return builder.to_registers()
+
+    def _encode_multi(self, payload):
+        """ convert a list of (key or REGISTER_xx type, value,) tuples to a list of register values - see write_registers_multi """
+        builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
+        builder.reset()
+        for (key, value,) in payload:
+            if key.startswith("_"): 
+                typ = key 
+                value = int(value)
+            else:    
+                descr = self.writeLocals[key]
+                if hasattr(descr, 'reverse_option_dict'): value = descr.reverse_option_dict[value] # string to int
+                elif callable(descr.scale):  # function to call ?
+                    value = descr.scale(value, descr, self.data) 
+                else: # apply simple numeric scaling and rounding if not a list of words
+                    try:    value = value*descr.scale
+                    except: _LOGGER.error(f"cannot treat payload scale {value} {descr}")
+                value = int(value)
+                typ = descr.unit
+            if   typ == REGISTER_U16: builder.add_16bit_uint(value)
+            elif typ == REGISTER_S16: builder.add_16bit_int(value)
+            elif typ == REGISTER_U32: builder.add_32bit_uint(value)
+            elif typ == REGISTER_S32: builder.add_32bit_int(value)
+            else: _LOGGER.error(f"unsupported unit type: {typ} for {key}")
+        return builder.to_registers()
+
+    def _lowlevel_write_register(self, unit, address, payload):
+        t0 = monotonic()
+        try:
+            with self._lock:
+                kwargs = {'slave': unit} if unit else {}
+                payload = self._encode_16bit(payload)
+                return self._client.write_register(address, payload[0], **kwargs)
+        finally: self._write_latency.append(monotonic() - t0)
+
+    async def _async_lowlevel_write_register(self, unit, address, payload):
+        return await self.async_queue_write(unit, address, payload, False)
+
+    # write queue: writes arriving within WRITE_COALESCE_WINDOW are sent together, adjacent registers in one write_registers frame
+
+    async def async_queue_write(self, unit, address, payload, multi):
+        """ write one 16 bit register through the write queue; multi is True if write_registers (function 16) may be used
+            a later write to the same register within the window replaces the earlier one; returns the modbus response """
+        future = asyncio.get_running_loop().create_future()
+        (oldpayload, oldmulti, futures,) = self._pending_writes.get((unit, address,), (None, True, [],))
+        self._pending_writes[(unit, address,)] = (payload, multi and oldmulti, futures + [future],)
+        if self._write_flush == None: self._write_flush = self._hass.async_create_task(self._async_flush_writes())
+        t0 = monotonic()
+        try: return await future
+        finally: self._write_latency.append(monotonic() - t0)
+
+    def write_latency(self):
+        """ write to acknowledge latency of the recent writes in ms, queued or direct, asyncio or blocking """
+        if not self._write_latency: return None
+        latencies = sorted(self._write_latency)
+        return { "writes": len(latencies), "last_ms": round(self._write_latency[-1] * 1000, 1), "median_ms": round(latencies[len(latencies) // 2] * 1000, 1), "max_ms": round(latencies[-1] * 1000, 1), }
+
+    async def _async_flush_writes(self):
+        await asyncio.sleep(WRITE_COALESCE_WINDOW)
+        async with self._flush_lock: # writes arriving meanwhile join this flush, or start the next one that waits for it
+            await self._async_flush_pending()
+
+    async def _async_flush_pending(self):
+        pending = self._pending_writes
+        self._pending_writes = {}
+        self._write_flush = None
+        runs = [] # lists of (unit, address, payload, multi, mergeable, futures,) entries with consecutive addresses
+        for (unit, address,) in sorted(pending):
+            (payload, multi, futures,) = pending[(unit, address,)]
+            mergeable = multi or self.plugin.write_merge_single
+            if runs: 
+                last = runs[-1][-1]
+                if mergeable and last[4] and (last[0] == unit) and (last[1] + 1 == address) and (len(runs[-1]) < self.plugin.write_merge_limit):
+                    runs[-1].append((unit, address, payload, multi, mergeable, futures,))
+                    continue
+            runs.append([ (unit, address, payload, multi, mergeable, futures,) ])
+        requests = sum(len(e[5]) for run in runs for e in run)
+        frames = 0
+        for run in runs:
+            if len(run) > 1:
+                frames += 1
+                (response, ex,) = await self._async_write_frame(run[0][0], run[0][1], [ e[2] for e in run ], True)
+                if (ex == None) and not response.isError():
+                    for e in run: self._resolve_writes(e[5], response, None)
+                    continue
+                _LOGGER.info(f"{self.name}: merged write at 0x{run[0][1]:x} refused ({ex or response}), writing the {len(run)} registers one by one")
+            for (unit, address, payload, multi, mergeable, futures,) in run:
+                frames += 1
+                (response, ex,) = await self._async_write_frame(unit, address, [payload], multi)
+                self._resolve_writes(futures, response, ex)
+        self.write_requests += requests
+        self.write_frames += frames
+        if frames < requests: _LOGGER.debug(f"{self.name}: sent {requests} register writes in {frames} frames, {self.write_requests - self.write_frames} frames saved in total")
+
+    def _resolve_writes(self, futures, response, ex):
+        for future in futures:
+            if future.done(): continue
+            if ex != None: future.set_exception(ex)
+            else: future.set_result(response)
+
+    async def _async_write_frame(self, unit, address, payloads, multi):
+        """ returns (response, exception,) """
+        try:
+            async with self._write_lock:
+                kwargs = {'slave': unit} if unit else {}
+                registers = [ self._encode_16bit(payload)[0] for payload in payloads ]
+                if not self._async_client.connected: await self._async_client.connect()
+                if multi: return (await self._async_client.write_registers(address, registers, **kwargs), None,)
+                return (await self._async_client.write_register(address, registers[0], **kwargs), None,)
+        except Exception as ex: return (None, ex,)
+
+    # end of write queue
 
     def write_register(self, unit, address, payload):
         """Write register."""
@@ -375,16 +1281,38 @@ class SolaXModbusHub:
                 return self._lowlevel_write_register(unit=self._modbus_addr, address=self.wakeupButton.register, payload=self.wakeupButton.command)
             else: _LOGGER.warning("cannot wakeup inverter: no awake button found")
             return res
+
+    async def async_write_register(self, unit, address, payload):
+        """Write register - asyncio variant of write_register, uses the blocking client as fallback."""
+        if not self._async_client: return self.write_register(unit, address, payload)
+        awake = self.plugin.isAwake(self.data)
+        if awake: return await self._async_lowlevel_write_register(unit, address, payload)
+        else:
+            # try to write anyway - could be a command that inverter responds to while asleep
+            res = await self._async_lowlevel_write_register(unit, address, payload)
+            # put request in queue, in order to repeat it when inverter wakes up
+            self.writequeue[address] = payload
+            # wake up inverter
+            if self.wakeupButton:
+                _LOGGER.info("waking up inverter: pressing awake button")
+                return await self._async_lowlevel_write_register(unit=self._modbus_addr, address=self.wakeupButton.register, payload=self.wakeupButton.command)
+            else: _LOGGER.warning("cannot wakeup inverter: no awake button found")
+            return res
     
     def write_registers_single(self, unit, address, payload): # Needs adapting for regiater que
         """Write registers multi, but write only one register of type 16bit"""
-        with self._lock:
-            kwargs = {'slave': unit} if unit else {}
-            builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
-            builder.reset()
-            builder.add_16bit_int(payload)
-            payload = builder.to_registers()
-            return self._client.write_registers(address, payload, **kwargs)
+        t0 = monotonic()
+        try:
+            with self._lock:
+                kwargs = {'slave': unit} if unit else {}
+                payload = self._encode_16bit(payload)
+                return self._client.write_registers(address, payload, **kwargs)
+        finally: self._write_latency.append(monotonic() - t0)
+
+    async def async_write_registers_single(self, unit, address, payload):
+        """Write registers multi, but write only one register of type 16bit - asyncio variant"""
+        if not self._async_client: return self.write_registers_single(unit, address, payload)
+        return await self.async_queue_write(unit, address, payload, True)
 
     def write_registers_multi(self, unit, address, payload): # Needs adapting for regiater que
         """Write registers multi.
@@ -398,37 +1326,34 @@ class SolaXModbusHub:
         All register descriptions referenced in the payload must be consecutive (without leaving holes)
         32bit integers will be converted to 2 modbus register values according to the endian strategy of the plugin
         """
-        with self._lock:
-            kwargs = {'slave': unit} if unit else {}
-            builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
-            builder.reset()
-            if isinstance(payload, list):
-                for (key, value,) in payload:
-                    if key.startswith("_"): 
-                        typ = key 
-                        value = int(value)
-                    else:    
-                        descr = self.writeLocals[key]
-                        if hasattr(descr, 'reverse_option_dict'): value = descr.reverse_option_dict[value] # string to int
-                        elif callable(descr.scale):  # function to call ?
-                            value = descr.scale(value, descr, self.data) 
-                        else: # apply simple numeric scaling and rounding if not a list of words
-                            try:    value = value*descr.scale
-                            except: _LOGGER.error(f"cannot treat payload scale {value} {descr}")
-                        value = int(value)
-                        typ = descr.unit
-                    if   typ == REGISTER_U16: builder.add_16bit_uint(value)
-                    elif typ == REGISTER_S16: builder.add_16bit_int(value)
-                    elif typ == REGISTER_U32: builder.add_32bit_uint(value)
-                    elif typ == REGISTER_S32: builder.add_32bit_int(value)
-                    else: _LOGGER.error(f"unsupported unit type: {typ} for {key}")
-                payload = builder.to_registers()
+        if not isinstance(payload, list):
+            _LOGGER.error(f"write_registers_multi expects a list of tuples 0x{address:02x} payload: {payload}")
+            return None
+        t0 = monotonic()
+        try:
+            with self._lock:
+                kwargs = {'slave': unit} if unit else {}
+                payload = self._encode_multi(payload)
                 # for easier debugging, make next line a _LOGGER.info line
                 _LOGGER.debug(f"Ready to write multiple registers at 0x{address:02x}: {payload}")
                 return self._client.write_registers(address, payload, **kwargs)
-            else: 
-                _LOGGER.error(f"write_registers_multi expects a list of tuples 0x{address:02x} payload: {payload}")
-                return None
+        finally: self._write_latency.append(monotonic() - t0)
+
+    async def async_write_registers_multi(self, unit, address, payload):
+        """Write registers multi - asyncio variant, see write_registers_multi"""
+        if not self._async_client: return self.write_registers_multi(unit, address, payload)
+        if not isinstance(payload, list):
+            _LOGGER.error(f"write_registers_multi expects a list of tuples 0x{address:02x} payload: {payload}")
+            return None
+        t0 = monotonic()
+        try:
+            async with self._write_lock:
+                kwargs = {'slave': unit} if unit else {}
+                payload = self._encode_multi(payload)
+                _LOGGER.debug(f"Ready to write multiple registers at 0x{address:02x}: {payload}")
+                if not self._async_client.connected: await self._async_client.connect()
+                return await self._async_client.write_registers(address, payload, **kwargs)
+        finally: self._write_latency.append(monotonic() - t0)
 
     def read_modbus_data(self):
         res = True
@@ -436,6 +1361,20 @@ class SolaXModbusHub:
             res = self.read_modbus_registers_all()
         except ConnectionException as ex:
             _LOGGER.error("Reading data failed! Inverter is offline.")
+            self._connect_failed = True
+            res = False
+        except Exception as ex:
+            _LOGGER.exception("Something went wrong reading from modbus")
+            res = False
+        return res
+
+    async def async_read_modbus_data(self):
+        res = True
+        try:
+            res = await self.async_read_modbus_registers_all()
+        except ConnectionException as ex:
+            _LOGGER.error("Reading data failed! Inverter is offline.")
+            self._connect_failed = True
             res = False
         except Exception as ex:
             _LOGGER.exception("Something went wrong reading from modbus")
@@ -443,106 +1382,320 @@ class SolaXModbusHub:
         return res
 
 
-    def treat_address(self, decoder, descr, initval=0):
-        return_value = None
-        val = None
-        if self.cyclecount <5: _LOGGER.debug(f"treating register 0x{descr.register:02x} : {descr.key}")
+    def note_written(self, key):
+        """ an entity set the value of key; values of its block read before now are not published anymore """
+        self._key_fresh[key] = time()
+
+    def publish(self, buffer):
+        """ make the values decoded into buffer visible at once: a single dict.update, that other threads see either completely or not at all
+            values whose block was read before a newer write or read-back of the same key are left out """
+        captured = buffer.pop('_captured', {})
+        raw = buffer.pop('_raw', ())
+        for (key, fresh,) in list(self._key_fresh.items()):
+            target = self._key_blocks.get(key)
+            read = captured.get((target[1], target[0].start,)) if target else None
+            if (read != None) and (read < fresh): buffer.pop(key, None)
+        self.data.update(buffer)
+        self.block_captured.update(captured)
+        if captured: self.data_skew = max(captured.values()) - min(captured.values())
+        for (typ, start, registers, t,) in raw: 
+            self.raw_registers[typ].update({ start + i: (value, t,) for (i, value,) in enumerate(registers) })
+
+    def treat_plan(self, plan, registers, buffer):
+        """ decode a block response with its precompiled plan (see sensor.compileBlock) and store the scaled values in buffer """
+        payload = plan.buffer.pack(*registers[:plan.count])
+        values = plan.layout.unpack_from(payload)
+        if plan.rawstrings: payload = pack(f">{plan.count}H", *registers[:plan.count])
+        data = buffer
+        view = None
+        tmpdata_expiry = self.tmpdata_expiry
+        for (descr, kind, index, size, scaling,) in plan.entries:
+            if   kind == PLAN_VALUE: val = values[index]
+            elif kind == PLAN_U8L: val = values[index] % 256
+            elif kind == PLAN_U8H: val = values[index] >> 8
+            elif kind == PLAN_ULSB16MSB16: val = values[index] + values[index+1]*256*256
+            elif kind == PLAN_WORDS: val = list(values[index:index+size])
+            elif kind == PLAN_STR: 
+                try: val = str(payload[index:index+size].decode("ascii"))
+                except Exception as ex: 
+                    _LOGGER.warning(f"{self.name}: read failed at 0x{descr.register:02x}: {descr.key} ")
+                    val = None
+            elif kind == PLAN_ZERO: val = 0
+            else: val = None
+            if (val == None) or (scaling == SCALE_RAW): return_value = val
+            elif scaling == SCALE_NUM: return_value = round(val*descr.scale, descr.rounding)
+            elif scaling == SCALE_DICT: return_value = descr.scale.get(val, "Unknown")
+            else: return_value = descr.scale(val, descr, self.data)
+            if (descr.sleepmode == SLEEPMODE_LASTAWAKE) and (view == None): view = ChainMap(buffer, self.data)
+            if (tmpdata_expiry.get(descr.key,0) == 0) and ((descr.sleepmode != SLEEPMODE_LASTAWAKE) or self.plugin.isAwake(view)): 
+                data[descr.key] = return_value # case prevent_update number
+
+    def read_modbus_block(self, block, typ, buffer = None):
+        errmsg = None
+        error = None
+        realtime_data = None
+        if self.cyclecount <5: 
+            _LOGGER.debug(f"{self.name} modbus {typ} block start: 0x{block.start:x} end: 0x{block.end:x}  len: {block.end - block.start} \nregs: {block.regs}")
+        t0 = monotonic()
+        timing = [] # request time without waiting for the bus
         try:
-            if   descr.unit == REGISTER_U16: val = decoder.decode_16bit_uint()
-            elif descr.unit == REGISTER_S16: val = decoder.decode_16bit_int()
-            elif descr.unit == REGISTER_U32: val = decoder.decode_32bit_uint()
-            elif descr.unit == REGISTER_S32: val = decoder.decode_32bit_int()
-            elif descr.unit == REGISTER_STR: val = str( decoder.decode_string(descr.wordcount*2).decode("ascii") )
-            elif descr.unit == REGISTER_WORDS: val = [decoder.decode_16bit_uint() for val in range(descr.wordcount) ]
-            elif descr.unit == REGISTER_ULSB16MSB16: val = decoder.decode_16bit_uint() + decoder.decode_16bit_uint()*256*256
-            elif descr.unit == REGISTER_U8L: val = initval % 256
-            elif descr.unit == REGISTER_U8H: val = initval >> 8
-            else: 
-                _LOGGER.warning(f"undefinded unit for entity {descr.key} - setting value to zero")
-                val = 0
-        except Exception as ex: 
-            if self.cyclecount < 5: _LOGGER.warning(f"{self.name}: read failed at 0x{descr.register:02x}: {descr.key}", exc_info=True)
-            else: _LOGGER.warning(f"{self.name}: read failed at 0x{descr.register:02x}: {descr.key} ")
-        """ TO BE REMOVED 
-        if descr.prevent_update:
-            if  (self.tmpdata_expiry.get(descr.key, 0) > time()): 
-                val = self.tmpdata.get(descr.key, None)
-                if val == None: 
-                    LOGGER.warning(f"cannot find tmpdata for {descr.key} - setting value to zero")
-                    val = 0
-            else: # expired
-                if self.tmpdata_expiry.get(descr.key, 0) > 0: self.localsUpdated = True 
-                self.tmpdata_expiry[descr.key] = 0 # update locals only once
-        """
+            if typ == 'input': realtime_data = self.read_input_registers(unit=self._modbus_addr, address=block.start, count=block.end - block.start, timing=timing)
+            else:              realtime_data = self.read_holding_registers(unit=self._modbus_addr, address=block.start, count=block.end - block.start, timing=timing)
+        except Exception as ex:  
+            errmsg = f"exception {str(ex)} "
+            error = ex
+            self.note_response(None, ex)
+        rtt = timing[0] if timing else monotonic() - t0 # failed before sending, e.g. while connecting
+        if error == None:
+            self.note_response(realtime_data)
+            if not realtime_data.isError(): self._rtt_samples.append( (block.end - block.start, rtt,) )
+            elif self.should_bisect(block, typ, realtime_data): # locate the unreadable registers
+                self.observe_block(typ, block, rtt, realtime_data) # before bisecting replans the blocks
+                found = self.bisect_sync(block, typ, buffer)
+                if found != None: return found
+                rtt = None # observed
+        return self.treat_block(block, typ, realtime_data, errmsg, buffer, rtt, error)
 
-        if val == None:  # E.g. if errors have occurred during readout
-            return_value = None
-        elif type(descr.scale) is dict: # translate int to string 
-            return_value = descr.scale.get(val, "Unknown")
-        elif callable(descr.scale):  # function to call ?
-            return_value = descr.scale(val, descr, self.data) 
-        else: # apply simple numeric scaling and rounding if not a list of words
-            try:    return_value = round(val*descr.scale, descr.rounding) 
-            except: return_value = val # probably a REGISTER_WORDS instance
-        #if (descr.sleepmode != SLEEPMODE_LASTAWAKE) or self.awakeplugin(self.data): self.data[descr.key] = return_value
-        if (self.tmpdata_expiry.get(descr.key,0) == 0) and ((descr.sleepmode != SLEEPMODE_LASTAWAKE) or self.plugin.isAwake(self.data)): 
-            self.data[descr.key] = return_value # case prevent_update number
-
-
-    def read_modbus_block(self, block, typ):
+    async def async_read_modbus_block(self, block, typ, buffer = None):
         errmsg = None
+        realtime_data = None
         if self.cyclecount <5: 
             _LOGGER.debug(f"{self.name} modbus {typ} block start: 0x{block.start:x} end: 0x{block.end:x}  len: {block.end - block.start} \nregs: {block.regs}")
+        error = None
+        t0 = monotonic()
+        timing = [] # request time without waiting for the bus behind other hubs and writes
         try:
-            if typ == 'input': realtime_data = self.read_input_registers(unit=self._modbus_addr, address=block.start, count=block.end - block.start)
-            else:              realtime_data = self.read_holding_registers(unit=self._modbus_addr, address=block.start, count=block.end - block.start)
+            if typ == 'input': realtime_data = await self.async_read_input_registers(unit=self._modbus_addr, address=block.start, count=block.end - block.start, tier=block.tier, timing=timing)
+            else:              realtime_data = await self.async_read_holding_registers(unit=self._modbus_addr, address=block.start, count=block.end - block.start, tier=block.tier, timing=timing)
         except Exception as ex:  
             errmsg = f"exception {str(ex)} "
-        else:
-            if realtime_data.isError(): errmsg = f"read_error "
+            error = ex
+            self.note_response(None, ex)
+        rtt = timing[0] if timing else monotonic() - t0 # failed before sending, e.g. while connecting
+        if (error == None) and not realtime_data.isError(): self._rtt_samples.append( (block.end - block.start, rtt,) )
+        return await self.async_finish_block(block, typ, realtime_data, errmsg, buffer, rtt, error)
+
+    async def async_finish_block(self, block, typ, realtime_data, errmsg = None, buffer = None, rtt = None, error = None):
+        if errmsg == None: self.note_response(realtime_data)
+        if (errmsg == None) and self.should_bisect(block, typ, realtime_data): # locate the unreadable registers
+            if rtt != None: self.observe_block(typ, block, rtt, realtime_data) # before bisecting replans the blocks
+            found = await self.bisect_async(block, typ, buffer)
+            if found != None: return found
+            rtt = None # observed
+        return self.treat_block(block, typ, realtime_data, errmsg, buffer, rtt, error)
+
+    async def async_read_modbus_blocks_pipelined(self, due, buffer):
+        """ read the due blocks in batches of _pipeline_window requests in flight, responses are matched by mbap transaction id
+            the bus is released between batches, so pending writes can go first
+            returns (res, transport_ok,): transport_ok is False after timeouts or malformed responses """
+        reads = [ (b, 'holding',) for b in self.holdingBlocks if b.tier in due ] + [ (b, 'input',) for b in self.inputBlocks if b.tier in due ]
+        reads.sort(key = lambda r: TIER_PRIORITY[r[0].tier]) 
+        kwargs = {'slave': self._modbus_addr} if self._modbus_addr else {}
+        async def read(blk, typ):
+            reader = self._async_client.read_input_registers if typ == 'input' else self._async_client.read_holding_registers
+            t0 = monotonic()
+            try: response = await reader(blk.start, blk.end - blk.start, **kwargs)
+            except Exception as ex: 
+                self.note_response(None, ex)
+                return (None, f"exception {str(ex)} ", monotonic() - t0, ex,)
+            if self.recorder: self.recorder.record(4 if typ == 'input' else 3, blk.start, blk.end - blk.start, response)
+            return (response, None, monotonic() - t0, None,)
+        responses = []
+        for i in range(0, len(reads), self._pipeline_window):
+            batch = reads[i:i + self._pipeline_window]
+            async with self._read_locks[batch[0][0].tier]:
+                if not self._async_client.connected: await self._async_client.connect()
+                responses.extend(await asyncio.gather(*(read(b, t) for (b, t,) in batch)))
+        res = True
+        transport_ok = True
+        for ((blk, typ,), (response, errmsg, rtt, error,),) in zip(reads, responses):
+            if (errmsg != None) or not (response.isError() or (len(response.registers) >= blk.plan.count)): transport_ok = False
+            res = (await self.async_finish_block(blk, typ, response, errmsg, buffer, rtt, error)) and res
+        return (res, transport_ok,)
+
+    def should_bisect(self, blk, typ, response):
+        """ only illegal address exceptions point at registers this firmware lacks, and blocks that refused everything wait HOLES_RETRY_DELAY """
+        return isinstance(response, ExceptionResponse) and (response.exception_code == ILLEGAL_ADDRESS) and (time() >= self._bisect_after.get((typ, blk.start,), 0))
+
+    def other_block(self, blk):
+        """ (typ, start,) of another planned block, whose first register tells a firmware gap from a device that refuses all reads """
+        for (typ, blocks,) in (('holding', self.holdingBlocks,), ('input', self.inputBlocks,),):
+            for b in blocks:
+                if b is not blk: return (typ, b.start,)
+        return None
+
+    def bisect_refused(self, blk, typ, awake):
+        """ all registers of a bisected block were refused: holes if the device reads other registers normally, else retry later """
+        if awake: return False
+        self._bisect_after[(typ, blk.start,)] = time() + HOLES_RETRY_DELAY
+        _LOGGER.info(f"{self.name}: {typ} block 0x{blk.start:x} refused every register and the device did not answer elsewhere, not bisecting it again for {HOLES_RETRY_DELAY} s")
+        return True
+
+    def bisect_block(self, blk, regs = None, failed = False):
+        """ generator locating the unreadable descriptions of a failing block by bisection
+            yields (address, count,) reads and expects the responses to be sent back
+            returns (readable, holes,): readable is a list of (regs, registers,), holes a list of (start, end,) ranges """
+        if regs == None: regs = blk.regs
+        start = regs[0]
+        end = regEnd(regs[-1], blk.descriptions[regs[-1]])
+        if not failed:
+            response = yield (start, end - start,)
+            if response.isError() and not (isinstance(response, ExceptionResponse) and (response.exception_code == ILLEGAL_ADDRESS)): 
+                raise ConnectionException(f"no valid response: {response}") # aborts, never learn timeouts or transient exceptions as holes
+            if not response.isError() and (len(response.registers) >= end - start): return ([ (regs, response.registers,) ], [],)
+        if len(regs) == 1: return ([], [ (start, end,) ],)
+        half = len(regs) // 2
+        (readable1, holes1,) = yield from self.bisect_block(blk, regs[:half])
+        (readable2, holes2,) = yield from self.bisect_block(blk, regs[half:])
+        return (readable1 + readable2, holes1 + holes2,)
+
+    def bisect_sync(self, blk, typ, buffer = None):
+        reader = self.read_input_registers if typ == 'input' else self.read_holding_registers
+        bisection = self.bisect_block(blk, failed = True)
+        try:
+            request = next(bisection)
+            while True: request = bisection.send(reader(unit=self._modbus_addr, address=request[0], count=request[1]))
+        except StopIteration as stop: (readable, holes,) = stop.value
+        except Exception as ex: 
+            _LOGGER.info(f"{self.name}: bisection of {typ} block 0x{blk.start:x} aborted: {ex}")
+            return None
+        if not readable:
+            other = self.other_block(blk)
+            try: awake = (other != None) and not (self.read_input_registers if other[0] == 'input' else self.read_holding_registers)(unit=self._modbus_addr, address=other[1], count=1).isError()
+            except Exception: awake = False
+            if self.bisect_refused(blk, typ, awake): return None
+        return self.learn_holes(blk, typ, readable, holes, buffer = buffer)
+
+    async def bisect_async(self, blk, typ, buffer = None):
+        reader = self.async_read_input_registers if typ == 'input' else self.async_read_holding_registers
+        bisection = self.bisect_block(blk, failed = True)
+        try:
+            request = next(bisection)
+            while True: request = bisection.send(await reader(unit=self._modbus_addr, address=request[0], count=request[1]))
+        except StopIteration as stop: (readable, holes,) = stop.value
+        except Exception as ex: 
+            _LOGGER.info(f"{self.name}: bisection of {typ} block 0x{blk.start:x} aborted: {ex}")
+            return None
+        if not readable:
+            other = self.other_block(blk)
+            try: awake = (other != None) and not (await (self.async_read_input_registers if other[0] == 'input' else self.async_read_holding_registers)(unit=self._modbus_addr, address=other[1], count=1)).isError()
+            except Exception: awake = False
+            if self.bisect_refused(blk, typ, awake): return None
+        return self.learn_holes(blk, typ, readable, holes, buffer = buffer)
+
+    def learn_holes(self, blk, typ, readable, holes, buffer = None):
+        """ decode the readable parts of a bisected block and replan around the holes """
+        group = buffer if buffer != None else {}
+        for (regs, registers,) in readable:
+            part = block(start = regs[0], end = regEnd(regs[-1], blk.descriptions[regs[-1]]), descriptions = blk.descriptions, regs = regs, tier = blk.tier, ignore_readerror = blk.ignore_readerror)
+            compileBlock(part, self.plugin.order16, self.plugin.order32)
+            self.treat_plan(part.plan, registers, group)
+            if self.raw_registers != None: group.setdefault('_raw', []).append((typ, part.start, registers, time(),))
+        group.setdefault('_captured', {})[(typ, blk.start,)] = time()
+        if buffer == None: self.publish(group)
+        if holes:
+            self.holes[typ] = sorted(set(self.holes[typ] + holes))
+            self._holes_learned.update({ (typ,) + h: time() for h in holes })
+            _LOGGER.warning(f"{self.name}: {typ} registers {[ f'0x{s:x}-0x{e-1:x}' for (s, e,) in holes ]} are not readable on {self.seriesnumber}, replanning blocks around them")
+            self.save_holes()
+            self.plan_blocks()
+        return True
+
+    def treat_block(self, block, typ, realtime_data, errmsg = None, buffer = None, rtt = None, error = None):
+        """ decode the response of a block read into buffer, or straight into data when there is no buffer (block group) of a cycle
+            rtt and error (exception of the request) are recorded in the block statistics
+            returns False if the cycle must be considered failed """
+        if (errmsg == None) and realtime_data.isError(): errmsg = f"read_error "
+        if (errmsg == None) and (len(realtime_data.registers) < block.plan.count): errmsg = f"short response ({len(realtime_data.registers)} registers) "
+        group = buffer if buffer != None else {}
         if errmsg == None:
-            decoder = BinaryPayloadDecoder.fromRegisters(realtime_data.registers, self.plugin.order16, wordorder=self.plugin.order32)
-            prevreg = block.start
-            for reg in block.regs:
-                if (reg - prevreg) > 0: 
-                    decoder.skip_bytes((reg-prevreg) * 2)
-                    if self.cyclecount < 5: _LOGGER.debug(f"skipping bytes {(reg-prevreg) * 2}")
-                descr = block.descriptions[reg] 
-                if type(descr) is dict: #  set of byte values
-                    val = decoder.decode_16bit_uint()
-                    for k in descr: self.treat_address(decoder, descr[k], val)
-                    prevreg = reg + 1
-                else: # single value
-                    self.treat_address(decoder, descr)
-                    if descr.unit in (REGISTER_S32, REGISTER_U32, REGISTER_ULSB16MSB16,): prevreg = reg + 2
-                    elif descr.unit in (REGISTER_STR, REGISTER_WORDS,): prevreg = reg + descr.wordcount
-                    else: prevreg = reg+1
+            t0 = monotonic()
+            self.treat_plan(block.plan, realtime_data.registers, group)
+            if rtt != None: self.observe_block(typ, block, rtt, realtime_data, None, monotonic() - t0)
+            group.setdefault('_captured', {})[(typ, block.start,)] = time()
+            if self.raw_registers != None: group.setdefault('_raw', []).append((typ, block.start, realtime_data.registers, time(),))
+            if buffer == None: self.publish(group)
             return True
         else: #block read failure
+            if rtt != None: self.observe_block(typ, block, rtt, realtime_data, error)
             firstdescr = block.descriptions[block.start] # check only first item in block
-            if firstdescr.ignore_readerror != False:  # ignore block read errors and return static data
+            ignore = firstdescr.ignore_readerror if block.ignore_readerror == None else block.ignore_readerror
+            if ignore != False:  # ignore block read errors and return static data
                 for reg in block.regs: 
                     descr = block.descriptions[reg]
                     if not (type(descr) is dict):
-                        if ((descr.ignore_readerror != True) and (descr.ignore_readerror !=False)) : self.data[descr.key] = descr.ignore_readerror # return something static 
+                        if ((descr.ignore_readerror != True) and (descr.ignore_readerror !=False)) : group[descr.key] = descr.ignore_readerror # return something static 
+                if buffer == None: self.publish(group)
                 return True
             else:
-                if self.slowdown == 1: _LOGGER.info(f"{errmsg}: {self.name} cannot read {typ} registers at device {self._modbus_addr} position 0x{block.start:x}", exc_info=True)
+                if self.state == STATE_ONLINE: _LOGGER.info(f"{errmsg}: {self.name} cannot read {typ} registers at device {self._modbus_addr} position 0x{block.start:x}", exc_info=True)
                 return False
 
+    def observe_block(self, typ, block, rtt, response, error = None, decode = None):
+        """ record a block read in the statistics of its block and of the hub, see instrumentation.py """
+        count = block.end - block.start
+        outcome = errorClass(response, error, block.plan.count)
+        stats = self.block_stats.get((typ, block.start, block.end,))
+        if stats == None: stats = self.block_stats[(typ, block.start, block.end,)] = BlockStats(count, STATS_WINDOW)
+        stats.add(rtt, decode, frameBytes(self._framing, count, response), outcome)
+        self.read_stats.add(rtt * 1000)
+        self.read_outcomes.add(outcome)
+
+    def diagnostics(self):
+        """ connection state and usage, block layout and per block read statistics, for the diagnostics download """
+        return {
+            "state": self.state,
+            "state_since": self.state_since,
+            "invertertype": f"0x{self._invertertype:x}",
+            "cycles": self.cyclecount,
+            "cycle": self.cycle_stats.summary(),
+            "reads": { **self.read_stats.summary(), "error_rate_pct": self.read_outcomes.error_rate(), "errors": self.read_outcomes.errors(), },
+            "bus": { **self.bus_statistics(), "idle_pct": self._bus.idle_pct(), },
+            "write_latency": self.write_latency(),
+            "data_skew_s": round(self.data_skew, 3),
+            "notify": { "sent": self.notify_sent, "suppressed": self.notify_suppressed, },
+            "computed": { "evaluated": self.computed_evaluated, "skipped": self.computed_skipped, },
+            "block_layout": self.block_layout,
+            "blocks": { f"{typ} 0x{start:x}-0x{end - 1:x}": stats.summary() for ((typ, start, end,), stats,) in sorted(self.block_stats.items()) },
+            "unpolled": sorted(self.unpolled),
+            "proxy": self.proxy.statistics() if self.proxy else None,
+            "recorder": { "path": self.recorder.path, "frames": self.recorder.frames, } if self.recorder else None,
+        }
+
+    def treat_computed(self, buffer):
+        """ local data persistence and computed sensors, called at the end of each polling cycle before buffer is published """
+        if self.localsUpdated or not self.localsLoaded: # local data changed, or was restored at setup before the entities existed
+            if self.localsUpdated: self.saveLocalData() 
+            self.localsLoaded = True
+            self.plugin.localDataCallback(self)
+            self._force_notify = True # callback may have modified entity descriptions
+        if self._force_notify: self._computed_inputs = {} # descriptions or local data may have changed
+        evaluated = 0
+        view = ChainMap(buffer, self.data) # the cycle as it will be published
+        for (descr, inputs,) in self._computed_order:
+            if inputs != None:
+                values = tuple(view.get(k, _UNSET) for k in inputs)
+                if (self._computed_inputs.get(descr.key, _UNSET) == values) and (descr.key in view): continue
+                self._computed_inputs[descr.key] = values
+            buffer[descr.key] = descr.value_function(0, descr, view )
+            evaluated += 1
+        self.computed_evaluated = evaluated
+        self.computed_skipped = len(self._computed_order) - evaluated
+
     def read_modbus_registers_all(self):
         res = True
+        started = time()
+        due = self.due_tiers()
+        buffer = {} # this cycle's values, published at once
         for block in self.holdingBlocks:
-            res = res and self.read_modbus_block(block, 'holding')
+            if block.tier in due: res = res and self.read_modbus_block(block, 'holding', buffer)
         for block in self.inputBlocks:
-            res = res and self.read_modbus_block(block, 'input') 
-        if self.localsUpdated: 
-            self.saveLocalData() 
-            self.plugin.localDataCallback(self)
-        if not self.localsLoaded: self.loadLocalData()
-        for reg in self.computedSensors:
-            descr = self.computedSensors[reg]
-            self.data[descr.key] = descr.value_function(0, descr, self.data )
+            if block.tier in due: res = res and self.read_modbus_block(block, 'input', buffer) 
+        self.tiers_done(due, res)
+        self.treat_computed(buffer)
+        self.publish(buffer)
+        self._key_fresh = { k: t for (k, t,) in self._key_fresh.items() if t >= started } # later cycles read after these
+        self.update_link_model()
 
         if res and self.writequeue and self.plugin.isAwake(self.data): #self.awakeplugin(self.data):
             # process outstanding write requests
@@ -560,5 +1713,52 @@ class SolaXModbusHub:
                 self.write_registers_multi(unit=self._modbus_addr, address=buttondescr.register, payload=payload)
         return res
 
+    async def async_read_modbus_registers_all(self):
+        res = True
+        started = time()
+        due = self.due_tiers()
+        buffer = {} # this cycle's values, published at once
+        if (self._pipeline_retry != None) and (time() >= self._pipeline_retry):
+            _LOGGER.info(f"{self.name}: trying {self._pipeline_configured} requests in flight again")
+            self._pipeline_retry = None
+            self._pipeline_window = self._pipeline_configured
+        if (self._pipeline_window > 1) and not self._pipeline_suspect:
+            answering = self.state == STATE_ONLINE # state of the previous cycle
+            (res, transport_ok,) = await self.async_read_modbus_blocks_pipelined(due, buffer)
+            if transport_ok: self._pipeline_fallbacks = 0
+            elif answering or self._responded: # a device that is asleep or offline fails sequential requests just the same
+                _LOGGER.info(f"{self.name}: pipelined read failed, checking with sequential requests in the next cycle")
+                self._pipeline_suspect = True
+        else:
+            for block in self.holdingBlocks:
+                if block.tier in due: res = res and await self.async_read_modbus_block(block, 'holding', buffer)
+            for block in self.inputBlocks:
+                if block.tier in due: res = res and await self.async_read_modbus_block(block, 'input', buffer) 
+            if self._pipeline_suspect:
+                self._pipeline_suspect = False
+                if res: # sequential requests work where pipelined ones failed: the device cannot handle them
+                    self._pipeline_fallbacks += 1
+                    delay = min(PIPELINE_RETRY_MAX, PIPELINE_RETRY_INTERVAL * 2**(self._pipeline_fallbacks - 1))
+                    _LOGGER.warning(f"{self.name}: device does not handle {self._pipeline_window} requests in flight, falling back to sequential requests for {delay} s")
+                    self._pipeline_window = 1
+                    self._pipeline_retry = time() + delay
+        self.tiers_done(due, res)
+        self.treat_computed(buffer)
+        self.publish(buffer)
+        self._key_fresh = { k: t for (k, t,) in self._key_fresh.items() if t >= started } # later cycles read after these
+        self.update_link_model()
 
-
+        if res and self.writequeue and self.plugin.isAwake(self.data):
+            # process outstanding write requests
+            _LOGGER.info(f"inverter is now awake, processing outstanding write requests {self.writequeue}")
+            writequeue = self.writequeue
+            self.writequeue = {} # make sure we do not write multiple times
+            await asyncio.gather(*(self.async_write_register(self._modbus_addr, addr, payload) for (addr, payload,) in writequeue.items())) # one write queue window
+        self.last_ts = time()
+        for (k,v,) in list(self.data['_repeatUntil'].items()): 
+            if self.last_ts < v: 
+                buttondescr = self.computedButtons[k]
+                payload = buttondescr.value_function(0, buttondescr, self.data)
+                _LOGGER.debug(f"ready to repeat button {k} data: {payload}")
+                await self.async_write_registers_multi(unit=self._modbus_addr, address=buttondescr.register, payload=payload)
+        return res
@@ -0,0 +1,421 @@
+"""Benchmarks of setup, block planning, decoding, computed sensors and entity notification for every plugin and inverter type.
+
+    python -m custom_components.solax_modbus.benchmark --output bench.json [--plugin solax] [--cycles 20] [--quick] [--network [--latency 20]]
+
+Each hub polls a simulated inverter image (simulator.py) through the replay clients of recorder.py, so no network i/o is measured.
+The inverter types are those detected from the serial number prefixes each plugin's determineInverterType tests.
+The precompiled decode plans are timed against the BinaryPayloadDecoder decoding they replaced, on the same responses.
+With --network, the first plugin and serial prefix are also polled over localhost tcp from a simulator server that answers after
+--latency ms: with the blocking and the asyncio client, measuring how long each cycle stalls the event loop, and with 1, 2, 4 and 8
+requests in flight (tcp_pipeline).
+
+    python -m custom_components.solax_modbus.benchmark --replay <config>/<name>_frames.bin --plugin solax [--interval 15]
+
+With --replay, the same measurements are taken on a hub polling a frame recording of a real inverter (record_frames option),
+advancing the replay clock by --interval seconds per cycle until the recording ends.
+"""
+import argparse
+import ast
+import asyncio
+import glob
+import inspect
+import json
+import logging
+import math
+import os
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import textwrap
+import threading
+from datetime import timedelta
+from importlib.metadata import version
+from time import perf_counter, time
+
+from homeassistant.bootstrap import load_registries
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import EntityPlatform
+from pymodbus.datastore import ModbusServerContext
+from pymodbus.payload import BinaryPayloadDecoder
+from pymodbus.transaction import ModbusSocketFramer
+
+from . import SolaXModbusHub, ModbusBus, loadPlugin
+from . import sensor, number, select, button
+from .const import DOMAIN, PLUGIN_PATH, CONF_TCP_PIPELINE, CONF_POLL_ASYNC, SLEEPMODE_LASTAWAKE
+from .const import REGISTER_U16, REGISTER_S16, REGISTER_U32, REGISTER_S32, REGISTER_STR, REGISTER_WORDS, REGISTER_ULSB16MSB16, REGISTER_U8L, REGISTER_U8H
+from .recorder import FrameReplay, ReplayClient, AsyncReplayClient
+from .sensor import splitInBlocks
+from .simulator import SimulatedInverter, SimulatorTcpServer
+
+_LOGGER = logging.getLogger(__name__)
+
+PLATFORM_MODULES = { "sensor": sensor, "number": number, "select": select, "button": button, }
+PIPELINE_WINDOWS = (1, 2, 4, 8,)
+DECODE_REPEAT = 50 # decodes of all blocks per decoder in the comparison
+STALL_TICK = 0.001 # seconds between the event loop lag measurements
+STALL_MIN  = 0.001 # lags below this are scheduling noise, not a stall
+
+def summary(samples):
+    """ ms statistics of a list of seconds """
+    if not samples: return None
+    ms = sorted(s * 1000 for s in samples)
+    return { "n": len(ms), "median": round(statistics.median(ms), 4), "mean": round(statistics.fmean(ms), 4),
+             "p95": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 4), "max": round(ms[-1], 4), }
+
+def timed(func, samples):
+    """ wrap func, appending the duration of every call to samples """
+    def wrapper(*args, **kwargs):
+        t0 = perf_counter()
+        try: return func(*args, **kwargs)
+        finally: samples.append(perf_counter() - t0)
+    return wrapper
+
+def serialPrefixes(plugin_module):
+    """ the string constants determineInverterType tests with startswith, in source order """
+    source = textwrap.dedent(inspect.getsource(type(plugin_module.plugin_instance).determineInverterType))
+    prefixes = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Call) and (getattr(node.func, 'attr', None) == 'startswith') and node.args:
+            arg = node.args[0]
+            for const in (arg.elts if isinstance(arg, ast.Tuple) else (arg,)):
+                if isinstance(const, ast.Constant) and isinstance(const.value, str) and (const.value not in prefixes): prefixes.append(const.value)
+    return prefixes
+
+def pluginNames():
+    return sorted(os.path.basename(f)[len("plugin_"):-len(".py")] for f in glob.glob(PLUGIN_PATH))
+
+def decodeReference(hub, blk, registers, data):
+    """ the decoding treat_plan replaced: a BinaryPayloadDecoder per block response and a dispatch on the unit of each description """
+    decoder = BinaryPayloadDecoder.fromRegisters(registers, hub.plugin.order16, wordorder = hub.plugin.order32)
+    prevreg = blk.start
+    for reg in blk.regs:
+        if reg > prevreg: decoder.skip_bytes((reg - prevreg) * 2)
+        descr = blk.descriptions[reg]
+        if type(descr) is dict: # set of byte values
+            val = decoder.decode_16bit_uint()
+            for d in descr.values(): decodeReferenceValue(hub, decoder, d, data, val)
+            prevreg = reg + 1
+        else:
+            decodeReferenceValue(hub, decoder, descr, data)
+            if descr.unit in (REGISTER_S32, REGISTER_U32, REGISTER_ULSB16MSB16,): prevreg = reg + 2
+            elif descr.unit in (REGISTER_STR, REGISTER_WORDS,): prevreg = reg + descr.wordcount
+            else: prevreg = reg + 1
+
+def decodeReferenceValue(hub, decoder, descr, data, initval = 0):
+    val = None
+    try:
+        if   descr.unit == REGISTER_U16: val = decoder.decode_16bit_uint()
+        elif descr.unit == REGISTER_S16: val = decoder.decode_16bit_int()
+        elif descr.unit == REGISTER_U32: val = decoder.decode_32bit_uint()
+        elif descr.unit == REGISTER_S32: val = decoder.decode_32bit_int()
+        elif descr.unit == REGISTER_STR: val = str( decoder.decode_string(descr.wordcount*2).decode("ascii") )
+        elif descr.unit == REGISTER_WORDS: val = [decoder.decode_16bit_uint() for val in range(descr.wordcount) ]
+        elif descr.unit == REGISTER_ULSB16MSB16: val = decoder.decode_16bit_uint() + decoder.decode_16bit_uint()*256*256
+        elif descr.unit == REGISTER_U8L: val = initval % 256
+        elif descr.unit == REGISTER_U8H: val = initval >> 8
+        else: val = 0
+    except Exception: pass
+    if val == None: return_value = None
+    elif type(descr.scale) is dict: return_value = descr.scale.get(val, "Unknown")
+    elif callable(descr.scale): return_value = descr.scale(val, descr, hub.data)
+    else:
+        try:    return_value = round(val*descr.scale, descr.rounding)
+        except: return_value = val
+    if (hub.tmpdata_expiry.get(descr.key,0) == 0) and ((descr.sleepmode != SLEEPMODE_LASTAWAKE) or hub.plugin.isAwake(hub.data)): data[descr.key] = return_value
+
+def compareDecoders(hub, source):
+    """ time the precompiled plans and the reference decoder on the current responses of all blocks; the decoded values must be equal """
+    responses = []
+    for (typ, blocks,) in (('holding', hub.holdingBlocks,), ('input', hub.inputBlocks,),):
+        for blk in blocks:
+            response = source.read(3 if typ == 'holding' else 4, blk.start, blk.end - blk.start)
+            if not response.isError(): responses.append((blk, response.registers,))
+    (compiled, reference, compiled_data, reference_data,) = ([], [], {}, {},)
+    for _ in range(DECODE_REPEAT):
+        t0 = perf_counter()
+        for (blk, registers,) in responses: SolaXModbusHub.treat_plan(hub, blk.plan, registers, compiled_data)
+        compiled.append(perf_counter() - t0)
+        t0 = perf_counter()
+        for (blk, registers,) in responses: decodeReference(hub, blk, registers, reference_data)
+        reference.append(perf_counter() - t0)
+    result = { "blocks": len(responses), "compiled": summary(compiled), "reference": summary(reference), "matches": compiled_data == reference_data, }
+    result["speedup"] = round(statistics.median(reference) / max(statistics.median(compiled), 1e-9), 2) if responses else None
+    return result
+
+def freePort():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class ServerThread(threading.Thread):
+    """ simulator server for one inverter on localhost, in its own thread and event loop so that a hub blocking its loop cannot stall it """
+
+    def __init__(self, inverter, port):
+        super().__init__(daemon = True)
+        self.inverter = inverter
+        self.port = port
+        self._ready = threading.Event()
+        self._loop = None
+        self._shutdown = None
+
+    def run(self):
+        asyncio.run(self._async_serve())
+
+    async def _async_serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._shutdown = asyncio.Event()
+        server = SimulatorTcpServer({ None: self.inverter }, context = ModbusServerContext(slaves = self.inverter.context(), single = True),
+                                    framer = ModbusSocketFramer, address = ("127.0.0.1", self.port))
+        task = asyncio.create_task(server.serve_forever())
+        while not server.transport: await asyncio.sleep(0.01)
+        self._ready.set()
+        await self._shutdown.wait()
+        await server.shutdown()
+        task.cancel()
+
+    def start(self):
+        super().start()
+        self._ready.wait(5)
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._shutdown.set)
+        self.join(5)
+
+async def async_loop_stalls(stalls, done):
+    """ append the seconds the event loop was late to wake up a sleeping task to stalls, until done is set """
+    while not done.is_set():
+        t0 = perf_counter()
+        await asyncio.sleep(STALL_TICK)
+        lag = perf_counter() - t0 - STALL_TICK
+        if lag > STALL_MIN: stalls.append(lag)
+
+async def async_bench_network(hass, plugin_name, prefix, index, options, latency, cycles):
+    """ poll a simulated inverter answering after latency ms over localhost tcp, with hub options (e.g. tcp_pipeline); returns the measurements """
+    inverter = SimulatedInverter(plugin_name, prefix, index, latency = latency)
+    port = freePort()
+    server = ServerThread(inverter, port)
+    server.start()
+    name = f"net{index}"
+    config = { "name": name, "plugin": plugin_name, "host": "127.0.0.1", "port": port, "scan_interval": 15, **options, }
+    entry = type("BenchEntry", (), { "data": None, "options": config, "entry_id": name, })()
+    plugin = loadPlugin(plugin_name)
+    hub = None
+    try:
+        hub = SolaXModbusHub(hass, name, "127.0.0.1", port, "tcp", 1, "tcp", None, 9600, 15, plugin, config, name, None, None)
+        await hub.async_identify()
+        hass.data[DOMAIN][name] = { "hub": hub, }
+        await sensor.async_setup_entry(hass, entry, lambda new, *args: None)
+        hub._sensor_callbacks.append(lambda: None) # poll without entities or interval timer
+        requests = inverter.requests
+        (cycle, stall_total, stall_max,) = ([], [], [],)
+        for _ in range(cycles):
+            (hub._tier_next, hub._next_attempt,) = ({}, 0,) # all tiers due, no backoff
+            (stalls, done,) = ([], asyncio.Event(),)
+            monitor = asyncio.create_task(async_loop_stalls(stalls, done))
+            await asyncio.sleep(0) # start the monitor
+            t0 = perf_counter()
+            await hub.async_refresh_modbus_data()
+            cycle.append(perf_counter() - t0)
+            done.set()
+            await monitor
+            stall_total.append(sum(stalls))
+            stall_max.append(max(stalls, default = 0))
+        return { "options": options, "cycle": summary(cycle), "requests_per_cycle": round((inverter.requests - requests) / max(1, cycles), 1),
+                 "loop_stall_total": summary(stall_total), "loop_stall_max": summary(stall_max), "pipeline_window": hub._pipeline_window, "state": hub.state, }
+    finally:
+        if hub:
+            if hub._registry_unsub: hub._registry_unsub()
+            if hub._async_client: hub._async_client.close()
+            hub._client.close()
+            hub._bus.release_owner(name)
+            hass.data[DOMAIN].pop(name, None)
+        await hass.async_add_executor_job(server.stop)
+
+async def async_bench_hub(hass, plugin_name, source, index, cycles, step = None):
+    """ set up a hub on the image of source (a SimulatedInverter or a FrameReplay), then run up to cycles full polling cycles,
+        calling step after each cycle and stopping when it returns False; returns the measurements """
+    name = f"bench{index}"
+    ModbusBus.attach(f"{name}:502", ReplayClient(source), AsyncReplayClient(source))
+    config = { "name": name, "plugin": plugin_name, "host": name, "port": 502, "scan_interval": 15, }
+    entry = type("BenchEntry", (), { "data": None, "options": config, "entry_id": name, })()
+    plugin = loadPlugin(plugin_name)
+    t0 = perf_counter()
+    hub = SolaXModbusHub(hass, name, name, 502, "tcp", 1, "tcp", None, 9600, 15, plugin, config, name, None, None)
+    await hub.async_identify()
+    result = { "plugin": plugin_name, "serial": hub.seriesnumber, "invertertype": f"0x{hub._invertertype:x}", "hub_ms": round((perf_counter() - t0) * 1000, 3), }
+    hass.data[DOMAIN][name] = { "hub": hub, }
+    # selection of the entity descriptions, with an empty and a filled selection cache
+    cache = hub.plugin.__dict__['_selection_cache']
+    saved = dict(cache)
+    cache.clear()
+    t0 = perf_counter()
+    hub.plugin.selectEntities(hub.plugin.SENSOR_TYPES, hub._invertertype, hub.seriesnumber)
+    result["select_cold_ms"] = round((perf_counter() - t0) * 1000, 4)
+    t0 = perf_counter()
+    hub.plugin.selectEntities(hub.plugin.SENSOR_TYPES, hub._invertertype, hub.seriesnumber)
+    result["select_warm_ms"] = round((perf_counter() - t0) * 1000, 4)
+    cache.update(saved)
+    # platform setup
+    entities = {}
+    result["setup_ms"] = {}
+    for (platform_name, module,) in PLATFORM_MODULES.items():
+        added = entities.setdefault(platform_name, [])
+        t0 = perf_counter()
+        await module.async_setup_entry(hass, entry, lambda new, *args: added.extend(new))
+        result["setup_ms"][platform_name] = round((perf_counter() - t0) * 1000, 3)
+    result["entities"] = { platform_name: len(added) for (platform_name, added,) in entities.items() }
+    platforms = [] # add the entities like home assistant does, so notifications write real states
+    result["add_entities_ms"] = {}
+    for (platform_name, added,) in entities.items():
+        platforms.append(EntityPlatform(hass = hass, logger = _LOGGER, domain = platform_name, platform_name = DOMAIN, platform = None,
+                                        scan_interval = timedelta(seconds = 15), entity_namespace = None))
+        t0 = perf_counter()
+        await platforms[-1].async_add_entities(added)
+        result["add_entities_ms"][platform_name] = round((perf_counter() - t0) * 1000, 3)
+    # block planning
+    split = []
+    for _ in range(20):
+        for (regs, typ,) in ((hub.holdingRegs, 'holding',), (hub.inputRegs, 'input',),):
+            readable = hub.readableRegs(regs, typ)
+            t0 = perf_counter()
+            splitInBlocks(readable, hub.plugin.block_size, hub.plugin.auto_block_ignore_readerror, hub.gap_limit(), hub.holes[typ])
+            split.append(perf_counter() - t0)
+    result["split_in_blocks"] = summary(split)
+    plan = []
+    logging.disable(logging.INFO) # plan_blocks logs the layout
+    try:
+        for _ in range(5): timed(hub.plan_blocks, plan)()
+    finally: logging.disable(logging.NOTSET)
+    result["plan_blocks"] = summary(plan)
+    result["blocks"] = { "holding": len(hub.holdingBlocks), "input": len(hub.inputBlocks), "registers": len(hub.holdingRegs) + len(hub.inputRegs), }
+    # polling cycles; the image evolves between cycles, like a real inverter
+    (decode, computed, notify, cycle,) = ([], [], [], [],)
+    hub.treat_plan = timed(hub.treat_plan, decode)
+    hub.treat_computed = timed(hub.treat_computed, computed)
+    hub.async_notify_changed = timed(hub.async_notify_changed, notify)
+    sent = hub.notify_sent
+    for _ in range(cycles):
+        hub._tier_next = {} # all tiers due
+        decoded = len(decode)
+        t0 = perf_counter()
+        await hub.async_refresh_modbus_data()
+        cycle.append(perf_counter() - t0)
+        decode[decoded:] = [ sum(decode[decoded:]) ] # decode time per cycle rather than per block
+        await asyncio.sleep(0)
+        if step and not step(): break
+    result.update({ "cycle": summary(cycle), "decode": summary(decode), "computed": summary(computed), "notify": summary(notify),
+                    "computed_sensors": len(hub._computed_order), "notified_per_cycle": round((hub.notify_sent - sent) / max(1, cycles), 1), "state": hub.state, })
+    result["decode_comparison"] = compareDecoders(hub, source)
+    # tear down
+    for entity_platform in platforms: await entity_platform.async_reset()
+    if hub._unsub_interval_method: hub._unsub_interval_method()
+    if hub._registry_unsub: hub._registry_unsub()
+    hub._bus.release_owner(name)
+    hass.data[DOMAIN].pop(name)
+    return result
+
+async def async_bench_replay(hass, plugin_name, path, interval):
+    """ set up a hub on a frame recording and poll it, advancing the replay clock by interval seconds per cycle until the recording ends """
+    replay = FrameReplay(path, speed = 0)
+    if not len(replay): raise ValueError(f"{path} contains no frames")
+    replay.advance(interval) # the serial number probe and the first cycle
+    def step():
+        if replay.finished: return False
+        replay.advance(interval)
+        return True
+    result = await async_bench_hub(hass, plugin_name, replay, 0, math.ceil(replay.duration / interval) + 2, step)
+    result.update({ "recording": path, "frames": len(replay), "duration_s": round(replay.duration, 1), "replay_reads": replay.reads, })
+    return result
+
+async def async_run(args):
+    configdir = tempfile.mkdtemp(prefix = "solax_bench_")
+    hass = HomeAssistant(configdir)
+    hass.data[DOMAIN] = {}
+    await load_registries(hass) # entity sources, device and entity registries, like at home assistant startup
+    report = {
+        "created": time(),
+        "python": platform.python_version(),
+        "versions": { pkg: version(pkg) for pkg in ("homeassistant", "pymodbus",) },
+        "cycles": args.cycles,
+        "plugins": {},
+        "results": [],
+    }
+    if args.replay:
+        result = await async_bench_replay(hass, args.plugin[0], args.replay, args.interval)
+        report["results"].append(result)
+        _LOGGER.info(f"{args.plugin[0]} {result['serial']} {result['invertertype']} replayed from {args.replay}: {result['frames']} frames, "
+                     f"cycle median {(result['cycle'] or {}).get('median', 0):.2f} ms, decode {(result['decode'] or {}).get('median', 0):.2f} ms")
+        await hass.async_stop(force = True)
+        return report
+    index = 0
+    for plugin_name in (args.plugin or pluginNames()):
+        t0 = perf_counter()
+        try: module = loadPlugin(plugin_name)
+        except Exception as ex:
+            _LOGGER.error(f"plugin {plugin_name} cannot be imported: {ex}")
+            continue
+        report["plugins"][plugin_name] = { "import_ms": round((perf_counter() - t0) * 1000, 3), "types": [], }
+        seen = set()
+        for prefix in (args.serial or serialPrefixes(module)):
+            try: inverter = SimulatedInverter(plugin_name, prefix, index)
+            except Exception as ex:
+                _LOGGER.warning(f"{plugin_name}: no simulated inverter for serial {prefix}: {ex}")
+                continue
+            if not inverter.invertertype or (inverter.invertertype in seen): continue
+            seen.add(inverter.invertertype)
+            try: result = await async_bench_hub(hass, plugin_name, inverter, index, args.cycles)
+            except Exception as ex:
+                _LOGGER.exception(f"{plugin_name}: benchmark of {inverter.serialnumber} type 0x{inverter.invertertype:x} failed")
+                continue
+            finally: index += 1
+            report["results"].append(result)
+            report["plugins"][plugin_name]["types"].append(result["invertertype"])
+            _LOGGER.info(f"{plugin_name} {result['serial']} {result['invertertype']}: setup {sum(result['setup_ms'].values()):.1f} ms, "
+                         f"cycle median {(result['cycle'] or {}).get('median', 0):.2f} ms, decode {(result['decode'] or {}).get('median', 0):.2f} ms, notify {(result['notify'] or {}).get('median', 0):.2f} ms, "
+                         f"precompiled decoding {result['decode_comparison']['speedup'] or '-'}x faster than BinaryPayloadDecoder")
+            if args.quick: break
+    if args.network:
+        plugin_name = (args.plugin or ["solax"])[0]
+        prefix = (args.serial or serialPrefixes(loadPlugin(plugin_name)))[0]
+        report["network"] = { "plugin": plugin_name, "serial": prefix, "latency_ms": args.latency, "loop_stall": [], "pipeline": [], }
+        for poll_async in (False, True,):
+            result = await async_bench_network(hass, plugin_name, prefix, index, { CONF_POLL_ASYNC: poll_async, }, args.latency, args.cycles)
+            index += 1
+            report["network"]["loop_stall"].append(result)
+            _LOGGER.info(f"{plugin_name} {prefix} over tcp with the {'asyncio' if poll_async else 'blocking'} client: cycle median {(result['cycle'] or {}).get('median', 0):.1f} ms, "
+                         f"event loop stalled {(result['loop_stall_total'] or {}).get('median', 0):.1f} ms per cycle, longest {(result['loop_stall_max'] or {}).get('max', 0):.1f} ms")
+        for window in PIPELINE_WINDOWS:
+            result = await async_bench_network(hass, plugin_name, prefix, index, { CONF_TCP_PIPELINE: window, }, args.latency, args.cycles)
+            index += 1
+            report["network"]["pipeline"].append(result)
+            _LOGGER.info(f"{plugin_name} {prefix} over tcp with {args.latency} ms latency, {window} requests in flight: "
+                         f"cycle median {(result['cycle'] or {}).get('median', 0):.1f} ms, {result['requests_per_cycle']} requests per cycle")
+    await hass.async_stop(force = True)
+    return report
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "solax_modbus benchmarks, results as json")
+    parser.add_argument("--output", default = None, help = "json file, default stdout")
+    parser.add_argument("--plugin", action = "append", default = None, help = "plugin to benchmark (repeatable), default all")
+    parser.add_argument("--serial", action = "append", default = None, help = "serial number prefix to benchmark (repeatable), default every prefix the plugin recognizes")
+    parser.add_argument("--cycles", type = int, default = 20, help = "polling cycles per inverter type")
+    parser.add_argument("--quick", action = "store_true", help = "only the first inverter type of each plugin")
+    parser.add_argument("--network", action = "store_true", help = "also poll the first plugin and serial prefix over localhost tcp: event loop stalls and pipelining")
+    parser.add_argument("--latency", type = float, default = 20, help = "response latency in ms of the simulator server of --network")
+    parser.add_argument("--replay", default = None, help = "poll a frame recording (<name>_frames.bin) instead of the simulated inverters, needs --plugin")
+    parser.add_argument("--interval", type = float, default = 15, help = "replay seconds per polling cycle of --replay")
+    parser.add_argument("--verbose", action = "store_true")
+    args = parser.parse_args(argv)
+    if args.replay and not args.plugin: parser.error("--replay needs --plugin")
+    logging.basicConfig(level = logging.WARNING, format = "%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.verbose: _LOGGER.setLevel(logging.INFO)
+    report = asyncio.run(async_run(args))
+    text = json.dumps(report, indent = 1)
+    if args.output:
+        with open(args.output, "w") as fp: fp.write(text)
+    else: sys.stdout.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -26,13 +26,12 @@ async def async_setup_entry(hass, entry, async_add_entities) -> None:
     }
     plugin = hub.plugin
     entities = []
-    for button_info in plugin.BUTTON_TYPES:
-        if plugin.matchInverterWithMask(hub._invertertype, button_info.allowedtypes, hub.seriesnumber, button_info.blacklist):
-            button = SolaXModbusButton( hub_name, hub, modbus_addr, device_info, button_info )
-            entities.append(button)
-            if button_info.key == plugin.wakeupButton(): hub.wakeupButton = button_info
-            if button_info.value_function: hub.computedButtons[button_info.key] = button_info
-            elif button_info.command == None: _LOGGER.warning(f"button without command and without value_function found: {button_info.key}")
+    for button_info in plugin.selectEntities(plugin.BUTTON_TYPES, hub._invertertype, hub.seriesnumber):
+        button = SolaXModbusButton( hub_name, hub, modbus_addr, device_info, button_info )
+        entities.append(button)
+        if button_info.key == plugin.wakeupButton(): hub.wakeupButton = button_info
+        if button_info.value_function: hub.computedButtons[button_info.key] = button_info
+        elif button_info.command == None: _LOGGER.warning(f"button without command and without value_function found: {button_info.key}")
     async_add_entities(entities)
     _LOGGER.info(f"hub.wakeuButton: {hub.wakeupButton}")
     return True
@@ -72,15 +71,15 @@ class SolaXModbusButton(ButtonEntity):
     async def async_press(self) -> None:
         """Write the button value."""
         if self._write_method == WRITE_MULTISINGLE_MODBUS:
-            LOGGER.info(f"writing {self._platform_name} button register {self._register} value {self._command}")
-            self._hub.write_registers_single(unit=self._modbus_addr, address=self._register, payload=self._command)
+            _LOGGER.info(f"writing {self._platform_name} button register {self._register} value {self._command}")
+            await self._hub.async_write_registers_single(unit=self._modbus_addr, address=self._register, payload=self._command)
         elif self._write_method == WRITE_SINGLE_MODBUS:
             _LOGGER.info(f"writing {self._platform_name} button register {self._register} value {self._command}")
-            self._hub.write_register(unit=self._modbus_addr, address=self._register, payload=self._command)
+            await self._hub.async_write_register(unit=self._modbus_addr, address=self._register, payload=self._command)
         elif self._write_method == WRITE_MULTI_MODBUS:
             if self.button_info.autorepeat:
                 duration = self._hub.data.get(self.button_info.autorepeat, 0)
                 autorepeat_set(self._hub.data, self.button_info.key, time() + duration - 0.5 )
             if self.button_info.value_function:
                 res = self.button_info.value_function(0, self.button_info, self._hub.data )
-                if res: self._hub.write_registers_multi(unit=self._modbus_addr, address=self._register, payload=res)
+                if res: await self._hub.async_write_registers_multi(unit=self._modbus_addr, address=self._register, payload=res)
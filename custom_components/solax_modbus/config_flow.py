@@ -24,6 +24,7 @@ from .const import (
 	DEFAULT_NAME,
 	DEFAULT_PORT,
 	DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SCAN_INTERVAL_FAST,
     DEFAULT_INTERFACE,
     DEFAULT_SERIAL_PORT,
     DEFAULT_MODBUS_ADDR,
@@ -39,10 +40,23 @@ from .const import (
     CONF_MODBUS_ADDR,
     CONF_BAUDRATE,
     CONF_PLUGIN,
+    CONF_POLL_ASYNC,
+    CONF_SCAN_INTERVAL_FAST,
+    CONF_TCP_PIPELINE,
+    CONF_PROXY_PORT,
+    CONF_PROXY_MAX_AGE,
+    CONF_PROXY_HOST,
+    CONF_RECORD_FRAMES,
 	DEFAULT_READ_EPS,
     DEFAULT_READ_DCB,
     DEFAULT_READ_PM,
     DEFAULT_PLUGIN,
+    DEFAULT_POLL_ASYNC,
+    DEFAULT_TCP_PIPELINE,
+    DEFAULT_PROXY_PORT,
+    DEFAULT_PROXY_MAX_AGE,
+    DEFAULT_PROXY_HOST,
+    DEFAULT_RECORD_FRAMES,
     PLUGIN_PATH,
     # PLUGIN_PATH_OLDSTYLE,
 )
@@ -97,9 +111,15 @@ CONFIG_SCHEMA = vol.Schema( {
         vol.Required(CONF_MODBUS_ADDR, default=DEFAULT_MODBUS_ADDR): int,
         vol.Required(CONF_PLUGIN, default=DEFAULT_PLUGIN): selector.SelectSelector(selector.SelectSelectorConfig(options=PLUGINS), ),
         vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int,
+        vol.Optional(CONF_SCAN_INTERVAL_FAST, default=DEFAULT_SCAN_INTERVAL_FAST): int,
         vol.Optional(CONF_READ_EPS, default=DEFAULT_READ_EPS): bool,
         vol.Optional(CONF_READ_DCB, default=DEFAULT_READ_DCB): bool,
         vol.Optional(CONF_READ_PM, default=DEFAULT_READ_PM): bool,
+        vol.Optional(CONF_POLL_ASYNC, default=DEFAULT_POLL_ASYNC): bool,
+        vol.Optional(CONF_PROXY_PORT, default=DEFAULT_PROXY_PORT): vol.All(int, vol.Range(min=0, max=65535)),
+        vol.Optional(CONF_PROXY_MAX_AGE, default=DEFAULT_PROXY_MAX_AGE): vol.All(int, vol.Range(min=0)),
+        vol.Optional(CONF_PROXY_HOST, default=DEFAULT_PROXY_HOST): str,
+        vol.Optional(CONF_RECORD_FRAMES, default=DEFAULT_RECORD_FRAMES): bool,
     } )
 
 OPTION_SCHEMA = vol.Schema( {
@@ -107,9 +127,15 @@ OPTION_SCHEMA = vol.Schema( {
         vol.Required(CONF_MODBUS_ADDR, default=DEFAULT_MODBUS_ADDR): int,
         vol.Required(CONF_PLUGIN, default=DEFAULT_PLUGIN): selector.SelectSelector(selector.SelectSelectorConfig(options=PLUGINS), ),
         vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int,
+        vol.Optional(CONF_SCAN_INTERVAL_FAST, default=DEFAULT_SCAN_INTERVAL_FAST): int,
         vol.Optional(CONF_READ_EPS, default=DEFAULT_READ_EPS): bool,
         vol.Optional(CONF_READ_DCB, default=DEFAULT_READ_DCB): bool,
         vol.Optional(CONF_READ_PM, default=DEFAULT_READ_PM): bool,
+        vol.Optional(CONF_POLL_ASYNC, default=DEFAULT_POLL_ASYNC): bool,
+        vol.Optional(CONF_PROXY_PORT, default=DEFAULT_PROXY_PORT): vol.All(int, vol.Range(min=0, max=65535)),
+        vol.Optional(CONF_PROXY_MAX_AGE, default=DEFAULT_PROXY_MAX_AGE): vol.All(int, vol.Range(min=0)),
+        vol.Optional(CONF_PROXY_HOST, default=DEFAULT_PROXY_HOST): str,
+        vol.Optional(CONF_RECORD_FRAMES, default=DEFAULT_RECORD_FRAMES): bool,
     } )
 
 
@@ -122,6 +148,7 @@ TCP_SCHEMA = vol.Schema( {
         vol.Required(CONF_HOST): str,
         vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
         vol.Required(CONF_TCP_TYPE, default=DEFAULT_TCP_TYPE): selector.SelectSelector(selector.SelectSelectorConfig(options=TCP_TYPES), ),
+        vol.Optional(CONF_TCP_PIPELINE, default=DEFAULT_TCP_PIPELINE): vol.All(int, vol.Range(min=1, max=16)),
     } )
 
 
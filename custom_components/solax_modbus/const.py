@@ -15,6 +15,7 @@ from homeassistant.helpers.entity import EntityCategory
 from pymodbus.payload import Endian
 from datetime import datetime
 from dataclasses import dataclass, replace
+import copy
 import pathlib
 
 from homeassistant.const import (
@@ -36,6 +37,7 @@ from homeassistant.const import (
 DOMAIN = "solax_modbus"
 DEFAULT_NAME = "SolaX"
 DEFAULT_SCAN_INTERVAL = 15
+DEFAULT_SCAN_INTERVAL_FAST = 5 # polling interval of the POLL_REALTIME registers
 DEFAULT_PORT = 502
 DEFAULT_MODBUS_ADDR = 1
 DEFAULT_TCP_TYPE = "tcp"
@@ -50,6 +52,13 @@ CONF_SERIAL_PORT = "read_serial_port"
 CONF_SolaX_HUB   = "solax_hub"
 CONF_BAUDRATE    = "baudrate"
 CONF_PLUGIN      = "plugin"
+CONF_POLL_ASYNC  = "poll_async"
+CONF_SCAN_INTERVAL_FAST = "scan_interval_fast"
+CONF_TCP_PIPELINE = "tcp_pipeline"
+CONF_PROXY_PORT  = "proxy_port"
+CONF_PROXY_MAX_AGE = "proxy_max_age"
+CONF_PROXY_HOST  = "proxy_host"
+CONF_RECORD_FRAMES = "record_frames"
 ATTR_MANUFACTURER = "SolaX Power"
 DEFAULT_INTERFACE  = "tcp"
 DEFAULT_SERIAL_PORT = "/dev/ttyUSB0"
@@ -58,11 +67,52 @@ DEFAULT_READ_DCB = False
 DEFAULT_READ_PM = False
 DEFAULT_BAUDRATE = "19200"
 DEFAULT_PLUGIN        = "solax"
+DEFAULT_POLL_ASYNC    = True # use the pymodbus asyncio clients; False falls back to the blocking clients
+DEFAULT_TCP_PIPELINE  = 1 # modbus tcp requests kept in flight; 1 disables pipelining
+PIPELINE_RETRY_INTERVAL = 3600 # seconds before pipelining is tried again after a fallback to sequential requests, doubled after each fallback
+PIPELINE_RETRY_MAX      = 86400
+DEFAULT_PROXY_PORT    = 0 # tcp port of the modbus proxy server for other clients; 0 disables it
+DEFAULT_PROXY_MAX_AGE = 30 # seconds a polled register value may be served from the cache by the proxy
+DEFAULT_PROXY_HOST    = "127.0.0.1" # address the modbus proxy listens on; 0.0.0.0 for all interfaces
+DEFAULT_RECORD_FRAMES = False # append the raw read responses to <config>/<name>_frames.bin, see recorder.py
 PLUGIN_PATH = f"{pathlib.Path(__file__).parent.absolute()}/plugin_*.py"
 SLEEPMODE_NONE   = None
 SLEEPMODE_ZERO   = 0 # when no communication at all
 SLEEPMODE_LAST   = 1 # when no communication at all
 SLEEPMODE_LASTAWAKE = 2 # when still responding but register must be ignored when not awake
+POLL_REALTIME    = 0 # read every scan_interval_fast seconds
+POLL_NORMAL      = 1 # read every scan_interval seconds
+POLL_SLOW        = 2 # read every POLL_SLOW_INTERVAL seconds, e.g. clocks and configuration
+POLL_STATIC      = 3 # read after startup or wakeup and every POLL_STATIC_INTERVAL seconds, e.g. serial numbers and firmware versions
+POLL_SLOW_INTERVAL   = 300
+POLL_STATIC_INTERVAL = 3600
+PRIO_WRITE       = 0 # bus request priorities, lowest value first: control writes
+PRIO_REALTIME    = 1 # POLL_REALTIME block reads
+PRIO_NORMAL      = 2 # POLL_NORMAL block reads and other requests
+PRIO_SLOW        = 3 # POLL_SLOW and POLL_STATIC block reads
+TIER_PRIORITY    = { POLL_REALTIME: PRIO_REALTIME, POLL_NORMAL: PRIO_NORMAL, POLL_SLOW: PRIO_SLOW, POLL_STATIC: PRIO_SLOW, }
+STATE_ONLINE     = "online" # last cycle succeeded, full polling
+STATE_DEGRADED   = "degraded" # device answers but a block failed, full scans with backoff
+STATE_ASLEEP     = "asleep" # device does not answer, single register probes with backoff
+STATE_OFFLINE    = "offline" # no connection to the device or gateway, single register probes with backoff
+BACKOFF_MAX      = 60 # longest wait in seconds between attempts while not online, bounds the wakeup detection delay
+WRITE_COALESCE_WINDOW = 0.1 # seconds during which register writes are collected before they are sent, so adjacent ones can share a frame
+READBACK_DELAY   = 0.5 # seconds between a write acknowledge and the read-back of the block holding its sensor
+READBACK_COOLDOWN = 5 # shortest time in seconds between two read-backs of the same block
+BACKOFF_JITTER   = 0.2 # random +/- fraction applied to each backoff delay, so hubs on one bus do not retry in lockstep
+LINK_TCP_OVERHEAD      = 0.03 # assumed seconds per request on a tcp link, until measured
+LINK_TCP_REGISTER      = 0.00005 # assumed seconds per register on a tcp link, until measured
+LINK_SERIAL_TURNAROUND = 0.02 # assumed device response delay on a serial link, until measured
+LINK_MODEL_SAMPLES     = 20 # successful block reads needed before the measured cost model replaces the assumed one
+STATS_WINDOW           = 200 # recent reads (cycles) in the rolling latency histograms and error rates, see instrumentation.py
+HOLES_STORAGE_VERSION  = 1 # version of the stored map of unreadable register ranges per serial number
+HOLES_SAVE_DELAY       = 10 # seconds to wait before writing a modified hole map
+HOLES_MAX_AGE          = 7 * 86400 # seconds after which a learned hole is forgotten, the next read of its block learns it again if still unreadable (firmware updates)
+HOLES_RETRY_DELAY      = POLL_STATIC_INTERVAL # seconds before bisecting a block again that refused all its registers while the device did not answer elsewhere
+ILLEGAL_ADDRESS        = 0x02 # the only modbus exception code learned as a hole; busy (0x05, 0x06) and gateway (0x0A, 0x0B) exceptions are transient
+IDENTITY_STORAGE_VERSION = 1 # version of the cached serial number and inverter type per config entry
+LOCALDATA_STORAGE_VERSION = 1 # version of the stored WRITE_DATA_LOCAL values
+LOCALDATA_SAVE_DELAY   = 5 # seconds to wait before writing modified WRITE_DATA_LOCAL values, later changes are written together
 
 
 # ================================= Definitions for Sensor Declarations =================================================
@@ -83,6 +133,20 @@ WRITE_MULTISINGLE_MODBUS  = 2 # use write_mutiple modbus command for single regi
 WRITE_DATA_LOCAL          = 3 # write only to local data storage (not persistent)
 WRITE_MULTI_MODBUS        = 4 # use write_multiple modbus command
 
+# decode plan entry kinds and scaling modes, see sensor.compileBlock
+PLAN_VALUE       = 0 # single value from the unpacked tuple
+PLAN_ULSB16MSB16 = 1 # two 16bit values, least significant first
+PLAN_WORDS       = 2 # list of wordcount 16bit values
+PLAN_STR         = 3 # ascii string sliced from the raw payload
+PLAN_U8L         = 4 # low byte of a 16bit value
+PLAN_U8H         = 5 # high byte of a 16bit value
+PLAN_ZERO        = 6 # undefined unit, returns zero
+PLAN_NONE        = 7 # entity does not fit in the response, returns None
+SCALE_RAW        = 0 # no scaling needed
+SCALE_NUM        = 1 # round(val*scale, rounding)
+SCALE_DICT       = 2 # translate int to string
+SCALE_FUNC       = 3 # call scale(val, descr, datadict)
+
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -101,6 +165,9 @@ class plugin_base:
     auto_block_ignore_readerror: bool = None # if True or False, inserts a ignore_readerror statement for each block
     order16: int = None # Endian.BIG or Endian.LITTLE
     order32: int = None
+    write_merge_limit: int = 123 # most registers combined in one write_registers frame by the write queue, 1 disables merging
+    write_merge_single: bool = False # True if WRITE_SINGLE_MODBUS registers also accept write_registers (function 16) frames
+    poll_always: tuple = ('run_mode',) # sensor keys read by the plugin itself (isAwake), polled even when their entity is disabled
 
     def isAwake(self, datadict): 
         return True # always awake by default
@@ -111,12 +178,34 @@ class plugin_base:
     def determineInverterType(self, hub, configdict): 
         return 0
 
+    def restoreInverterType(self, hub, invertertype): # called instead of determineInverterType when the type comes from the identity cache
+        return invertertype
+
     def matchInverterWithMask (self, inverterspec, entitymask, serialnumber = 'not relevant', blacklist = None):
         return False
 
     def localDataCallback(self, hub): # called when local data is updated or on startup
         return True
 
+    def hubContext(self):
+        # per hub view of the module level plugin_instance: description tables and caches stay shared, attributes assigned by one hub (e.g. SENSOR_TYPES for MIC) stay with that hub
+        self.__dict__.setdefault('_selection_cache', {})
+        return copy.copy(self)
+
+    def selectEntities(self, descriptions, invertertype, serialnumber = 'not relevant'):
+        # matchInverterWithMask over a whole description list, cached per (type, matching blacklist prefixes) and shared by all hubs of this plugin
+        cache = self.__dict__.setdefault('_selection_cache', {})
+        prefixes = cache.get(id(descriptions))
+        if prefixes is None or prefixes[0] is not descriptions:
+            prefixes = (descriptions, tuple(sorted({ start for descr in descriptions if descr.blacklist for start in descr.blacklist })), )
+            cache[id(descriptions)] = prefixes
+        key = (id(descriptions), invertertype, tuple(start for start in prefixes[1] if serialnumber.startswith(start)), )
+        selected = cache.get(key)
+        if selected is None:
+            selected = [ descr for descr in descriptions if self.matchInverterWithMask(invertertype, descr.allowedtypes, serialnumber, descr.blacklist) ]
+            cache[key] = selected
+        return selected
+
 # =================================== base class for sensor entity descriptions =========================================
 
 @dataclass
@@ -132,8 +221,10 @@ class BaseModbusSensorEntityDescription(SensorEntityDescription):
     register_type: int = None # REGISTER_HOLDING or REGISTER_INPUT or REG_DATA
     unit: int = None # e.g. REGISTER_U16
     newblock: bool = False # set to True to start a new modbus read block operation - do not use frequently
+    poll_tier: int = None # POLL_REALTIME, POLL_NORMAL, POLL_SLOW or POLL_STATIC; None: POLL_STATIC for strings, else POLL_NORMAL
     #prevent_update: bool = False # if set to True, value will not be re-read/updated with each polling cycle; only when read value changes
     value_function: callable = None #  value = function(initval, descr, datadict)
+    depends_on: list = None # hub.data keys read by the value_function of a computed sensor; None: as declared with value_inputs, else evaluated every cycle
     wordcount: int = None # only for unit = REGISTER_STR and REGISTER_WORDS
     sleepmode: int = SLEEPMODE_LAST # or SLEEPMODE_ZERO or SLEEPMODE_NONE
     ignore_readerror: bool = False # if not False, ignore read errors for this block and return this static value
@@ -143,6 +234,12 @@ class BaseModbusSensorEntityDescription(SensorEntityDescription):
                                    # This only works if the first entity of a block contains this attribute
                                    # When simply set to True, no initial value will be returned, but the block will be considered valid
 
+@dataclass
+class HubDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """ diagnostic sensor on the instrumentation of the hub itself rather than on a modbus register """
+    value: callable = None # value = function(hub)
+    attributes: callable = None # extra state attributes = function(hub)
+
 @dataclass
 class BaseModbusButtonEntityDescription(ButtonEntityDescription):
     allowedtypes: int = 0 # overload with ALLDEFAULT from plugin  
@@ -196,49 +293,68 @@ def autorepeat_remaining(datadict, entitykey, timestamp):
 
 # ================================= Computed sensor value functions  =================================================
 
+def value_inputs(*keys, volatile = False):
+    """ decorator declaring the hub.data keys a value_function reads; registers of disabled entities are still polled when a function reads them
+        the hub only re-runs a computed sensor when one of them changed, unless volatile (e.g. time based) """
+    def declare(func):
+        func.depends_on = keys
+        func.volatile = volatile
+        return func
+    return declare
+
+@value_inputs('pv_power_1', 'pv_power_2', 'pv_power_3')
 def value_function_pv_power_total(initval, descr, datadict):
     return  datadict.get('pv_power_1', 0) + datadict.get('pv_power_2',0) + datadict.get('pv_power_3',0)
 
+@value_inputs('battery_power_charge')
 def value_function_battery_output(initval, descr, datadict):
     val = datadict.get('battery_power_charge', 0)
     if val<0: return abs(val)
     else: return 0
 
+@value_inputs('battery_power_charge')
 def value_function_battery_input(initval, descr, datadict):
     val = datadict.get('battery_power_charge', 0)
     if val>0: return val
     else: return 0
 
+@value_inputs('battery_charge_direction', 'battery_power')
 def value_function_battery_output_solis(initval, descr, datadict):
     inout = datadict.get('battery_charge_direction', 0)
     val = datadict.get('battery_power', 0)
     if inout == 1: return abs(val)
     else: return 0
 
+@value_inputs('battery_charge_direction', 'battery_power')
 def value_function_battery_input_solis(initval, descr, datadict):
     inout = datadict.get('battery_charge_direction', 0)
     val = datadict.get('battery_power', 0)
     if inout == 0: return val
     else: return 0
 
+@value_inputs('measured_power')
 def value_function_grid_import(initval, descr, datadict):
     val = datadict.get('measured_power', 0)
     if val<0: return abs(val)
     else: return 0
 
+@value_inputs('measured_power')
 def value_function_grid_export(initval, descr, datadict):
     val = datadict.get('measured_power', 0)
     if val>0: return val
     else: return 0
 
+@value_inputs('inverter_load', 'measured_power')
 def value_function_house_load(initval, descr, datadict):
     return ( datadict.get('inverter_load', 0) - datadict.get('measured_power', 0) )
 
+@value_inputs('pv_power_1', 'pv_power_2', 'pv_power_3', 'battery_power_charge', 'measured_power')
 def value_function_house_load_alt(initval, descr, datadict):
     return (   datadict.get('pv_power_1', 0) +  datadict.get('pv_power_2', 0) + datadict.get('pv_power_3', 0)
              - datadict.get('battery_power_charge', 0)
              - datadict.get('measured_power', 0) )
 
+@value_inputs()
 def value_function_sync_rtc(initval, descr, datadict):
     now = datetime.now()
     return [ (REGISTER_U16, now.second, ),
@@ -249,6 +365,7 @@ def value_function_sync_rtc(initval, descr, datadict):
              (REGISTER_U16, now.year % 100, ),
            ]
 
+@value_inputs()
 def value_function_sync_rtc_ymd(initval, descr, datadict):
     now = datetime.now()
     return [ (REGISTER_U16, now.year % 100, ),
@@ -0,0 +1,12 @@
+"""Diagnostics download of a solax_modbus hub: configuration, connection state, block layout and read statistics."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_HOST, CONF_NAME
+
+from .const import DOMAIN, CONF_SERIAL_PORT
+
+TO_REDACT = { CONF_HOST, CONF_SERIAL_PORT, }
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    hub_name = entry.data[CONF_NAME] if entry.data else entry.options[CONF_NAME] # old style entries keep the name in data
+    hub = hass.data[DOMAIN][hub_name]["hub"]
+    return { "config": async_redact_data(dict(entry.options), TO_REDACT), **hub.diagnostics(), }
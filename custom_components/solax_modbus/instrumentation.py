@@ -0,0 +1,101 @@
+"""Fixed size latency histograms and per block read statistics of a hub, for the diagnostic sensors and the diagnostics download."""
+from bisect import bisect_left
+from collections import Counter, deque
+
+from pymodbus.exceptions import ConnectionException
+from pymodbus.pdu import ExceptionResponse
+
+BUCKETS = tuple(0.05 * 2 ** (i / 4) for i in range(80)) # upper bucket edges in ms, 0.05 ms .. 50 s in steps of 19%
+
+class Histogram:
+    """ latency histogram of a rolling window of about window samples: the counts of the current and the previous half window
+        memory is fixed, percentiles are the upper edge of the bucket they fall in """
+
+    def __init__(self, window):
+        self._half = max(1, window // 2)
+        self._current = [0] * (len(BUCKETS) + 1)
+        self._previous = [0] * (len(BUCKETS) + 1)
+        self._n = 0 # samples in the current half window
+        self.last = None # ms
+        self.total = 0 # samples since start
+
+    def add(self, ms):
+        if self._n >= self._half:
+            (self._previous, self._current, self._n,) = (self._current, [0] * (len(BUCKETS) + 1), 0,)
+        self._current[bisect_left(BUCKETS, ms)] += 1
+        self._n += 1
+        self.total += 1
+        self.last = ms
+
+    def percentiles(self, *ps):
+        counts = [ a + b for (a, b,) in zip(self._current, self._previous) ]
+        n = sum(counts)
+        if not n: return [ None for p in ps ]
+        result = []
+        for p in ps:
+            (rank, seen,) = (p / 100 * n, 0,)
+            for (i, count,) in enumerate(counts):
+                seen += count
+                if seen >= rank: break
+            result.append(round(BUCKETS[min(i, len(BUCKETS) - 1)], 2))
+        return result
+
+    def summary(self):
+        (p50, p95, p99,) = self.percentiles(50, 95, 99)
+        return { "last_ms": None if self.last == None else round(self.last, 2), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "samples": self.total, }
+
+class Outcomes:
+    """ error classes (None for success) of the last window reads """
+
+    def __init__(self, window):
+        self._recent = deque(maxlen = window)
+
+    def add(self, error):
+        self._recent.append(error)
+
+    def error_rate(self):
+        """ percentage of failed reads in the window, None before the first read """
+        if not self._recent: return None
+        return round(100 * sum(1 for e in self._recent if e != None) / len(self._recent), 1)
+
+    def errors(self):
+        return dict(Counter(e for e in self._recent if e != None))
+
+class BlockStats:
+    """ instrumentation of one planned block: round trip and decode time, size, bytes transferred and outcome of its reads """
+
+    def __init__(self, registers, window):
+        self.registers = registers
+        self.rtt = Histogram(window)
+        self.decode = Histogram(window)
+        self.outcomes = Outcomes(window)
+        self.bytes = 0 # request and response bytes since start
+
+    def add(self, rtt, decode, nbytes, error):
+        self.rtt.add(rtt * 1000)
+        if decode != None: self.decode.add(decode * 1000)
+        self.bytes += nbytes
+        self.outcomes.add(error)
+
+    def summary(self):
+        return { "registers": self.registers, "bytes": self.bytes, "rtt": self.rtt.summary(), "decode": self.decode.summary(),
+                 "error_rate_pct": self.outcomes.error_rate(), "errors": self.outcomes.errors(), }
+
+def errorClass(response, ex = None, count = 0):
+    """ classify the outcome of a block read: None for success, else connection, no_response, exception_<code> or short_response """
+    if ex != None: return "connection" if isinstance(ex, ConnectionException) else "no_response"
+    if isinstance(response, ExceptionResponse): return f"exception_{response.exception_code}"
+    if (response == None) or response.isError(): return "no_response"
+    if len(response.registers) < count: return "short_response"
+    return None
+
+def frameBytes(framing, count, response):
+    """ bytes on the wire for a read of count registers and its response (0 when there was none), for 'tcp', 'rtu' or 'ascii' framing """
+    if framing == "tcp": (overhead, factor,) = (7, 1,) # mbap header including the unit id
+    elif framing == "ascii": (overhead, factor,) = (7, 2,) # ':', address and lrc as hex, crlf; pdu bytes as 2 hex characters
+    else: (overhead, factor,) = (3, 1,) # address and crc
+    sent = overhead + 5 * factor # function, address, count
+    if isinstance(response, ExceptionResponse): received = overhead + 2 * factor
+    elif (response == None) or response.isError(): received = 0
+    else: received = overhead + (2 + 2 * len(response.registers)) * factor
+    return sent + received
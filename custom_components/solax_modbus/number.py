@@ -26,16 +26,15 @@ async def async_setup_entry(hass, entry, async_add_entities) -> None:
     }
     plugin = hub.plugin #getPlugin(hub_name)
     entities = []
-    for number_info in plugin.NUMBER_TYPES:
+    for number_info in plugin.selectEntities(plugin.NUMBER_TYPES, hub._invertertype, hub.seriesnumber):
         newdescr = number_info
         if number_info.read_scale_exceptions:
             for (prefix, value,) in number_info.read_scale_exceptions: 
                 if hub.seriesnumber.startswith(prefix): newdescr = replace(number_info, read_scale = value)
-        if plugin.matchInverterWithMask(hub._invertertype,newdescr.allowedtypes, hub.seriesnumber ,newdescr.blacklist):
-            number = SolaXModbusNumber( hub_name, hub, modbus_addr, device_info, newdescr) 
-            if newdescr.write_method==WRITE_DATA_LOCAL:  hub.writeLocals[newdescr.key] = newdescr
-            hub.numberEntities[newdescr.key] = number
-            entities.append(number)
+        number = SolaXModbusNumber( hub_name, hub, modbus_addr, device_info, newdescr) 
+        if newdescr.write_method==WRITE_DATA_LOCAL:  hub.writeLocals[newdescr.key] = newdescr
+        hub.numberEntities[newdescr.key] = number
+        entities.append(number)
     async_add_entities(entities)
     return True
 
@@ -77,10 +76,10 @@ class SolaXModbusNumber(NumberEntity):
 
     async def async_added_to_hass(self) -> None:
         """Register callbacks."""
-        self._hub.async_add_solax_modbus_sensor(self._modbus_data_updated)
+        self._hub.async_add_solax_modbus_sensor(self._modbus_data_updated, self._key)
 
     async def async_will_remove_from_hass(self) -> None:
-        self._hub.async_remove_solax_modbus_sensor(self._modbus_data_updated)
+        self._hub.async_remove_solax_modbus_sensor(self._modbus_data_updated, self._key)
     
     """ remove duplicate declaration
     async def async_set_value(self, native_value: float) -> None:
@@ -141,10 +140,12 @@ class SolaXModbusNumber(NumberEntity):
             payload = int(value/(self._attr_scale*self.entity_description.read_scale))
         if self._write_method == WRITE_MULTISINGLE_MODBUS:
             _LOGGER.info(f"writing {self._platform_name} {self._key} number register {self._register} value {payload} after div by readscale {self.entity_description.read_scale} scale {self._attr_scale}")
-            self._hub.write_registers_single(unit=self._modbus_addr, address=self._register, payload=payload)
+            await self._hub.async_write_registers_single(unit=self._modbus_addr, address=self._register, payload=payload)
+            self._hub.schedule_readback(self._key, self._register)
         elif self._write_method == WRITE_SINGLE_MODBUS:
             _LOGGER.info(f"writing {self._platform_name} {self._key} number register {self._register} value {payload} after div by readscale {self.entity_description.read_scale} scale {self._attr_scale}")
-            self._hub.write_register(unit=self._modbus_addr, address=self._register, payload=payload)
+            await self._hub.async_write_register(unit=self._modbus_addr, address=self._register, payload=payload)
+            self._hub.schedule_readback(self._key, self._register)
         elif self._write_method == WRITE_DATA_LOCAL:
             _LOGGER.info(f"*** local data written {self._key}: {payload}")
             #corresponding_sensor = self._hub.preventSensors.get(self.entity_description.key, None)
@@ -154,5 +155,7 @@ class SolaXModbusNumber(NumberEntity):
                 # corresponding_sensor.async_write_ha_state()
             self._hub.localsUpdated = True # mark to save permanently
         self._hub.data[self._key] = value/self.entity_description.read_scale
+        self._hub.note_written(self._key)
+        if self._write_method == WRITE_DATA_LOCAL: self._hub.async_save_local_data()
         #_LOGGER.info(f"*** data written part 2 {self._key}: {self._hub.data[self._key]}")
         self.async_write_ha_state() # is this needed ?
@@ -88,6 +88,7 @@ class GrowattModbusSensorEntityDescription(BaseModbusSensorEntityDescription):
 
 # ====================================== Computed value functions  =================================================
 
+@value_inputs('timed_charge_start_h', 'timed_charge_start_m', 'timed_charge_end_h', 'timed_charge_end_m', 'timed_discharge_start_h', 'timed_discharge_start_m', 'timed_discharge_end_h', 'timed_discharge_end_m')
 def value_function_timingmode(initval, descr, datadict):
     return  [ ('timed_charge_start_h', datadict.get('timed_charge_start_h', 0), ),
               ('timed_charge_start_m', datadict.get('timed_charge_start_m', 0), ),
@@ -99,9 +100,11 @@ def value_function_timingmode(initval, descr, datadict):
               ('timed_discharge_end_m', datadict.get('timed_discharge_end_m', 0), ),
             ]
 
+@value_inputs('today_pv1_solar_energy', 'today_pv2_solar_energy', 'today_pv3_solar_energy', 'today_pv4_solar_energy')
 def value_function_today_solar_energy(initval, descr, datadict):
     return  datadict.get('today_pv1_solar_energy', 0) + datadict.get('today_pv2_solar_energy',0) + datadict.get('today_pv3_solar_energy',0) + datadict.get('today_pv4_solar_energy',0)
 
+@value_inputs('battery_charge_power', 'battery_discharge_power')
 def value_function_combined_battery_power(initval, descr, datadict):
     return  datadict.get('battery_charge_power', 0) - datadict.get('battery_discharge_power',0) 
 
@@ -96,17 +96,21 @@ class SofarModbusSensorEntityDescription(BaseModbusSensorEntityDescription):
 
 # ====================================== Computed value functions  =================================================
 
+@value_inputs('passive_mode_battery_power')
 def value_function_passivemode(initval, descr, datadict):
     return [ (REGISTER_S32, 0, ),
             (REGISTER_S32, datadict.get('passive_mode_battery_power', 0)), 
             (REGISTER_S32, datadict.get('passive_mode_battery_power', 0)),
            ]
 
+@value_inputs('reflux_control', 'reflux_power', 'ro_reflux_control', 'ro_reflux_power')
 def value_function_refluxcontrol(initval, descr, datadict):
     return  [ ('reflux_control', datadict.get('reflux_control', datadict.get('ro_reflux_control')), ),
               ('reflux_power', datadict.get('reflux_power', datadict.get('ro_reflux_power')), ), 
             ]
 
+@value_inputs('timing_id', 'timing_charge', 'timing_charge_start_time', 'timing_charge_end_time', 'timing_discharge_start_time', 'timing_discharge_end_time', 'timing_charge_power', 'timing_discharge_power',
+              'ro_timing_id', 'ro_timing_charge', 'ro_timing_charge_start_time', 'ro_timing_charge_end_time', 'ro_timing_discharge_start_time', 'ro_timing_discharge_end_time', 'ro_timing_charge_power', 'ro_timing_discharge_power')
 def value_function_timingmode(initval, descr, datadict):
     return  [ ('timing_id', datadict.get('timing_id', datadict.get('ro_timing_id')), ),
               ('timing_charge', datadict.get('timing_charge', datadict.get('ro_timing_charge')), ),
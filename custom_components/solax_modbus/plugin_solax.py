@@ -100,6 +100,8 @@ class SolaXMicModbusSensorEntityDescription(BaseModbusSensorEntityDescription):
 
 # ====================================== Computed value functions  =================================================
 
+@value_inputs('remotecontrol_power_control', 'remotecontrol_set_type', 'remotecontrol_active_power', 'remotecontrol_reactive_power', 'remotecontrol_duration', 'remotecontrol_import_limit',
+              'active_power_upper', 'active_power_lower', 'reactive_power_upper', 'reactive_power_lower', 'measured_power', 'pv_power_total', 'inverter_load', 'battery_power_charge')
 def value_function_remotecontrol_recompute(initval, descr, datadict):
     power_control  = datadict.get('remotecontrol_power_control', "Disabled")
     set_type       = datadict.get('remotecontrol_set_type', "Set") # other options did not work
@@ -153,6 +155,7 @@ def value_function_remotecontrol_recompute(initval, descr, datadict):
     _LOGGER.debug(f"Evaluated remotecontrol_trigger: corrected/clamped values: {res}")
     return res
 
+@value_inputs(volatile = True) # counts down, reads only the autorepeat state
 def value_function_remotecontrol_autorepeat_remaining(initval, descr, datadict):
     return autorepeat_remaining(datadict, 'remotecontrol_trigger', time())
 
@@ -1769,6 +1772,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Firmware Version Inverter Master",
         key = "firmwareversion_invertermaster",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         register = 0x7D,
         allowedtypes = GEN2 | GEN3,
@@ -1779,6 +1783,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Inverter DSP firmware minor version",
         key = "firmware_DSP_minor_version",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         register = 0x7D,
         allowedtypes = GEN4,
@@ -1788,6 +1793,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
         SolaXModbusSensorEntityDescription(
         name = "Inverter DSP hardware version",
         key = "firmware_DSP_hardware_version",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         register = 0x7E,
         allowedtypes = GEN4,
@@ -1797,6 +1803,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
         SolaXModbusSensorEntityDescription(
         name = "Inverter DSP firmware major version",
         key = "firmware_DSP_major_version",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         register = 0x7F,
         allowedtypes = GEN4,
@@ -1806,6 +1813,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
         SolaXModbusSensorEntityDescription(
         name = "Inverter ARM firmware major version",
         key = "firmware_ARM_major_version",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         register = 0x80,
         allowedtypes = GEN4,
@@ -1815,6 +1823,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Firmware Version Modbus TCP Major",
         key = "firmwareversion_modbustcp_major",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         register = 0x81,
         allowedtypes = GEN2 | GEN3 | GEN4,
@@ -1824,6 +1833,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Firmware Version Modbus TCP Minor",
         key = "firmwareversion_modbustcp_minor",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         allowedtypes = GEN2 | GEN3 | GEN4,
         register = 0x82,
@@ -1833,6 +1843,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Firmware Version Manager",
         key = "firmwareversion_manager",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         allowedtypes = GEN2 | GEN3,
         register = 0x83,
@@ -1842,6 +1853,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Inverter ARM firmware minor version",
         key = "firmware_ARM_minor_version",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         allowedtypes = GEN4,
         register = 0x83,
@@ -1851,6 +1863,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Bootloader Version",
         key = "bootloader_version",
+        poll_tier = POLL_STATIC,
         entity_registry_enabled_default = False,
         allowedtypes = GEN2 | GEN3 | GEN4,
         register = 0x84,
@@ -1860,6 +1873,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "RTC",
         key = "rtc",
+        poll_tier = POLL_SLOW,
         register = 0x85,
         unit = REGISTER_WORDS,
         wordcount = 6,
@@ -3264,6 +3278,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Inverter Power",
         key = "inverter_load",
+        poll_tier = POLL_REALTIME,
         native_unit_of_measurement = UnitOfPower.WATT,
         device_class = SensorDeviceClass.POWER,
         state_class = SensorStateClass.MEASUREMENT,
@@ -3381,6 +3396,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "PV Power 1",
         key = "pv_power_1",
+        poll_tier = POLL_REALTIME,
         native_unit_of_measurement = UnitOfPower.WATT,
         device_class = SensorDeviceClass.POWER,
         state_class = SensorStateClass.MEASUREMENT,
@@ -3392,6 +3408,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "PV Power 2",
         key = "pv_power_2",
+        poll_tier = POLL_REALTIME,
         native_unit_of_measurement = UnitOfPower.WATT,
         device_class = SensorDeviceClass.POWER,
         state_class = SensorStateClass.MEASUREMENT,
@@ -3460,6 +3477,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Battery Power Charge",
         key = "battery_power_charge",
+        poll_tier = POLL_REALTIME,
         native_unit_of_measurement = UnitOfPower.WATT,
         device_class = SensorDeviceClass.POWER,
         state_class = SensorStateClass.MEASUREMENT,
@@ -3659,6 +3677,7 @@ SENSOR_TYPES_MAIN: list[SolaXModbusSensorEntityDescription] = [
     SolaXModbusSensorEntityDescription(
         name = "Measured Power",
         key = "measured_power",
+        poll_tier = POLL_REALTIME,
         native_unit_of_measurement = UnitOfPower.WATT,
         device_class = SensorDeviceClass.POWER,
         state_class = SensorStateClass.MEASUREMENT,
@@ -5966,6 +5985,10 @@ class solax_plugin(plugin_base):
         #else: self.SENSOR_TYPES = SENSOR_TYPES_MAIN
         return invertertype
 
+    def restoreInverterType(self, hub, invertertype):
+        if invertertype & MIC: self.SENSOR_TYPES = SENSOR_TYPES_MIC
+        return invertertype
+
     def matchInverterWithMask (self, inverterspec, entitymask, serialnumber = 'not relevant', blacklist = None):
         # returns true if the entity needs to be created for an inverter
         genmatch = ((inverterspec & entitymask & ALL_GEN_GROUP)  != 0) or (entitymask & ALL_GEN_GROUP  == 0)
@@ -90,6 +90,8 @@ class SolaXA1J1ModbusSensorEntityDescription(BaseModbusSensorEntityDescription):
 
 # ====================================== Computed value functions  =================================================
 
+@value_inputs('remotecontrol_power_control', 'remotecontrol_set_type', 'remotecontrol_active_power', 'remotecontrol_reactive_power', 'remotecontrol_duration', 'remotecontrol_import_limit',
+              'active_power_upper', 'active_power_lower', 'reactive_power_upper', 'reactive_power_lower', 'measured_power', 'pv_power_total', 'inverter_load', 'battery_power_charge')
 def value_function_remotecontrol_recompute(initval, descr, datadict):
     power_control  = datadict.get('remotecontrol_power_control', "Disabled")
     set_type       = datadict.get('remotecontrol_set_type', "Set") # other options did not work
@@ -143,6 +145,7 @@ def value_function_remotecontrol_recompute(initval, descr, datadict):
     _LOGGER.debug(f"Evaluated remotecontrol_trigger: corrected/clamped values: {res}")
     return res
 
+@value_inputs(volatile = True) # counts down, reads only the autorepeat state
 def value_function_remotecontrol_autorepeat_remaining(initval, descr, datadict):
     return autorepeat_remaining(datadict, 'remotecontrol_trigger', time())
 
@@ -1050,6 +1053,10 @@ class solax_a1j1_plugin(plugin_base):
         #else: self.SENSOR_TYPES = SENSOR_TYPES_MAIN
         return invertertype
 
+    def restoreInverterType(self, hub, invertertype):
+        if invertertype & MIC: self.SENSOR_TYPES = SENSOR_TYPES_MIC
+        return invertertype
+
     def matchInverterWithMask (self, inverterspec, entitymask, serialnumber = 'not relevant', blacklist = None):
         # returns true if the entity needs to be created for an inverter
         genmatch = ((inverterspec & entitymask & ALL_GEN_GROUP)  != 0) or (entitymask & ALL_GEN_GROUP  == 0)
@@ -89,6 +89,7 @@ class SolisModbusSensorEntityDescription(BaseModbusSensorEntityDescription):
 
 # ====================================== Computed value functions  =================================================
 
+@value_inputs('timed_charge_start_h', 'timed_charge_start_m', 'timed_charge_end_h', 'timed_charge_end_m', 'timed_discharge_start_h', 'timed_discharge_start_m', 'timed_discharge_end_h', 'timed_discharge_end_m')
 def value_function_timingmode(initval, descr, datadict):
     return  [ ('timed_charge_start_h', datadict.get('timed_charge_start_h', 0), ),
               ('timed_charge_start_m', datadict.get('timed_charge_start_m', 0), ),
@@ -99,6 +100,7 @@ def value_function_timingmode(initval, descr, datadict):
               ('timed_discharge_end_h', datadict.get('timed_discharge_end_h', 0), ),
               ('timed_discharge_end_m', datadict.get('timed_discharge_end_m', 0), ),
             ]
+@value_inputs('timed_charge_start_h_2', 'timed_charge_start_m_2', 'timed_charge_end_h_2', 'timed_charge_end_m_2', 'timed_discharge_start_h_2', 'timed_discharge_start_m_2', 'timed_discharge_end_h_2', 'timed_discharge_end_m_2')
 def value_function_timingmode2(initval, descr, datadict):
     return  [
               ('timed_charge_start_h_2', datadict.get('timed_charge_start_h_2', 0), ),
@@ -111,6 +113,7 @@ def value_function_timingmode2(initval, descr, datadict):
               ('timed_discharge_end_m_2', datadict.get('timed_discharge_end_m_2', 0), ),
             ]
 
+@value_inputs('timed_charge_start_h_3', 'timed_charge_start_m_3', 'timed_charge_end_h_3', 'timed_charge_end_m_3', 'timed_discharge_start_h_3', 'timed_discharge_start_m_3', 'timed_discharge_end_h_3', 'timed_discharge_end_m_3')
 def value_function_timingmode3(initval, descr, datadict):
     return  [
               ('timed_charge_start_h_3', datadict.get('timed_charge_start_h_3', 0), ),
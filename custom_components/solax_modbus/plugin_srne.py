@@ -90,6 +90,8 @@ class SRNEModbusSensorEntityDescription(BaseModbusSensorEntityDescription):
 
 # ====================================== Computed value functions  =================================================
 
+@value_inputs('remotecontrol_power_control', 'remotecontrol_set_type', 'remotecontrol_active_power', 'remotecontrol_reactive_power', 'remotecontrol_duration', 'remotecontrol_import_limit',
+              'active_power_upper', 'active_power_lower', 'reactive_power_upper', 'reactive_power_lower', 'measured_power', 'pv_power_total', 'inverter_load', 'battery_power_charge')
 def value_function_remotecontrol_recompute(initval, descr, datadict):
     power_control  = datadict.get('remotecontrol_power_control', "Disabled")
     set_type       = datadict.get('remotecontrol_set_type', "Set") # other options did not work
@@ -143,6 +145,7 @@ def value_function_remotecontrol_recompute(initval, descr, datadict):
     _LOGGER.debug(f"Evaluated remotecontrol_trigger: corrected/clamped values: {res}")
     return res
 
+@value_inputs(volatile = True) # counts down, reads only the autorepeat state
 def value_function_remotecontrol_autorepeat_remaining(initval, descr, datadict):
     return autorepeat_remaining(datadict, 'remotecontrol_trigger', time())
 
@@ -0,0 +1,107 @@
+"""Modbus TCP server that lets other clients share the hub's connection to the inverter."""
+import asyncio
+import logging
+import struct
+
+from pymodbus.pdu import ExceptionResponse
+
+_LOGGER = logging.getLogger(__name__)
+
+ILLEGAL_FUNCTION     = 0x01
+ILLEGAL_DATA_VALUE   = 0x03
+GATEWAY_NO_RESPONSE  = 0x0B # no answer from the inverter behind the proxy
+
+class ModbusProxy:
+    """ Modbus TCP server for other clients of the inverter (function 3, 4, 6 and 16)
+        the unit id selects the hub with that modbus address on the same connection (e.g. an inverter and a charger behind one gateway);
+        unknown unit ids are answered with a gateway exception
+        reads of polled registers are answered from the hub's register cache while younger than max_age,
+        other reads and all writes are forwarded through the hub's connection and bus scheduler """
+
+    def __init__(self, hub, host, port, max_age):
+        self._hub = hub
+        self._host = host
+        self._port = port
+        self._max_age = max_age
+        self._server = None
+        self._writers = set()
+        self.served = 0 # reads answered from the cache
+        self.forwarded = 0 # reads and writes sent to the inverter
+
+    async def async_start(self):
+        self._server = await asyncio.start_server(self._async_serve, host=self._host, port=self._port)
+        _LOGGER.info(f"{self._hub.name}: modbus proxy listening on {self._host}:{self._port}, serving polled registers up to {self._max_age} s old")
+
+    async def async_stop(self):
+        if not self._server: return
+        self._server.close()
+        for writer in list(self._writers): writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    def statistics(self):
+        return { "host": self._host, "port": self._port, "clients": len(self._writers), "served": self.served, "forwarded": self.forwarded, }
+
+    def hub_for(self, unit):
+        """ the hub polling unit over the connection of this proxy's hub, None if there is none """
+        return next((hub for hub in self._hub.bus_hubs() if hub._modbus_addr == unit), None)
+
+    async def _async_serve(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        _LOGGER.debug(f"{self._hub.name}: modbus proxy client {peer} connected")
+        self._writers.add(writer)
+        try:
+            while True:
+                (tid, pid, length, unit,) = struct.unpack('>HHHB', await reader.readexactly(7))
+                if (pid != 0) or not (2 <= length <= 254): break # not modbus tcp
+                response = await self.async_handle(await reader.readexactly(length - 1), unit)
+                writer.write(struct.pack('>HHHB', tid, pid, len(response) + 1, unit) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError): pass
+        except Exception: _LOGGER.exception(f"{self._hub.name}: modbus proxy client {peer} failed")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+            _LOGGER.debug(f"{self._hub.name}: modbus proxy client {peer} disconnected")
+
+    async def async_handle(self, pdu, unit):
+        """ the response pdu for a request pdu to unit """
+        function = pdu[0]
+        hub = self.hub_for(unit)
+        if hub == None: return bytes((function | 0x80, GATEWAY_NO_RESPONSE,))
+        if function in (3, 4,) and (len(pdu) >= 5):
+            (address, count,) = struct.unpack_from('>HH', pdu, 1)
+            if not (1 <= count <= 125): return bytes((function | 0x80, ILLEGAL_DATA_VALUE,))
+            typ = 'holding' if function == 3 else 'input'
+            registers = hub.cached_registers(typ, address, count, self._max_age)
+            if registers != None: self.served += 1
+            else:
+                self.forwarded += 1
+                try: response = await hub.async_forward_read(typ, address, count)
+                except Exception as ex: 
+                    _LOGGER.debug(f"{hub.name}: modbus proxy read of {typ} 0x{address:x} failed: {ex}")
+                    response = None
+                error = self.error(function, response)
+                if error: return error
+                if len(response.registers) < count: return bytes((function | 0x80, GATEWAY_NO_RESPONSE,))
+                registers = response.registers[:count]
+            return struct.pack(f'>BB{count}H', function, 2 * count, *registers)
+        if function in (6, 16,) and (len(pdu) >= 5):
+            (address, value,) = struct.unpack_from('>HH', pdu, 1)
+            if function == 6: values = [value]
+            else:
+                if not (1 <= value <= 123) or (len(pdu) < 6 + 2 * value): return bytes((function | 0x80, ILLEGAL_DATA_VALUE,))
+                values = list(struct.unpack_from(f'>{value}H', pdu, 6))
+            self.forwarded += 1
+            try: response = await hub.async_forward_write(address, values, function == 16)
+            except Exception as ex: 
+                _LOGGER.debug(f"{hub.name}: modbus proxy write of 0x{address:x} failed: {ex}")
+                response = None
+            return self.error(function, response) or pdu[:5] # a write response echoes address and value or count
+        return bytes((function | 0x80, ILLEGAL_FUNCTION,))
+
+    def error(self, function, response):
+        """ exception response pdu for a failed forwarded request, None if it succeeded """
+        if isinstance(response, ExceptionResponse): return bytes((function | 0x80, response.exception_code,))
+        if (response == None) or response.isError(): return bytes((function | 0x80, GATEWAY_NO_RESPONSE,))
+        return None
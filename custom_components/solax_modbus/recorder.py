@@ -0,0 +1,176 @@
+"""Recording of raw modbus read responses, and a replay transport that serves them to a hub without hardware."""
+import logging
+import os
+import struct
+import threading
+from time import time, monotonic
+
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse, ReadInputRegistersResponse
+from pymodbus.register_write_message import WriteSingleRegisterResponse, WriteMultipleRegistersResponse
+
+_LOGGER = logging.getLogger(__name__)
+
+FRAMES_MAGIC   = b'SXMF' # file signature, followed by the format version byte
+FRAMES_VERSION = 1
+FRAME_HEADER   = struct.Struct('>dBHH') # time(), function code (| 0x80 for an exception response), start address, register count (exception code)
+
+def encodeFrame(t, function, address, count, registers = ()):
+    return FRAME_HEADER.pack(t, function, address, count) + struct.pack(f'>{len(registers)}H', *registers)
+
+def readFrames(path):
+    """ yield the (time, function, address, count or exception code, registers,) records of a recording, oldest rotated file first """
+    backups = sorted((int(f.rsplit('.', 1)[1]) for f in os.listdir(os.path.dirname(path) or '.')
+                      if f.startswith(os.path.basename(path) + '.') and f.rsplit('.', 1)[1].isdigit()), reverse = True)
+    for name in [ f"{path}.{n}" for n in backups ] + [path]:
+        if not os.path.exists(name): continue
+        with open(name, 'rb') as fp: data = fp.read()
+        if data[:4] != FRAMES_MAGIC or data[4] != FRAMES_VERSION:
+            _LOGGER.warning(f"{name} is not a version {FRAMES_VERSION} frame recording, skipped")
+            continue
+        pos = 5
+        while pos + FRAME_HEADER.size <= len(data):
+            (t, function, address, count,) = FRAME_HEADER.unpack_from(data, pos)
+            pos += FRAME_HEADER.size
+            n = 0 if function & 0x80 else count
+            if pos + 2 * n > len(data): break # truncated by a crash
+            yield (t, function, address, count, struct.unpack_from(f'>{n}H', data, pos),)
+            pos += 2 * n
+
+class FrameRecorder:
+    """ appends the raw read responses of a hub to a binary log; record() only buffers, flush() does the file i/o (executor)
+        the log is rotated to <path>.1 .. <path>.<backups> when it grows over max_bytes """
+
+    def __init__(self, path, max_bytes = 4 * 1024 * 1024, backups = 3):
+        self.path = path
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._pending = []
+        self._lock = threading.Lock()
+        self.frames = 0
+
+    def record(self, function, address, count, response):
+        """ buffer a read response; timeouts and other transport errors are not recorded """
+        if isinstance(response, ExceptionResponse): self._pending.append(encodeFrame(time(), function | 0x80, address, response.exception_code))
+        elif (response != None) and not response.isError(): self._pending.append(encodeFrame(time(), function, address, count, response.registers[:count]))
+
+    def flush(self):
+        with self._lock:
+            (pending, self._pending,) = (self._pending, [],)
+            if not pending: return
+            if os.path.exists(self.path) and (os.path.getsize(self.path) > self._max_bytes): self.rotate()
+            new = not os.path.exists(self.path)
+            with open(self.path, 'ab') as fp:
+                if new: fp.write(FRAMES_MAGIC + bytes((FRAMES_VERSION,)))
+                fp.write(b''.join(pending))
+            self.frames += len(pending)
+
+    def rotate(self):
+        for n in range(self._backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"): os.replace(f"{self.path}.{n}", f"{self.path}.{n+1}")
+        if self._backups: os.replace(self.path, f"{self.path}.1")
+        else: os.remove(self.path)
+
+class FrameReplay:
+    """ register images rebuilt from a recording at speed times real time (0: only advance() moves the replay clock)
+        a read is answered when all its registers were seen by the replay clock and it does not contain a range that failed,
+        else with an illegal address exception """
+
+    def __init__(self, path, speed = 1.0):
+        self._frames = list(readFrames(path))
+        self._speed = speed
+        self._cursor = 0
+        self._offset = 0 # seconds added with advance()
+        self._t0 = self._frames[0][0] if self._frames else 0
+        self._started = monotonic()
+        self.images = { 3: {}, 4: {}, } # function code -> { address: value }
+        self.failed = { 3: set(), 4: set(), } # function code -> (address, count,) reads answered with an exception
+        self.reads = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def duration(self):
+        """ seconds from the first to the last frame """
+        return (self._frames[-1][0] - self._t0) if self._frames else 0
+
+    @property
+    def finished(self):
+        return self._cursor >= len(self._frames)
+
+    def advance(self, seconds):
+        self._offset += seconds
+
+    def clock(self):
+        return self._t0 + (monotonic() - self._started) * self._speed + self._offset
+
+    def sync(self):
+        now = self.clock()
+        while (self._cursor < len(self._frames)) and (self._frames[self._cursor][0] <= now):
+            (t, function, address, count, registers,) = self._frames[self._cursor]
+            image = self.images.get(function & 0x7F)
+            if image == None: pass
+            elif function & 0x80: self.failed[function & 0x7F].add((address, count,))
+            else: 
+                image.update({ address + i: value for (i, value,) in enumerate(registers) })
+                self.failed[function].discard((address, len(registers),))
+            self._cursor += 1
+
+    def read(self, function, address, count, slave = 0):
+        self.sync()
+        self.reads += 1
+        image = self.images[function]
+        values = [ image.get(reg) for reg in range(address, address + count) ]
+        if (None in values) or any((address <= a) and (a + n <= address + count) for (a, n,) in self.failed[function]): 
+            return ExceptionResponse(function, 2, slave = slave)
+        if function == 3: return ReadHoldingRegistersResponse(values, slave = slave)
+        return ReadInputRegistersResponse(values, slave = slave)
+
+    def write(self, address, values, slave = 0):
+        self.images[3].update({ address + i: value for (i, value,) in enumerate(values) })
+
+class ReplayClient:
+    """ stands in for ModbusTcpClient / ModbusSerialClient """
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.connected = True
+
+    def connect(self):
+        return True
+
+    def close(self):
+        pass
+
+    def read_holding_registers(self, address, count = 1, slave = 0, **kwargs):
+        return self.replay.read(3, address, count, slave)
+
+    def read_input_registers(self, address, count = 1, slave = 0, **kwargs):
+        return self.replay.read(4, address, count, slave)
+
+    def write_register(self, address, value, slave = 0, **kwargs):
+        self.replay.write(address, [value], slave)
+        return WriteSingleRegisterResponse(address, value, slave = slave)
+
+    def write_registers(self, address, values, slave = 0, **kwargs):
+        self.replay.write(address, values, slave)
+        return WriteMultipleRegistersResponse(address, len(values), slave = slave)
+
+class AsyncReplayClient(ReplayClient):
+    """ stands in for AsyncModbusTcpClient / AsyncModbusSerialClient """
+
+    async def connect(self):
+        return True
+
+    async def read_holding_registers(self, address, count = 1, slave = 0, **kwargs):
+        return super().read_holding_registers(address, count, slave)
+
+    async def read_input_registers(self, address, count = 1, slave = 0, **kwargs):
+        return super().read_input_registers(address, count, slave)
+
+    async def write_register(self, address, value, slave = 0, **kwargs):
+        return super().write_register(address, value, slave)
+
+    async def write_registers(self, address, values, slave = 0, **kwargs):
+        return super().write_registers(address, values, slave)
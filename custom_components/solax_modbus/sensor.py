@@ -1,14 +1,20 @@
 from homeassistant.const import CONF_NAME
 from homeassistant.core import callback
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import PERCENTAGE, UnitOfTime
+from homeassistant.helpers.entity import EntityCategory
 import logging
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass, replace
 import homeassistant.util.dt as dt_util
+import struct
+from pymodbus.payload import Endian
 
 from .const import ATTR_MANUFACTURER, DOMAIN, SLEEPMODE_NONE, SLEEPMODE_ZERO
-from .const import REG_INPUT, REG_HOLDING, REGISTER_U32, REGISTER_S32, REGISTER_ULSB16MSB16, REGISTER_STR, REGISTER_WORDS, REGISTER_U8H, REGISTER_U8L
-from .const import BaseModbusSensorEntityDescription
+from .const import POLL_NORMAL, POLL_STATIC
+from .const import REG_INPUT, REG_HOLDING, REGISTER_U16, REGISTER_S16, REGISTER_U32, REGISTER_S32, REGISTER_ULSB16MSB16, REGISTER_STR, REGISTER_WORDS, REGISTER_U8H, REGISTER_U8L
+from .const import PLAN_VALUE, PLAN_ULSB16MSB16, PLAN_WORDS, PLAN_STR, PLAN_U8L, PLAN_U8H, PLAN_ZERO, PLAN_NONE, SCALE_RAW, SCALE_NUM, SCALE_DICT, SCALE_FUNC
+from .const import BaseModbusSensorEntityDescription, HubDiagnosticSensorEntityDescription
 from homeassistant.components.sensor import SensorEntityDescription
 
 
@@ -16,6 +22,41 @@ _LOGGER = logging.getLogger(__name__)
 
 INVALID_START = 99999
 
+# instrumentation of the hub, see instrumentation.py; disabled by default
+DIAGNOSTIC_SENSOR_TYPES = (
+    HubDiagnosticSensorEntityDescription(
+        name = "Modbus Cycle Duration",
+        key = "modbus_cycle_duration",
+        native_unit_of_measurement = UnitOfTime.MILLISECONDS,
+        state_class = SensorStateClass.MEASUREMENT,
+        value = lambda hub: hub.cycle_stats.summary()["last_ms"],
+        attributes = lambda hub: { k: v for (k, v,) in hub.cycle_stats.summary().items() if k != "last_ms" },
+    ),
+    HubDiagnosticSensorEntityDescription(
+        name = "Modbus Read Latency",
+        key = "modbus_read_latency",
+        native_unit_of_measurement = UnitOfTime.MILLISECONDS,
+        state_class = SensorStateClass.MEASUREMENT,
+        value = lambda hub: hub.read_stats.summary()["p95_ms"],
+        attributes = lambda hub: hub.read_stats.summary(),
+    ),
+    HubDiagnosticSensorEntityDescription(
+        name = "Modbus Error Rate",
+        key = "modbus_error_rate",
+        native_unit_of_measurement = PERCENTAGE,
+        state_class = SensorStateClass.MEASUREMENT,
+        value = lambda hub: hub.read_outcomes.error_rate(),
+        attributes = lambda hub: hub.read_outcomes.errors(),
+    ),
+    HubDiagnosticSensorEntityDescription(
+        name = "Modbus Bus Idle",
+        key = "modbus_bus_idle",
+        native_unit_of_measurement = PERCENTAGE,
+        state_class = SensorStateClass.MEASUREMENT,
+        value = lambda hub: hub._bus.idle_pct(),
+    ),
+)
+
 
 # =================================== sorting and grouping of entities ================================================
 
@@ -27,44 +68,158 @@ class block():
     #order32: int = None # word endian for 32bit registers
     descriptions: Any = None
     regs: Any = None # sorted list of registers used in this block
+    tier: int = POLL_NORMAL # polling tier of all registers in this block
+    plan: Any = None # decodeplan, compiled at setup by compileBlock
+    ignore_readerror: Any = None # if not None, used instead of the ignore_readerror of the first description (auto_block_ignore_readerror)
+
+@dataclass
+class decodeplan():
+    count: int = 0 # number of registers the response must contain
+    buffer: struct.Struct = None # packs the response registers in the byte order needed by layout
+    layout: struct.Struct = None # unpacks all values of the block with a single unpack_from
+    rawstrings: bool = False # True if string entries must be sliced from a separate big endian copy of the registers
+    entries: list = None # list of (descr, kind, index, size, scaling,) tuples, evaluated in register order
+
+
+def pollTier(descr):
+    if type(descr) is dict: return min(pollTier(d) for d in descr.values()) # byte values share one register
+    if descr.poll_tier != None: return descr.poll_tier
+    if descr.unit == REGISTER_STR: return POLL_STATIC
+    return POLL_NORMAL
+
+def regEnd(reg, descr):
+    """ first address after the register(s) occupied by the description at reg """
+    if type(descr) is dict: return reg + 1 # couple of byte values
+    if descr.unit in (REGISTER_STR, REGISTER_WORDS,): 
+        if (descr.wordcount): return reg + descr.wordcount
+        _LOGGER.warning(f"invalid or missing missing wordcount for {descr.key}")
+    elif descr.unit in (REGISTER_S32, REGISTER_U32, REGISTER_ULSB16MSB16,): return reg + 2
+    return reg + 1
+
+def inHole(start, end, holes):
+    """ True if the address range start..end-1 overlaps one of the (start, end,) ranges in holes """
+    return any(((hstart < end) and (hend > start)) for (hstart, hend,) in holes)
 
+def splitInBlocks( descriptions, block_size, auto_block_ignore_readerror, gap_limit = None, holes = () ):
+    """ group the sorted register descriptions by polling tier and split each group in blocks
+        gap_limit is the largest number of unused registers that is cheaper to read than an extra request (None: no limit)
+        holes are (start, end,) address ranges that cannot be read; blocks never span them """
+    tiers = {}
+    for reg in descriptions: tiers.setdefault(pollTier(descriptions[reg]), {})[reg] = descriptions[reg]
+    blocks = []
+    for tier in sorted(tiers): blocks.extend(splitTierInBlocks(tiers[tier], tier, block_size, auto_block_ignore_readerror, gap_limit, holes))
+    return blocks
 
-def splitInBlocks( descriptions, block_size, auto_block_ignore_readerror ):
+def splitTierInBlocks( descriptions, tier, block_size, auto_block_ignore_readerror, gap_limit = None, holes = () ):
     start = INVALID_START
     end = 0
     blocks = []
     curblockregs = []
+    auto = None # ignore_readerror of the current block if it was created automatically; the shared descriptions are not modified
     for reg in descriptions:
         descr = descriptions[reg]
-        if (not type(descr) is dict) and (descr.newblock or ((reg - start) > block_size)):
+        costly_gap = (gap_limit != None) and (start != INVALID_START) and ((reg - end) > gap_limit)
+        hole_gap = (start != INVALID_START) and inHole(end, reg, holes)
+        if (not type(descr) is dict) and (descr.newblock or ((reg - start) > block_size) or costly_gap or hole_gap):
             if ((end - start) > 0): 
                 _LOGGER.info(f"Starting new block at 0x{reg:x} ")
-                if  ( (auto_block_ignore_readerror == True) or (auto_block_ignore_readerror == False) ) and not descr.newblock: # automatically created block
-                    descr.ignore_readerror = auto_block_ignore_readerror
                 #newblock = block(start = start, end = end, order16 = descriptions[start].order16, order32 = descriptions[start].order32, descriptions = descriptions, regs = curblockregs)
-                newblock = block(start = start, end = end, descriptions = descriptions, regs = curblockregs)
+                newblock = block(start = start, end = end, descriptions = descriptions, regs = curblockregs, tier = tier, ignore_readerror = auto)
                 blocks.append(newblock)
+                if  ( (auto_block_ignore_readerror == True) or (auto_block_ignore_readerror == False) ) and not descr.newblock: auto = auto_block_ignore_readerror # automatically created block
+                else: auto = None
                 start = INVALID_START
                 end = 0
                 curblockregs = []
             else: _LOGGER.info(f"newblock declaration found for empty block")
 
         if start == INVALID_START: start = reg
-        if type(descr) is dict: end = reg+1 # couple of byte values
-        else:
-            _LOGGER.info(f"adding register 0x{reg:x} {descr.key} to block with start 0x{start:x}")
-            if descr.unit in (REGISTER_STR, REGISTER_WORDS,): 
-                if (descr.wordcount): end = reg+descr.wordcount
-                else: _LOGGER.warning(f"invalid or missing missing wordcount for {descr.key}")
-            elif descr.unit in (REGISTER_S32, REGISTER_U32, REGISTER_ULSB16MSB16,):  end = reg + 2
-            else: end = reg + 1
+        if not type(descr) is dict: _LOGGER.info(f"adding register 0x{reg:x} {descr.key} to block with start 0x{start:x}")
+        end = regEnd(reg, descr)
         curblockregs.append(reg)
     if ((end-start)>0): # close last block
         #newblock = block(start = start, end = end, order16 = descriptions[start].order16, order32 = descriptions[start].order32, descriptions = descriptions, regs = curblockregs)
-        newblock = block(start = start, end = end, descriptions = descriptions, regs = curblockregs)
+        newblock = block(start = start, end = end, descriptions = descriptions, regs = curblockregs, tier = tier, ignore_readerror = auto)
         blocks.append(newblock)
     return blocks
 
+def _scaling(descr, kind):
+    if type(descr.scale) is dict: return SCALE_DICT
+    if callable(descr.scale): return SCALE_FUNC
+    if kind in (PLAN_WORDS, PLAN_STR,): return SCALE_RAW # scaling a list or string is a no-op
+    if (type(descr.scale) is int) and (descr.scale == 1): return SCALE_RAW # round(int*1, n) returns the int itself
+    return SCALE_NUM
+
+def compileBlock(blk, order16, order32):
+    """ build the decode plan for a block: one struct layout for the whole response plus a table of entries
+        The registers are packed in a buffer whose endianness, combined with the endianness of the layout,
+        reproduces the BinaryPayloadDecoder semantics for all 4 combinations of order16 and order32 """
+    unpack_endian = "<" if order32 == Endian.LITTLE else ">"
+    if order16 == Endian.LITTLE: buffer_endian = ">" if unpack_endian == "<" else "<"
+    else: buffer_endian = unpack_endian
+    fmt = [unpack_endian]
+    entries = []
+    index = 0 # index of the next value in the unpacked tuple
+    pos = 0 # register offset of the next value in the response, like the BinaryPayloadDecoder pointer
+    skip = 0 # unused registers to skip before the next value
+    prevreg = blk.start
+    for reg in blk.regs:
+        if (reg - prevreg) > 0: 
+            skip = skip + reg - prevreg
+            pos = pos + reg - prevreg
+        descr = blk.descriptions[reg]
+        if type(descr) is dict: #  set of byte values
+            if (pos + 1) > (blk.end - blk.start): 
+                for k in descr: entries.append( (descr[k], PLAN_NONE, 0, 0, SCALE_RAW,) )
+                continue
+            if skip: fmt.append(f"{skip*2}x")
+            skip = 0
+            fmt.append("H")
+            for k in descr: 
+                subdescr = descr[k]
+                if   subdescr.unit == REGISTER_U8L: kind = PLAN_U8L
+                elif subdescr.unit == REGISTER_U8H: kind = PLAN_U8H
+                else: kind = PLAN_VALUE
+                entries.append( (subdescr, kind, index, 1, _scaling(subdescr, kind),) )
+            index += 1
+            pos = pos + 1
+            prevreg = reg + 1
+            continue
+        size = 1
+        if   descr.unit == REGISTER_U16: (kind, code,) = (PLAN_VALUE, "H",)
+        elif descr.unit == REGISTER_S16: (kind, code,) = (PLAN_VALUE, "h",)
+        elif descr.unit == REGISTER_U32: (kind, code, size,) = (PLAN_VALUE, "I", 2,)
+        elif descr.unit == REGISTER_S32: (kind, code, size,) = (PLAN_VALUE, "i", 2,)
+        elif descr.unit == REGISTER_ULSB16MSB16: (kind, code, size,) = (PLAN_ULSB16MSB16, "2H", 2,)
+        elif descr.unit == REGISTER_WORDS: (kind, code, size,) = (PLAN_WORDS, f"{descr.wordcount}H", descr.wordcount,)
+        elif descr.unit == REGISTER_STR: (kind, code, size,) = (PLAN_STR, f"{descr.wordcount*2}x", descr.wordcount,)
+        else: 
+            _LOGGER.warning(f"undefinded unit for entity {descr.key} - value will be zero")
+            (kind, code,) = (PLAN_ZERO, "2x",)
+        if (pos + size) > (blk.end - blk.start): # overlapping declarations pushed this entity past the end of the block
+            _LOGGER.warning(f"entity {descr.key} at 0x{reg:x} overlaps the previous entity and runs past the end of its block - value will be None")
+            entries.append( (descr, PLAN_NONE, 0, 0, SCALE_RAW,) )
+            continue
+        if skip: fmt.append(f"{skip*2}x")
+        skip = 0
+        fmt.append(code)
+        if   kind == PLAN_STR: entries.append( (descr, kind, pos*2, size*2, _scaling(descr, kind),) ) # byte offset and length
+        else: entries.append( (descr, kind, index, size, _scaling(descr, kind),) )
+        if   kind == PLAN_VALUE: index += 1
+        elif kind == PLAN_ULSB16MSB16: index += 2
+        elif kind == PLAN_WORDS: index += size
+        prevreg = reg + size
+        pos = pos + size
+    count = blk.end - blk.start
+    blk.plan = decodeplan(
+        count = count,
+        buffer = struct.Struct(f"{buffer_endian}{count}H"),
+        layout = struct.Struct("".join(fmt)),
+        rawstrings = (buffer_endian != ">") and any(e[1] == PLAN_STR for e in entries),
+        entries = entries,
+    )
+    return blk.plan
+
 # ========================================================================================================================
 
 async def async_setup_entry(hass, entry, async_add_entities):
@@ -85,44 +240,45 @@ async def async_setup_entry(hass, entry, async_add_entities):
     computedRegs = {}
      
     plugin = hub.plugin #getPlugin(hub_name)
-    for sensor_description in plugin.SENSOR_TYPES:
-        if plugin.matchInverterWithMask(hub._invertertype,sensor_description.allowedtypes, hub.seriesnumber, sensor_description.blacklist):
-            # apply scale exceptions early 
-            newdescr = sensor_description
-            if sensor_description.read_scale_exceptions:
-                for (prefix, value,) in sensor_description.read_scale_exceptions: 
-                    if hub.seriesnumber.startswith(prefix):  newdescr = replace (sensor_description, read_scale = value)
-            sensor = SolaXModbusSensor(
-                hub_name,
-                hub,
-                device_info,
-                newdescr,
-            )
-            hub.sensorEntities[newdescr.key] = sensor
-            entities.append(sensor)
-            if newdescr.sleepmode == SLEEPMODE_NONE: hub.sleepnone.append(newdescr.key)
-            if newdescr.sleepmode == SLEEPMODE_ZERO: hub.sleepzero.append(newdescr.key)
-            if (newdescr.register < 0): # entity without modbus address
-                if newdescr.value_function:
-                    computedRegs[newdescr.key] = newdescr
-                else: _LOGGER.warning(f"entity without modbus register address and without value_function found: {newdescr.key}")
-            else:
-                if newdescr.register_type == REG_HOLDING:
-                    if newdescr.register in holdingRegs: # duplicate or 2 bytes in one register ?
-                        if newdescr.unit in (REGISTER_U8H, REGISTER_U8L,) and holdingRegs[newdescr.register].unit in (REGISTER_U8H, REGISTER_U8L,) : 
-                            first = holdingRegs[newdescr.register]
-                            holdingRegs[newdescr.register] = { first.unit: first, newdescr.unit: newdescr }
-                        else: _LOGGER.warning(f"holding register already used: 0x{newdescr.register:x} {newdescr.key}")
-                    else:
-                        holdingRegs[newdescr.register] = newdescr
-                elif newdescr.register_type == REG_INPUT:
-                    if newdescr.register in inputRegs: # duplicate or 2 bytes in one register ?
-                        first = inputRegs[newdescr.register]
-                        inputRegs[newdescr.register] = { first.unit: first, newdescr.unit: newdescr }
-                        _LOGGER.warning(f"input register already declared: 0x{newdescr.register:x} {newdescr.key}")
-                    else:
-                        inputRegs[newdescr.register] = newdescr
-                else: _LOGGER.warning(f"entity declaration without register_type found: {newdescr.key}")
+    for sensor_description in plugin.selectEntities(plugin.SENSOR_TYPES, hub._invertertype, hub.seriesnumber):
+        # apply scale exceptions early 
+        newdescr = sensor_description
+        if sensor_description.read_scale_exceptions:
+            for (prefix, value,) in sensor_description.read_scale_exceptions: 
+                if hub.seriesnumber.startswith(prefix):  newdescr = replace (sensor_description, read_scale = value)
+        sensor = SolaXModbusSensor(
+            hub_name,
+            hub,
+            device_info,
+            newdescr,
+        )
+        hub.sensorEntities[newdescr.key] = sensor
+        entities.append(sensor)
+        if newdescr.sleepmode == SLEEPMODE_NONE: hub.sleepnone.append(newdescr.key)
+        if newdescr.sleepmode == SLEEPMODE_ZERO: hub.sleepzero.append(newdescr.key)
+        if (newdescr.register < 0): # entity without modbus address
+            if newdescr.value_function:
+                computedRegs[newdescr.key] = newdescr
+            else: _LOGGER.warning(f"entity without modbus register address and without value_function found: {newdescr.key}")
+        else:
+            if newdescr.register_type == REG_HOLDING:
+                if newdescr.register in holdingRegs: # duplicate or 2 bytes in one register ?
+                    if newdescr.unit in (REGISTER_U8H, REGISTER_U8L,) and holdingRegs[newdescr.register].unit in (REGISTER_U8H, REGISTER_U8L,) : 
+                        first = holdingRegs[newdescr.register]
+                        holdingRegs[newdescr.register] = { first.unit: first, newdescr.unit: newdescr }
+                    else: _LOGGER.warning(f"holding register already used: 0x{newdescr.register:x} {newdescr.key}")
+                else:
+                    holdingRegs[newdescr.register] = newdescr
+            elif newdescr.register_type == REG_INPUT:
+                if newdescr.register in inputRegs: # duplicate or 2 bytes in one register ?
+                    first = inputRegs[newdescr.register]
+                    inputRegs[newdescr.register] = { first.unit: first, newdescr.unit: newdescr }
+                    _LOGGER.warning(f"input register already declared: 0x{newdescr.register:x} {newdescr.key}")
+                else:
+                    inputRegs[newdescr.register] = newdescr
+            else: _LOGGER.warning(f"entity declaration without register_type found: {newdescr.key}")
+    for description in DIAGNOSTIC_SENSOR_TYPES:
+        entities.append(SolaXModbusDiagnosticSensor(hub_name, hub, device_info, replace(description, entity_category = EntityCategory.DIAGNOSTIC, entity_registry_enabled_default = False)))
     async_add_entities(entities)
     # sort the registers for this type of inverter
     holdingRegs = dict(sorted(holdingRegs.items()))
@@ -131,12 +287,14 @@ async def async_setup_entry(hass, entry, async_add_entities):
     #if (len(inputOrder32)>1) or (len(holdingOrder32)>1): _LOGGER.warning(f"inconsistent Big or Little Endian declaration for 32bit registers")
     #if (len(inputOrder16)>1) or (len(holdingOrder16)>1): _LOGGER.warning(f"inconsistent Big or Little Endian declaration for 16bit registers")
     # split in blocks and store results
-    hub.holdingBlocks = splitInBlocks(holdingRegs, hub.plugin.block_size, hub.plugin.auto_block_ignore_readerror)
-    hub.inputBlocks = splitInBlocks(inputRegs, hub.plugin.block_size, hub.plugin.auto_block_ignore_readerror)
-    hub.computedSensors = computedRegs
+    hub.holdingRegs = holdingRegs
+    hub.inputRegs = inputRegs
+    hub.plan_enabled()
+    hub.plan_blocks()
+    hub.plan_computed(computedRegs)
 
-    for i in hub.holdingBlocks: _LOGGER.info(f"{hub_name} returning holding block: 0x{i.start:x} 0x{i.end:x} {i.regs}")
-    for i in hub.inputBlocks: _LOGGER.info(f"{hub_name} returning input block: 0x{i.start:x} 0x{i.end:x} {i.regs}")
+    for i in hub.holdingBlocks: _LOGGER.info(f"{hub_name} returning holding block: 0x{i.start:x} 0x{i.end:x} tier {i.tier} {i.regs}")
+    for i in hub.inputBlocks: _LOGGER.info(f"{hub_name} returning input block: 0x{i.start:x} 0x{i.end:x} tier {i.tier} {i.regs}")
     _LOGGER.debug(f"holdingBlocks: {hub.holdingBlocks}")
     _LOGGER.debug(f"inputBlocks: {hub.inputBlocks}")
     _LOGGER.info(f"computedRegs: {hub.computedSensors}")
@@ -162,10 +320,10 @@ class SolaXModbusSensor(SensorEntity):
 
     async def async_added_to_hass(self):
         """Register callbacks."""
-        self._hub.async_add_solax_modbus_sensor(self._modbus_data_updated)
+        self._hub.async_add_solax_modbus_sensor(self._modbus_data_updated, self.entity_description.key)
 
     async def async_will_remove_from_hass(self) -> None:
-        self._hub.async_remove_solax_modbus_sensor(self._modbus_data_updated)
+        self._hub.async_remove_solax_modbus_sensor(self._modbus_data_updated, self.entity_description.key)
 
     @callback
     def _modbus_data_updated(self):
@@ -195,3 +353,21 @@ class SolaXModbusSensor(SensorEntity):
             return val
   
 
+
+class SolaXModbusDiagnosticSensor(SolaXModbusSensor):
+    """Instrumentation of the hub's modbus reads, updated every polling cycle."""
+
+    async def async_added_to_hass(self):
+        self._hub.async_add_solax_modbus_sensor(self._modbus_data_updated)
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._hub.async_remove_solax_modbus_sensor(self._modbus_data_updated)
+
+    @property
+    def native_value(self):
+        return self.entity_description.value(self._hub)
+
+    @property
+    def extra_state_attributes(self):
+        if self.entity_description.attributes: return self.entity_description.attributes(self._hub)
+        return None
@@ -0,0 +1,304 @@
+"""Simulated inverters for load testing the hub: pymodbus servers with a register image built from a plugin's entity descriptions.
+
+    python -m custom_components.solax_modbus.simulator --plugin solax --serial H34A --count 20 --port 5020 --latency 50 --drop 0.01
+
+starts 20 simulated inverters on tcp ports 5020..5039 (with --rtu, on slave ids 1..20 of one serial port)
+"""
+import argparse
+import asyncio
+import logging
+import math
+import random
+import struct
+from time import time, monotonic
+
+from pymodbus.datastore import ModbusServerContext, ModbusSlaveContext
+from pymodbus.datastore.store import BaseModbusDataBlock
+from pymodbus.payload import BinaryPayloadBuilder
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse, ReadInputRegistersResponse
+from pymodbus.server.async_io import ModbusServerRequestHandler, ModbusTcpServer, ModbusSerialServer
+from pymodbus.transaction import ModbusRtuFramer, ModbusSocketFramer
+
+from homeassistant.const import UnitOfPower, UnitOfEnergy, UnitOfElectricPotential, UnitOfElectricCurrent, UnitOfFrequency, UnitOfTemperature, UnitOfTime, PERCENTAGE
+
+from . import loadPlugin
+from .const import REG_HOLDING, REG_INPUT, REGISTER_U16, REGISTER_S16, REGISTER_U32, REGISTER_S32, REGISTER_ULSB16MSB16, REGISTER_STR, REGISTER_WORDS, REGISTER_U8L, REGISTER_U8H
+
+_LOGGER = logging.getLogger(__name__)
+
+POWER_UNITS  = (UnitOfPower.WATT, UnitOfPower.KILO_WATT, "VA", "var",)
+ENERGY_UNITS = { UnitOfEnergy.WATT_HOUR: 1000, UnitOfEnergy.KILO_WATT_HOUR: 1, UnitOfEnergy.MEGA_WATT_HOUR: 0.001, } # per kWh
+STATIC_VALUES = { # plausible constant values per unit of measurement, other registers read 0
+    UnitOfElectricPotential.VOLT: 230, UnitOfElectricCurrent.AMPERE: 5, UnitOfFrequency.HERTZ: 50,
+    UnitOfTemperature.CELSIUS: 30, PERCENTAGE: 60, UnitOfTime.HOURS: 100,
+}
+UNIT_RANGE = { # raw value range and register count per unit
+    REGISTER_U16: (0, 0xFFFF, 1,), REGISTER_S16: (-0x8000, 0x7FFF, 1,), REGISTER_U8L: (0, 0xFF, 1,), REGISTER_U8H: (0, 0xFF, 1,),
+    REGISTER_U32: (0, 0xFFFFFFFF, 2,), REGISTER_S32: (-0x80000000, 0x7FFFFFFF, 2,), REGISTER_ULSB16MSB16: (0, 0xFFFFFFFF, 2,),
+}
+
+def encodeString(text, count):
+    """ registers of an ascii string, big endian like the plugins decode serial numbers """
+    data = text.encode("ascii")[:2 * count].ljust(2 * count, b' ')
+    return list(struct.unpack(f'>{count}H', data))
+
+class _ProbeHub:
+    """ stands in for the hub while the plugin determines the inverter type; every read is answered with the serial number
+        padded to the requested length, so the first read gives the address and length the plugin probes """
+
+    def __init__(self, prefix, index):
+        self.name = "simulator"
+        self._modbus_addr = 1
+        self.seriesnumber = None
+        self._prefix = prefix
+        self._index = index
+        self.probe = None # (register type, address, serial number,) of the first read
+
+    def _answer(self, typ, address, count):
+        if self.probe == None: 
+            width = max(0, 2 * count - len(self._prefix))
+            self.probe = (typ, address, self._prefix + (f"{self._index:0{width}d}"[-width:] if width else ""),)
+        return encodeString(self.probe[2], count)
+
+    def read_holding_registers(self, unit, address, count):
+        return ReadHoldingRegistersResponse(self._answer(REG_HOLDING, address, count))
+
+    def read_input_registers(self, unit, address, count):
+        return ReadInputRegistersResponse(self._answer(REG_INPUT, address, count))
+
+class SimulatedInverter:
+    """ register image of one inverter, built from the sensor, number and select descriptions the plugin selects for its type
+        power registers follow a simulated day of day seconds, energy registers integrate them, writes are kept """
+
+    def __init__(self, plugin_name, prefix, index = 0, invertertype = None, day = 86400, peak = 5000, latency = 0, jitter = 0, drop = 0, sleep = False, illegal = (), strict = False):
+        self.plugin = loadPlugin(plugin_name).plugin_instance.hubContext()
+        probehub = _ProbeHub(prefix, index)
+        detected = self.plugin.determineInverterType(probehub, {})
+        if probehub.probe == None: raise ValueError(f"plugin {plugin_name} does not read a serial number")
+        (probe_typ, probe_address, self.serialnumber,) = probehub.probe
+        self.invertertype = detected if invertertype == None else invertertype
+        if (invertertype != None) and (detected != invertertype):
+            _LOGGER.warning(f"serial number {self.serialnumber} is detected as type 0x{detected:x}, the hub will not see type 0x{invertertype:x}")
+        self._day = day
+        self._peak = peak
+        self._latency = latency
+        self._jitter = jitter
+        self._drop = drop
+        self._sleep = sleep
+        self._started = time()
+        self._refreshed = 0
+        self.images = { REG_HOLDING: {}, REG_INPUT: {}, } # register type -> { address: register value }
+        self.illegal = { REG_HOLDING: [], REG_INPUT: [], } # register type -> [ (start, end,) ] ranges answered with an illegal address exception
+        for (typ, start, end,) in illegal: self.illegal[typ].append((start, end,))
+        self._dynamic = [] # (descr, register type, kind,) registers recomputed on read
+        self.requests = 0
+        self.dropped = 0
+        self.images[probe_typ].update({ probe_address + i: value for (i, value,) in enumerate(encodeString(self.serialnumber, (len(self.serialnumber) + 1) // 2)) })
+        sensors = [ descr for descr in self.plugin.selectEntities(self.plugin.SENSOR_TYPES, self.invertertype, self.serialnumber)
+                    if (descr.register_type in (REG_HOLDING, REG_INPUT,)) and (descr.register >= 0) ]
+        for descr in sensors: self.place(descr, descr.register_type)
+        for descr in self.plugin.selectEntities(self.plugin.NUMBER_TYPES, self.invertertype, self.serialnumber) + self.plugin.selectEntities(self.plugin.SELECT_TYPES, self.invertertype, self.serialnumber):
+            if (descr.register != None) and (descr.register not in self.images[REG_HOLDING]): self.place(descr, REG_HOLDING)
+        if strict: # registers that no description declares are illegal, like on inverters that reject reads of unmapped registers
+            for (typ, image,) in self.images.items():
+                known = sorted(image)
+                gaps = [ (a + 1, b,) for (a, b,) in zip([-1] + known, known + [0x10000]) if b > a + 1 ]
+                self.illegal[typ].extend(gaps)
+        self.refresh(force = True)
+        _LOGGER.info(f"simulated {plugin_name} inverter {self.serialnumber} type 0x{self.invertertype:x}: {len(self.images[REG_HOLDING])} holding and {len(self.images[REG_INPUT])} input registers, {len(self._dynamic)} evolving")
+
+    def place(self, descr, typ):
+        """ store the initial value of a description in the image; power and energy registers are added to the dynamic set """
+        unit = getattr(descr, 'unit', None) or REGISTER_U16
+        measure = getattr(descr, 'native_unit_of_measurement', None)
+        if unit == REGISTER_STR: return self.store(typ, descr.register, encodeString(f"SIM{descr.key}", descr.wordcount))
+        if unit == REGISTER_WORDS: return self.store(typ, descr.register, [0] * descr.wordcount)
+        if unit not in UNIT_RANGE: return
+        byte = unit in (REGISTER_U8L, REGISTER_U8H,)
+        option_dict = getattr(descr, 'option_dict', None)
+        scale = getattr(descr, 'scale', 1)
+        if option_dict: return self.store(typ, descr.register, self.encode(descr, next(iter(option_dict))), byte)
+        if isinstance(scale, dict) and scale: return self.store(typ, descr.register, self.encode(descr, next(iter(scale))), byte)
+        if isinstance(scale, (int, float,)) and (measure in POWER_UNITS or measure in ENERGY_UNITS) and (descr.register not in self.images[typ]):
+            self._dynamic.append((descr, typ, 'energy' if measure in ENERGY_UNITS else 'power',))
+            return self.store(typ, descr.register, self.encode(descr, 0))
+        value = STATIC_VALUES.get(measure, 0)
+        if getattr(descr, 'native_min_value', None) != None: value = max(value, descr.native_min_value)
+        if getattr(descr, 'native_max_value', None) != None: value = min(value, descr.native_max_value)
+        raw = value / scale if isinstance(scale, (int, float,)) and scale else 0
+        self.store(typ, descr.register, self.encode(descr, raw), byte)
+
+    def encode(self, descr, raw):
+        """ registers of a raw value, with the word and byte order the hub decodes for this plugin """
+        unit = getattr(descr, 'unit', None) or REGISTER_U16
+        (low, high, count,) = UNIT_RANGE[unit]
+        raw = min(high, max(low, int(round(raw))))
+        builder = BinaryPayloadBuilder(byteorder = self.plugin.order16, wordorder = self.plugin.order32)
+        if   unit in (REGISTER_U16, REGISTER_U8L,): builder.add_16bit_uint(raw)
+        elif unit == REGISTER_U8H: builder.add_16bit_uint(raw << 8)
+        elif unit == REGISTER_S16: builder.add_16bit_int(raw)
+        elif unit == REGISTER_U32: builder.add_32bit_uint(raw)
+        elif unit == REGISTER_S32: builder.add_32bit_int(raw)
+        else:
+            builder.add_16bit_uint(raw & 0xFFFF)
+            builder.add_16bit_uint(raw >> 16)
+        return builder.to_registers()
+
+    def store(self, typ, address, registers, byte = False):
+        """ the first description of a register sets its value, except for the byte halves of U8L / U8H registers """
+        image = self.images[typ]
+        if byte: image[address] = image.get(address, 0) | registers[0]
+        else:
+            for (i, value,) in enumerate(registers): image.setdefault(address + i, value)
+
+    def solar(self):
+        """ fraction of the peak power at the current simulated time: a half sine during the first half of each day, 0 at night """
+        return max(0.0, math.sin(2 * math.pi * ((time() - self._started) % self._day) / self._day))
+
+    def refresh(self, force = False):
+        """ recompute the evolving registers, at most once per second """
+        if not force and (monotonic() - self._refreshed < 1): return
+        self._refreshed = monotonic()
+        solar = self.solar()
+        hours = (time() - self._started) * 86400 / self._day / 3600 # simulated hours since start
+        for (descr, typ, kind,) in self._dynamic:
+            measure = descr.native_unit_of_measurement
+            if kind == 'energy': value = (1000 + self._peak / 1000 * hours / math.pi) * ENERGY_UNITS[measure] # kWh; mean power of a half sine day is peak / pi
+            else:
+                signed = descr.unit in (REGISTER_S16, REGISTER_S32,)
+                value = self._peak * (solar - 0.3 if signed else solar) # signed registers (grid, battery) go negative at night
+                if measure == UnitOfPower.KILO_WATT: value = value / 1000
+            raw = value / descr.scale if descr.scale else 0
+            self.images[typ].update({ descr.register + i: v for (i, v,) in enumerate(self.encode(descr, raw)) })
+
+    def asleep(self):
+        return self._sleep and (self.solar() == 0)
+
+    def response_delay(self):
+        """ seconds before a request is answered, None when it is not answered at all (dropped frame or asleep) """
+        self.requests += 1
+        if self.asleep() or (random.random() < self._drop):
+            self.dropped += 1
+            return None
+        return max(0.0, random.gauss(self._latency, self._jitter)) / 1000
+
+    def context(self):
+        return ModbusSlaveContext(hr = _ImageBlock(self, REG_HOLDING), ir = _ImageBlock(self, REG_INPUT), zero_mode = True)
+
+    def read(self, function, address, count, slave = 0):
+        """ same interface as recorder.FrameReplay, so recorder.ReplayClient serves this image without a server (see benchmark.py) """
+        block = _ImageBlock(self, REG_HOLDING if function == 3 else REG_INPUT)
+        if not block.validate(address, count): return ExceptionResponse(function, 2, slave = slave)
+        if function == 3: return ReadHoldingRegistersResponse(block.getValues(address, count), slave = slave)
+        return ReadInputRegistersResponse(block.getValues(address, count), slave = slave)
+
+    def write(self, address, values, slave = 0):
+        _ImageBlock(self, REG_HOLDING).setValues(address, values)
+
+    def statistics(self):
+        return { "serial": self.serialnumber, "requests": self.requests, "dropped": self.dropped, "asleep": self.asleep(), }
+
+class _ImageBlock(BaseModbusDataBlock):
+    """ pymodbus datastore on a register image; unmapped registers read 0 unless they are in an illegal range """
+
+    def __init__(self, inverter, typ):
+        self.inverter = inverter
+        self.typ = typ
+        self.values = inverter.images[typ]
+        self.address = 0
+        self.default_value = 0
+
+    def validate(self, address, count = 1):
+        end = address + count
+        return (end <= 0x10000) and not any((start < end) and (address < stop) for (start, stop,) in self.inverter.illegal[self.typ])
+
+    def getValues(self, address, count = 1):
+        self.inverter.refresh()
+        return [ self.values.get(a, 0) for a in range(address, address + count) ]
+
+    def setValues(self, address, values):
+        if not isinstance(values, list): values = [values]
+        self.values.update({ address + i: value for (i, value,) in enumerate(values) })
+
+class _SimulatorHandler(ModbusServerRequestHandler):
+    """ connection handler that delays, drops or ignores requests as configured for the addressed inverter """
+
+    def execute(self, request, *addr):
+        inverter = self.server.inverters.get(request.slave_id) or self.server.inverters.get(None)
+        delay = inverter.response_delay() if inverter else 0
+        if delay == None: return # the client times out
+        if delay: self.server.loop.call_later(delay, super().execute, request, *addr)
+        else: super().execute(request, *addr)
+
+class SimulatorTcpServer(ModbusTcpServer):
+    def __init__(self, inverters, **kwargs):
+        super().__init__(**kwargs)
+        self.inverters = inverters # slave id (None: any) -> SimulatedInverter
+
+    def callback_new_connection(self):
+        return _SimulatorHandler(self)
+
+class SimulatorSerialServer(ModbusSerialServer):
+    def __init__(self, inverters, **kwargs):
+        super().__init__(**kwargs)
+        self.inverters = inverters
+
+    def callback_new_connection(self):
+        return _SimulatorHandler(self)
+
+def parseRange(text):
+    """ 'holding:0x100-0x10f' or 'input:0x300' -> (register type, start, end,) with end exclusive """
+    (typ, _, span,) = text.partition(':')
+    (start, _, stop,) = span.partition('-')
+    start = int(start, 0)
+    return ({ 'holding': REG_HOLDING, 'input': REG_INPUT, }[typ], start, int(stop or start, 0) + 1,)
+
+async def async_serve(args):
+    inverters = [ SimulatedInverter(args.plugin, args.serial, i, args.type, args.day, args.peak, args.latency, args.jitter, args.drop, args.sleep, args.illegal, args.strict) for i in range(args.count) ]
+    if args.rtu:
+        slaves = { args.unit + i: inverter for (i, inverter,) in enumerate(inverters) }
+        servers = [ SimulatorSerialServer(slaves, context = ModbusServerContext(slaves = { unit: inv.context() for (unit, inv,) in slaves.items() }, single = False),
+                                          framer = ModbusRtuFramer, port = args.rtu, baudrate = args.baudrate) ]
+        _LOGGER.info(f"serving {len(inverters)} inverters on {args.rtu}, slave ids {args.unit}..{args.unit + len(inverters) - 1}")
+    else:
+        servers = [ SimulatorTcpServer({ None: inverter }, context = ModbusServerContext(slaves = inverter.context(), single = True),
+                                       framer = ModbusSocketFramer, address = (args.host, args.port + i)) for (i, inverter,) in enumerate(inverters) ]
+        _LOGGER.info(f"serving {len(inverters)} inverters on tcp ports {args.port}..{args.port + len(inverters) - 1}")
+    async def report():
+        while True:
+            await asyncio.sleep(args.report)
+            for inverter in inverters: _LOGGER.info(f"{inverter.statistics()}")
+    reporter = asyncio.create_task(report()) if args.report else None
+    try: await asyncio.gather(*(server.serve_forever() for server in servers))
+    finally:
+        if reporter: reporter.cancel()
+        for server in servers: await server.shutdown()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Simulated inverters for load testing the solax_modbus hub")
+    parser.add_argument("--plugin", default = "solax", help = "plugin name, e.g. solax, sofar, growatt")
+    parser.add_argument("--serial", required = True, help = "serial number prefix, padded with the inverter index to the probed length")
+    parser.add_argument("--type", type = lambda s: int(s, 0), default = None, help = "inverter type bitmask; default: the type the plugin detects from the serial number")
+    parser.add_argument("--count", type = int, default = 1, help = "number of simulated inverters")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 5020, help = "tcp port of the first inverter")
+    parser.add_argument("--rtu", default = None, metavar = "SERIAL_PORT", help = "serve modbus rtu on this serial port instead of tcp")
+    parser.add_argument("--baudrate", type = int, default = 19200)
+    parser.add_argument("--unit", type = int, default = 1, help = "rtu slave id of the first inverter")
+    parser.add_argument("--latency", type = float, default = 0, help = "mean response latency in ms")
+    parser.add_argument("--jitter", type = float, default = 0, help = "standard deviation of the latency in ms")
+    parser.add_argument("--drop", type = float, default = 0, help = "fraction of requests left unanswered")
+    parser.add_argument("--illegal", type = parseRange, action = "append", default = [], help = "range answered with illegal address, e.g. input:0x100-0x10f (repeatable)")
+    parser.add_argument("--strict", action = "store_true", help = "registers no description declares are illegal addresses")
+    parser.add_argument("--sleep", action = "store_true", help = "do not answer during the simulated night")
+    parser.add_argument("--day", type = float, default = 86400, help = "length of a simulated day in seconds")
+    parser.add_argument("--peak", type = float, default = 5000, help = "peak power in W")
+    parser.add_argument("--report", type = float, default = 60, help = "seconds between statistics reports, 0 disables them")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level = logging.INFO, format = "%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try: asyncio.run(async_serve(args))
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Round trip of a frame recording: FrameRecorder writes it, readFrames and FrameReplay read it back.
+
+recorder.py only needs pymodbus, so it is loaded by path, without the home assistant imports of the package."""
+import importlib.util
+import os
+
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse, ReadInputRegistersResponse
+
+_spec = importlib.util.spec_from_file_location("recorder", os.path.join(os.path.dirname(__file__), "..", "custom_components", "solax_modbus", "recorder.py"))
+recorder = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(recorder)
+
+def record(path, **kwargs):
+    rec = recorder.FrameRecorder(path, **kwargs)
+    rec.record(3, 0x100, 3, ReadHoldingRegistersResponse([1, 2, 3]))
+    rec.record(4, 0x200, 2, ReadInputRegistersResponse([0xFFFF, 0]))
+    rec.record(4, 0x300, 4, ExceptionResponse(4, 2))
+    rec.record(3, 0x400, 1, None) # timeout, not recorded
+    rec.flush()
+    return rec
+
+def test_frames_round_trip(tmp_path):
+    path = str(tmp_path / "hub_frames.bin")
+    rec = record(path)
+    assert rec.frames == 3
+    frames = list(recorder.readFrames(path))
+    assert [ frame[1:] for frame in frames ] == [ (3, 0x100, 3, (1, 2, 3,),), (4, 0x200, 2, (0xFFFF, 0,),), (4 | 0x80, 0x300, 2, (),), ]
+    assert frames[0][0] <= frames[1][0] <= frames[2][0]
+
+def test_truncated_frame_is_skipped(tmp_path):
+    path = str(tmp_path / "hub_frames.bin")
+    record(path)
+    with open(path, "ab") as fp: fp.write(recorder.encodeFrame(0, 3, 0x500, 10, range(10))[:-4])
+    assert len(list(recorder.readFrames(path))) == 3
+
+def test_rotated_files_are_read_oldest_first(tmp_path):
+    path = str(tmp_path / "hub_frames.bin")
+    rec = record(path, max_bytes = 1, backups = 2)
+    rec.record(3, 0x600, 1, ReadHoldingRegistersResponse([6]))
+    rec.flush() # rotates the first recording to .1
+    assert os.path.exists(path + ".1")
+    assert [ frame[2] for frame in recorder.readFrames(path) ] == [ 0x100, 0x200, 0x300, 0x600, ]
+
+def test_replay_serves_recording(tmp_path):
+    path = str(tmp_path / "hub_frames.bin")
+    record(path)
+    replay = recorder.FrameReplay(path, speed = 0)
+    assert len(replay) == 3
+    client = recorder.ReplayClient(replay)
+    assert client.read_holding_registers(0x100, 3).registers == [1, 2, 3]
+    assert client.read_holding_registers(0x101, 1).registers == [2]
+    assert isinstance(client.read_input_registers(0x200, 2), ExceptionResponse) # recorded after the replay clock
+    replay.advance(1)
+    assert client.read_input_registers(0x200, 2).registers == [0xFFFF, 0]
+    assert replay.finished
+    assert isinstance(client.read_input_registers(0x300, 4), ExceptionResponse) # recorded exception
+    assert isinstance(client.read_holding_registers(0x102, 2), ExceptionResponse) # 0x103 never seen
+    client.write_registers(0x102, [7, 8])
+    assert client.read_holding_registers(0x100, 4).registers == [1, 2, 7, 8]